@@ -9,41 +9,69 @@ logging.getLogger("fairseq").setLevel(logging.ERROR)
 logging.getLogger("fairseq.tasks.hubert_pretraining").setLevel(logging.ERROR)
 logging.getLogger("fairseq.models.hubert.hubert").setLevel(logging.ERROR)
 
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+import contextlib
 from contextlib import asynccontextmanager
 
 # Import endpoint handlers
 from api_modules.endpoints import (
     tts_endpoint,
+    tts_stream_endpoint,
+    batch_tts_endpoint,
     health_check,
+    readiness_check,
     get_characters,
     process_video_from_conversation,
-    whisper_timestamped_handler
+    whisper_timestamped_handler,
+    upload_media,
+    download_video,
+    video_progress_events,
+    video_job_queue,
+    resume_orphaned_jobs,
+    evict_expired_jobs,
+    metrics_endpoint
 )
 from api_modules.models import VideoRequest
+from api_modules.executors import shutdown_executors
+from models.tts_client import tts_http_client
 from models.models import preload_all_models
+from models.warmup import warm_up_models
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+async def prepare_models():
+    """Load every model on a background thread, then warm it up through the inference scheduler"""
+    await asyncio.get_running_loop().run_in_executor(None, preload_all_models)
+    await warm_up_models()
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting up RVC API...")
-    try:
-        # Preload models to avoid loading during requests
-        preload_all_models()
-        logger.info("Models preloaded successfully")
-    except Exception as e:
-        logger.error(f"Failed to preload models: {str(e)}")
-        logger.warning("API will start but model loading may fail during requests")
+    # Preload and warm up models in the background so /health and /ready answer
+    # meanwhile; /ready turns 200 once everything is resident and warmed up
+    preload_task = asyncio.create_task(prepare_models())
+    
+    await video_job_queue.start()
+    await resume_orphaned_jobs()
+    eviction_task = asyncio.create_task(evict_expired_jobs())
     
     yield
     
     # Shutdown
     logger.info("Shutting down RVC API...")
+    eviction_task.cancel()
+    # Let an in-flight pass finish deleting its job files and rows first
+    with contextlib.suppress(asyncio.CancelledError):
+        await eviction_task
+    await video_job_queue.stop()
+    await tts_http_client.aclose()
+    await asyncio.gather(preload_task, return_exceptions=True)
+    shutdown_executors()
 
 app = FastAPI(title="RVC TTS API", version="1.0.0", lifespan=lifespan)
 
@@ -60,7 +88,14 @@ app.add_middleware(
 
 # Register endpoints
 app.post("/tts/")(tts_endpoint)
+app.post("/tts/stream")(tts_stream_endpoint)
+app.post("/tts/batch")(batch_tts_endpoint)
 app.get("/health")(health_check)
+app.get("/ready")(readiness_check)
 app.get("/characters")(get_characters)
 app.post("/video")(process_video_from_conversation)
+app.post("/media")(upload_media)
+app.get("/video/{request_id}/events")(video_progress_events)
+app.get("/video/{request_id}/download")(download_video)
+app.get("/metrics")(metrics_endpoint)
 app.post("/whisper-timestamped/")(whisper_timestamped_handler)
\ No newline at end of file
@@ -0,0 +1,86 @@
+import logging
+import math
+from typing import Dict
+
+from fastapi import HTTPException
+
+from config import (
+    BATCH_TTS_CONCURRENCY,
+    BATCH_TTS_LATENCY_BUDGET,
+    TTS_LATENCY_BUDGET,
+    VIDEO_LATENCY_BUDGET
+)
+from .job_queue import VideoJobQueue
+from .metrics import registry, recent_timings
+from .scheduler import inference_scheduler
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Used until a stage has been timed in this process
+DEFAULT_TTS_SECONDS = 2.0
+DEFAULT_RVC_SECONDS = 5.0
+
+admission_decisions = registry.counter(
+    "rvc_admission_decisions_total", "Admission control outcomes (admitted or shed)", ("endpoint", "decision")
+)
+admission_estimate_seconds = registry.histogram(
+    "rvc_admission_estimate_seconds", "Estimated completion time of incoming requests", ("endpoint",)
+)
+
+
+def _retry_after(estimate: float, budget: float) -> str:
+    # Roughly when enough of the backlog will have drained to fit the budget again
+    return str(max(1, math.ceil(estimate - budget)))
+
+
+def _decide(endpoint: str, estimate: float, budget: float):
+    admission_estimate_seconds.observe(estimate, endpoint=endpoint)
+    if budget > 0 and estimate > budget:
+        admission_decisions.inc(endpoint=endpoint, decision="shed")
+        logger.warning(f"Shedding {endpoint} request: estimated {estimate:.1f}s exceeds {budget:.0f}s budget")
+        raise HTTPException(
+            status_code=503,
+            detail=f"Server is overloaded (estimated {estimate:.0f}s, budget {budget:.0f}s)",
+            headers={"Retry-After": _retry_after(estimate, budget)}
+        )
+    admission_decisions.inc(endpoint=endpoint, decision="admitted")
+
+
+def estimate_conversion_seconds(character: str, lane_name: str = "interactive", lines: int = 1) -> float:
+    """Expected time to convert lines for a character in a lane, from its backlog and recent timings"""
+    rvc_seconds = recent_timings.get("rvc", DEFAULT_RVC_SECONDS, character)
+    lane = inference_scheduler.lanes[lane_name]
+    slots = max(1, min(lane.max_concurrent, inference_scheduler.max_concurrent))
+    ahead = inference_scheduler.queued(lane_name) + lane.running
+    # A conversion already holding this character's model finishes first
+    blocked = rvc_seconds if inference_scheduler.is_busy(character) else 0.0
+    return blocked + rvc_seconds * (lines + ahead / slots)
+
+
+def estimate_tts_seconds(character: str) -> float:
+    """Expected /tts/ completion time from the interactive backlog and recent stage timings"""
+    tts_seconds = recent_timings.get("tts", DEFAULT_TTS_SECONDS, character)
+    return tts_seconds + estimate_conversion_seconds(character)
+
+
+def admit_tts(character: str):
+    """Raise 503 with Retry-After when a /tts/ request can't finish within TTS_LATENCY_BUDGET"""
+    _decide("tts", estimate_tts_seconds(character), TTS_LATENCY_BUDGET)
+
+
+def admit_tts_batch(lines_per_character: Dict[str, int]):
+    """Raise 503 with Retry-After when a /tts/batch request can't finish within BATCH_TTS_LATENCY_BUDGET"""
+    total_lines = sum(lines_per_character.values())
+    tts_rounds = math.ceil(total_lines / max(1, BATCH_TTS_CONCURRENCY))
+    tts_seconds = max(recent_timings.get("tts", DEFAULT_TTS_SECONDS, c) for c in lines_per_character)
+    conversion_seconds = max(
+        estimate_conversion_seconds(character, "batch", lines)
+        for character, lines in lines_per_character.items()
+    )
+    _decide("tts_batch", tts_seconds * tts_rounds + conversion_seconds, BATCH_TTS_LATENCY_BUDGET)
+
+
+def admit_video(queue: VideoJobQueue):
+    """Raise 503 with Retry-After when a new video job can't finish within VIDEO_LATENCY_BUDGET"""
+    _decide("video", queue.estimate_new_job(), VIDEO_LATENCY_BUDGET)
@@ -1,127 +1,274 @@
-import tempfile
 import uuid
 import os
+import time
 import asyncio
-from typing import List, Dict, Any
+from typing import Any, Callable, List, Dict, Optional, Union
+import numpy as np
 from scipy.io import wavfile
 from fastapi import HTTPException
 
 from models.models import load_model
-from config import MODEL_CONFIG
-from models.tts import generate_tts_audio, cleanup_temp_files
+from config import (
+    MODEL_CONFIG,
+    RVC_F0_METHOD,
+    CONVERSATION_TTS_CONCURRENCY,
+    CONVERSATION_RVC_CONCURRENCY,
+    CONVERSATION_ALIGN_CONCURRENCY
+)
+from models.tts import synthesize_speech, cleanup_temp_files
 from models.whisper import WHISPER_AVAILABLE
 from captions import get_word_timings_from_whisper
+from .job_store import JobCheckpoints
+from .executors import run_io, run_inference
+from .scheduler import inference_scheduler
+from .metrics import time_stage, observe_stage, recent_timings, voice_output_seconds
+from .tracing import span, record_span
+from .workspace import scratch_path
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'video'))
 from video.types import AudioFileData, CharacterTimeline
+from video.file_utils import read_bytes
 
-async def generate_audio_for_text(text: str, character: str, request_id: str) -> Dict[str, Any]:
-    """Generate RVC audio for a single text input"""
-    # Create temp files
-    tts_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-    output_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-    tts_path = tts_file.name
-    output_path = output_file.name
-    tts_file.close()
-    output_file.close()
-    
-    try:
-        print(f"[{request_id}] Starting audio generation for {character}: {text[:50]}...")
-        
-        # Load RVC model
-        print(f"[{request_id}] Loading RVC model...")
-        model = load_model(character)
-        config = MODEL_CONFIG[character]
-        print(f"[{request_id}] Model loaded successfully")
-        
-        # Generate TTS audio
-        print(f"[{request_id}] Generating TTS audio...")
-        tts_success = await generate_tts_audio(text, character, tts_path)
-        if not tts_success:
-            raise HTTPException(status_code=500, detail="TTS generation failed")
-        print(f"[{request_id}] TTS audio generated successfully")
-        
-        # Apply RVC voice conversion
-        print(f"[{request_id}] Applying RVC voice conversion...")
+async def fetch_tts_audio(text: str, character: str, request_id: str, tts_path: str) -> np.ndarray:
+    """TTS stage: fetch the base voice line into tts_path and return its 16 kHz samples"""
+    print(f"[{request_id}] Generating TTS audio for {character}: {text[:50]}...")
+    with time_stage("tts", character):
+        tts_audio = await synthesize_speech(text, character, tts_path)
+    if tts_audio is None:
+        raise HTTPException(status_code=500, detail="TTS generation failed")
+    print(f"[{request_id}] TTS audio generated successfully")
+    return tts_audio
+
+def convert_voice_samples(character: str, tts_audio: Union[str, np.ndarray], request_id: str) -> tuple[tuple[int, np.ndarray], list]:
+    """RVC stage: convert the TTS line into the character's voice and return ((sample_rate, int16 samples), spans).
+
+    tts_audio is either 16 kHz float32 samples from fetch_tts_audio or the
+    path of an audio file, which vc_single decodes with ffmpeg. Blocking; run
+    it through run_conversion, which records the pipeline's spans and hands
+    back only the samples. Raises RuntimeError so failures survive the trip
+    back from a process pool worker.
+    """
+    print(f"[{request_id}] Loading RVC model...")
+    model = load_model(character)
+    config = MODEL_CONFIG[character]
+    print(f"[{request_id}] Model loaded successfully")
+
+    # Apply RVC voice conversion
+    print(f"[{request_id}] Applying RVC voice conversion...")
+    # recent_timings is fed by run_conversion in the calling process
+    with time_stage("rvc", character, RVC_F0_METHOD, recent=False):
         try:
             result = model.vc_single(
-                0, tts_path, 0, None, "harvest", config["index_path"], None, 0.66, 3, 0, 1, 0.33
+                0, tts_audio, 0, None, RVC_F0_METHOD, config["index_path"], None, 0.66, 3, 0, 1, 0.33
             )
             print(f"[{request_id}] RVC conversion completed, result type: {type(result)}")
         except Exception as e:
             print(f"[{request_id}] RVC conversion failed with error: {str(e)}")
             import traceback
             print(traceback.format_exc())
-            raise HTTPException(status_code=500, detail=f"RVC conversion error: {str(e)}")
-        
-        # Check if the RVC conversion was successful
-        if result is None or len(result) < 2:
-            raise HTTPException(status_code=500, detail="RVC voice conversion failed")
-        
-        info, wav_opt = result
-        print(f"[{request_id}] RVC result info: {info}")
-        print(f"[{request_id}] wav_opt type: {type(wav_opt)}, length: {len(wav_opt) if wav_opt else 'None'}")
-        
-        # Check if wav_opt is valid
-        if wav_opt is None or len(wav_opt) < 2:
-            raise HTTPException(status_code=500, detail=f"RVC conversion failed: {info}")
-        
-        # Write the converted audio
-        print(f"[{request_id}] Writing converted audio...")
-        wavfile.write(output_path, wav_opt[0], wav_opt[1])
-        
-        # Read the converted audio
-        with open(output_path, "rb") as f:
-            audio_buffer = f.read()
-        
-        # Calculate actual duration from wav data
-        sample_rate = wav_opt[0]
-        num_samples = len(wav_opt[1])
-        duration = num_samples / sample_rate
-        
-        print(f"[{request_id}] Audio generation completed successfully, duration: {duration}s")
-        
-        return {
-            "buffer": audio_buffer,
-            "character": character,
-            "text": text,
-            "duration": duration
-        }
-        
-    finally:
-        # Cleanup temp files
-        cleanup_temp_files(tts_path, output_path)
-
-async def process_conversation_audio(conversation, request_id: str) -> tuple[List[AudioFileData], List[CharacterTimeline], List[Dict], float]:
+            raise RuntimeError(f"RVC conversion error: {str(e)}")
+
+        # F0 and per-segment HuBERT/index/synthesis timings measured inside the
+        # pipeline, as (name, start, end, attributes) with wall-clock times
+        spans = list(model.last_spans)
+
+    # Check if the RVC conversion was successful
+    if result is None or len(result) < 2:
+        raise RuntimeError("RVC voice conversion failed")
+
+    info, wav_opt = result
+    print(f"[{request_id}] RVC result info: {info}")
+    print(f"[{request_id}] wav_opt type: {type(wav_opt)}, length: {len(wav_opt) if wav_opt else 'None'}")
+
+    # Check if wav_opt is valid
+    if wav_opt is None or len(wav_opt) < 2 or wav_opt[1] is None:
+        raise RuntimeError(f"RVC conversion failed: {info}")
+
+    # Record the conversion's sub-stages (F0, HuBERT, index search)
+    for stage in ("f0", "hubert", "index_search"):
+        if stage in model.last_times:
+            observe_stage(stage, model.last_times[stage], character, RVC_F0_METHOD)
+
+    voice_output_seconds.observe(len(wav_opt[1]) / wav_opt[0], character=character, f0_method=RVC_F0_METHOD)
+    return (wav_opt[0], wav_opt[1]), spans
+
+async def run_conversion(func: Callable, character: str, *args) -> Any:
+    """run_inference for convert_voice or convert_voice_samples, timing it in this process for admission control.
+
+    With INFERENCE_EXECUTOR=process the conversion runs in a worker whose
+    recent_timings and trace context the API process never sees, so the
+    average is kept here and the pipeline spans it returns are recorded
+    under the caller's span. Returns the conversion's result without them.
+    """
+    started = time.perf_counter()
+    result, spans = await run_inference(func, character, *args)
+    recent_timings.record("rvc", time.perf_counter() - started, character)
+    for name, start, end, attributes in spans:
+        record_span(name, start, end, **attributes)
+    return result
+
+def convert_voice(character: str, tts_audio: Union[str, np.ndarray], output_path: str, request_id: str) -> tuple[float, list]:
+    """RVC stage: convert the TTS line into output_path and return (duration, spans).
+
+    Blocking; run it through run_conversion (see convert_voice_samples).
+    """
+    (sample_rate, samples), spans = convert_voice_samples(character, tts_audio, request_id)
+
+    # Write the converted audio
+    print(f"[{request_id}] Writing converted audio...")
+    wavfile.write(output_path, sample_rate, samples)
+
+    # Calculate actual duration from wav data
+    return len(samples) / sample_rate, spans
+
+def estimate_word_timings(text: str, duration: float) -> List[Dict]:
+    """Spread the words of a line evenly over its duration"""
+    words = text.split()
+    word_duration = duration / len(words) if words else 0
+    return [
+        {"word": word, "start": i * word_duration, "end": (i + 1) * word_duration}
+        for i, word in enumerate(words)
+    ]
+
+async def align_words(audio_buffer: bytes, text: str, duration: float, request_id: str,
+                      character: str = "") -> List[Dict]:
+    """Alignment stage: word timings relative to the start of the line"""
+    if not WHISPER_AVAILABLE:
+        # No whisper available - create simple word timeline
+        return estimate_word_timings(text, duration)
+    try:
+        with time_stage("whisper", character):
+            return await get_word_timings_from_whisper(audio_buffer, text)
+    except Exception as e:
+        print(f"[{request_id}] Warning: Failed to get word timings: {str(e)}")
+        # Fallback: create simple word timeline
+        return estimate_word_timings(text, duration)
+
+class ConversationPipeline:
+    """Overlaps the TTS, RVC and alignment stages across the lines of a conversation.
+
+    Every line runs as its own task, and each stage is gated by a semaphore,
+    so line N+1 can fetch TTS while line N converts and line N-1 is aligned.
+    Conversions of different characters run in parallel up to the RVC limit.
+    """
+
+    def __init__(self, request_id: str, checkpoints: Optional[JobCheckpoints] = None):
+        self.request_id = request_id
+        self.checkpoints = checkpoints
+        self.tts_slots = asyncio.Semaphore(CONVERSATION_TTS_CONCURRENCY)
+        self.rvc_slots = asyncio.Semaphore(CONVERSATION_RVC_CONCURRENCY)
+        self.align_slots = asyncio.Semaphore(CONVERSATION_ALIGN_CONCURRENCY)
+
+    def _paths(self, index: int) -> tuple[str, str]:
+        if self.checkpoints is not None:
+            # Keep the WAVs in the job directory so a restarted job can reuse them
+            return (
+                self.checkpoints.path(f"tts_{index}.wav"),
+                self.checkpoints.path(f"converted_{index}.wav")
+            )
+        return scratch_path(f"tts_{index}", ".wav"), scratch_path(f"converted_{index}", ".wav")
+
+    def _checkpoint(self, stage: str):
+        return self.checkpoints.get(stage) if self.checkpoints is not None else None
+
+    async def _set_checkpoint(self, stage: str, value):
+        if self.checkpoints is not None:
+            await run_io(self.checkpoints.set, stage, value)
+
+    async def process_line(self, index: int, text: str, character: str) -> Dict[str, Any]:
+        with span("line", index=index, character=character):
+            return await self._process_line(index, text, character)
+
+    async def _process_line(self, index: int, text: str, character: str) -> Dict[str, Any]:
+        request_id = self.request_id
+        tts_path, output_path = self._paths(index)
+        try:
+            converted = self._checkpoint(f"converted_{index}")
+            if converted:
+                print(f"[{request_id}] Reusing converted audio {index} from checkpoint")
+                duration = converted["duration"]
+            else:
+                if self._checkpoint(f"tts_{index}"):
+                    print(f"[{request_id}] Reusing TTS audio {index} from checkpoint")
+                    tts_audio = tts_path
+                else:
+                    async with self.tts_slots:
+                        tts_audio = await fetch_tts_audio(text, character, request_id, tts_path)
+                    await self._set_checkpoint(f"tts_{index}", {"path": tts_path})
+
+                # One conversion at a time per character model, behind any interactive /tts/ work
+                async with self.rvc_slots, inference_scheduler.slot("video", character):
+                    duration = await run_conversion(
+                        convert_voice, character, tts_audio, output_path, request_id
+                    )
+                await self._set_checkpoint(f"converted_{index}", {"path": output_path, "duration": duration})
+                print(f"[{request_id}] Audio {index + 1} completed successfully, duration: {duration}s")
+
+            # Read the converted audio
+            audio_buffer = await run_io(read_bytes, output_path)
+
+            word_timings = self._checkpoint(f"words_{index}")
+            if word_timings is None:
+                # Whisper shares the inference pool, so it takes a slot like a conversion
+                async with self.align_slots, inference_scheduler.slot("video", "whisper"):
+                    word_timings = await align_words(audio_buffer, text, duration, request_id, character)
+                await self._set_checkpoint(f"words_{index}", word_timings)
+
+            return {
+                "buffer": audio_buffer,
+                "character": character,
+                "text": text,
+                "duration": duration,
+                "word_timings": word_timings
+            }
+        finally:
+            # Cleanup temp files
+            if self.checkpoints is None:
+                cleanup_temp_files(tts_path, output_path)
+
+    async def run(self, audio_tasks: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        """Process every line concurrently and return results in conversation order"""
+        line_tasks = [
+            asyncio.create_task(self.process_line(i, task["text"], task["character"]))
+            for i, task in enumerate(audio_tasks)
+        ]
+        try:
+            return await asyncio.gather(*line_tasks)
+        except BaseException:
+            for line_task in line_tasks:
+                line_task.cancel()
+            await asyncio.gather(*line_tasks, return_exceptions=True)
+            raise
+
+async def process_conversation_audio(
+    conversation,
+    request_id: str,
+    checkpoints: Optional[JobCheckpoints] = None
+) -> tuple[List[AudioFileData], List[CharacterTimeline], List[Dict], float]:
     """Process all audio for a conversation and return timeline data"""
     # Generate audio for each line
     audio_tasks = []
-    
+
     for turn in conversation:
         if turn.stewie and turn.stewie.strip():
             audio_tasks.append({"text": turn.stewie, "character": "stewie"})
         if turn.peter and turn.peter.strip():
             audio_tasks.append({"text": turn.peter, "character": "peter"})
-    
+
     print(f"[{request_id}] Found {len(audio_tasks)} non-empty audio tasks")
-    
-    # Process audio generation sequentially (as per the original implementation)
-    print(f"[{request_id}] Generating {len(audio_tasks)} audio files sequentially...")
-    audio_results = []
-    for i, task in enumerate(audio_tasks):
-        print(f"[{request_id}] Processing audio {i+1}/{len(audio_tasks)} ({task['character']})")
-        result = await generate_audio_for_text(task["text"], task["character"], request_id)
-        audio_results.append(result)
+
+    print(f"[{request_id}] Generating {len(audio_tasks)} audio files through the stage pipeline...")
+    audio_results = await ConversationPipeline(request_id, checkpoints).run(audio_tasks)
     print(f"[{request_id}] All audio generation completed")
-    
-    # Build timeline
+
+    # Build timeline in conversation order
     audio_data_list = []
     character_timeline_list = []
     word_timeline = []
     GAP_DURATION = 0.2
     current_time = 0
-    
+
     for audio in audio_results:
         audio_data_list.append(
             AudioFileData(
@@ -130,7 +277,7 @@ async def process_conversation_audio(conversation, request_id: str) -> tuple[Lis
                 character=audio["character"]
             )
         )
-        
+
         character_timeline_list.append(
             CharacterTimeline(
                 character=audio["character"],
@@ -138,44 +285,17 @@ async def process_conversation_audio(conversation, request_id: str) -> tuple[Lis
                 end_time=current_time + audio["duration"]
             )
         )
-        
-        # Get word timings using whisper
-        if WHISPER_AVAILABLE:
-            try:
-                word_timings = await get_word_timings_from_whisper(audio["buffer"], audio["text"])
-                for word_timing in word_timings:
-                    word_timeline.append({
-                        "text": word_timing["word"],
-                        "startTime": current_time + word_timing["start"],
-                        "endTime": current_time + word_timing["end"],
-                        "character": audio["character"]
-                    })
-            except Exception as e:
-                print(f"[{request_id}] Warning: Failed to get word timings: {str(e)}")
-                # Fallback: create simple word timeline
-                words = audio["text"].split()
-                word_duration = audio["duration"] / len(words) if words else 0
-                for i, word in enumerate(words):
-                    word_timeline.append({
-                        "text": word,
-                        "startTime": current_time + (i * word_duration),
-                        "endTime": current_time + ((i + 1) * word_duration),
-                        "character": audio["character"]
-                    })
-        else:
-            # No whisper available - create simple word timeline
-            words = audio["text"].split()
-            word_duration = audio["duration"] / len(words) if words else 0
-            for i, word in enumerate(words):
-                word_timeline.append({
-                    "text": word,
-                    "startTime": current_time + (i * word_duration),
-                    "endTime": current_time + ((i + 1) * word_duration),
-                    "character": audio["character"]
-                })
-        
+
+        for word_timing in audio["word_timings"]:
+            word_timeline.append({
+                "text": word_timing["word"],
+                "startTime": current_time + word_timing["start"],
+                "endTime": current_time + word_timing["end"],
+                "character": audio["character"]
+            })
+
         current_time += audio["duration"] + GAP_DURATION
-    
+
     total_duration = current_time - GAP_DURATION + 1 if current_time > 0 else 1
-    
-    return audio_data_list, character_timeline_list, word_timeline, total_duration 
\ No newline at end of file
+
+    return audio_data_list, character_timeline_list, word_timeline, total_duration
@@ -0,0 +1,90 @@
+import asyncio
+import io
+import json
+import zipfile
+from collections import OrderedDict
+from typing import Dict, List
+
+import numpy as np
+
+from config import BATCH_TTS_CONCURRENCY
+from .audio_service import fetch_tts_audio, convert_voice, run_conversion
+from .executors import run_io
+from .models import BatchTTSLine
+from .scheduler import inference_scheduler
+from .workspace import job_workspace
+
+
+def group_by_character(lines: List[BatchTTSLine]) -> "OrderedDict[str, List[int]]":
+    """Line indices per character, in order of first appearance"""
+    groups: "OrderedDict[str, List[int]]" = OrderedDict()
+    for index, line in enumerate(lines):
+        groups.setdefault(line.character, []).append(index)
+    return groups
+
+
+def build_zip(lines: List[BatchTTSLine], output_paths: List[str], durations: List[float]) -> bytes:
+    """Zip of the converted WAVs plus a manifest.json describing each line"""
+    manifest = []
+    buffer = io.BytesIO()
+    # WAV barely compresses, so store the files as-is
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as archive:
+        for index, (line, path, duration) in enumerate(zip(lines, output_paths, durations)):
+            name = f"{index:02d}_{line.character}.wav"
+            archive.write(path, name)
+            manifest.append({
+                "index": index,
+                "file": name,
+                "character": line.character,
+                "text": line.text,
+                "duration": duration
+            })
+        archive.writestr("manifest.json", json.dumps({"lines": manifest}, indent=2))
+    return buffer.getvalue()
+
+
+async def synthesize_batch(lines: List[BatchTTSLine], request_id: str) -> bytes:
+    """Voice every line and return them as a zip archive.
+
+    TTS is fetched for all lines concurrently. Each character's conversions
+    start once all of its lines have TTS audio and run one after another,
+    each line taking its own "batch" lane slot so interactive /tts/ work for
+    the same voice can get in between; different characters convert in
+    parallel.
+    """
+    async with job_workspace(f"tts_batch_{request_id}") as workspace:
+        tts_paths = [workspace.path(f"tts_{i}.wav") for i in range(len(lines))]
+        output_paths = [workspace.path(f"converted_{i}.wav") for i in range(len(lines))]
+        return await _synthesize(lines, request_id, tts_paths, output_paths)
+
+
+async def _synthesize(lines: List[BatchTTSLine], request_id: str,
+                      tts_paths: List[str], output_paths: List[str]) -> bytes:
+    durations: List[float] = [0.0] * len(lines)
+    tts_audio: List[np.ndarray] = [None] * len(lines)
+    tts_slots = asyncio.Semaphore(BATCH_TTS_CONCURRENCY)
+
+    async def fetch(index: int):
+        async with tts_slots:
+            tts_audio[index] = await fetch_tts_audio(lines[index].text, lines[index].character, request_id, tts_paths[index])
+
+    async def convert_group(character: str, indices: List[int], fetches: Dict[int, asyncio.Task]):
+        await asyncio.gather(*(fetches[i] for i in indices))
+        for i in indices:
+            async with inference_scheduler.slot("batch", character):
+                durations[i] = await run_conversion(convert_voice, character, tts_audio[i], output_paths[i], request_id)
+
+    fetches = {i: asyncio.create_task(fetch(i)) for i in range(len(lines))}
+    groups = [
+        asyncio.create_task(convert_group(character, indices, fetches))
+        for character, indices in group_by_character(lines).items()
+    ]
+    tasks = list(fetches.values()) + groups
+    try:
+        await asyncio.gather(*groups)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    return await run_io(build_zip, lines, output_paths, durations)
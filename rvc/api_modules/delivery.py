@@ -0,0 +1,127 @@
+"""Delivery of finished videos.
+
+Downloads answer conditional requests (If-None-Match, If-Range) and single
+byte ranges, so players can seek and interrupted downloads can resume.
+Results stay downloadable until JOB_RESULT_TTL has passed since the job
+finished, however many times they are fetched.
+
+With VIDEO_ACCEL_REDIRECT_PREFIX set the response carries only an
+X-Accel-Redirect header and nginx sends the file itself, with sendfile and
+its own Range handling, so no Python worker touches the bytes.
+"""
+import os
+import re
+import time
+from typing import Dict, Mapping, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+from config import JOB_DATA_DIR, JOB_RESULT_TTL, VIDEO_ACCEL_REDIRECT_PREFIX
+
+CHUNK_SIZE = 1024 * 1024
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def file_etag(stat: os.stat_result) -> str:
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) of a single-range Range header.
+
+    Returns None for headers we don't handle (multiple ranges, other units),
+    which are answered with the whole file. Raises 416 when the range lies
+    outside the file.
+    """
+    match = _RANGE.match(header.strip().replace(" ", ""))
+    if not match or (not match.group(1) and not match.group(2)):
+        return None
+    first, last = match.group(1), match.group(2)
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(0, size - int(last))
+        end = size - 1
+    if start > end or start >= size:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, end
+
+
+def _iter_range(path: str, start: int, end: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _accel_path(path: str) -> Optional[str]:
+    """URI of path under the nginx internal location, if it lives in JOB_DATA_DIR"""
+    relative = os.path.relpath(os.path.abspath(path), os.path.abspath(JOB_DATA_DIR))
+    if relative.startswith(os.pardir):
+        return None
+    return VIDEO_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + relative.replace(os.sep, "/")
+
+
+def retention_expires_at(job: Dict) -> float:
+    """Unix time at which a finished job's result is evicted (eviction counts from finished_at)"""
+    finished_at = job.get("finished_at") or job.get("updated_at") or time.time()
+    return finished_at + JOB_RESULT_TTL
+
+
+def retention_remaining(job: Dict) -> float:
+    return max(0.0, retention_expires_at(job) - time.time())
+
+
+def video_file_response(job: Dict, request_headers: Mapping[str, str]) -> Response:
+    """Response for a finished job's video, honouring Range and conditional headers"""
+    path = job["file_path"]
+    try:
+        stat = os.stat(path) if path else None
+    except FileNotFoundError:
+        stat = None
+    if stat is None:
+        raise HTTPException(status_code=410, detail="Video is no longer available")
+
+    headers = {
+        "Content-Disposition": f'attachment; filename="peter-stewie-conversation_{job["request_id"]}.mp4"',
+        "Accept-Ranges": "bytes",
+        "Cache-Control": f"private, max-age={int(retention_remaining(job))}",
+    }
+
+    if VIDEO_ACCEL_REDIRECT_PREFIX:
+        accel_path = _accel_path(path)
+        if accel_path is not None:
+            # nginx takes Content-Type, Content-Disposition and Cache-Control from this response
+            return Response(status_code=200, media_type="video/mp4", headers={**headers, "X-Accel-Redirect": accel_path})
+
+    etag = file_etag(stat)
+    headers["ETag"] = etag
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": headers["Cache-Control"]})
+
+    range_header = request_headers.get("range")
+    if_range = request_headers.get("if-range")
+    if range_header and (not if_range or if_range.strip() == etag):
+        byte_range = parse_range(range_header, stat.st_size)
+        if byte_range is not None:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(_iter_range(path, start, end), status_code=206,
+                                     media_type="video/mp4", headers=headers)
+
+    return FileResponse(path, media_type="video/mp4", headers=headers, stat_result=stat)
@@ -1,21 +1,57 @@
-import tempfile
 import uuid
 import os
 import traceback
 import logging
-from fastapi import Form, HTTPException, File, UploadFile
-from fastapi.responses import FileResponse, StreamingResponse, JSONResponse
-from scipy.io import wavfile
+from fastapi import Form, HTTPException, File, UploadFile, Request, Query
+from fastapi.responses import FileResponse, StreamingResponse, JSONResponse, PlainTextResponse, Response
 import asyncio
+import json
+import math
+import time
 from typing import Dict, Optional
 
-from models.models import load_model
-from config import MODEL_CONFIG, models
-from models.tts import generate_tts_audio, cleanup_temp_files
+from config import (
+    MODEL_CONFIG,
+    models,
+    VIDEO_MAX_CONCURRENT_JOBS,
+    VIDEO_MAX_QUEUED_JOBS,
+    VIDEO_JOB_DEFAULT_DURATION,
+    JOB_RESULT_TTL,
+    JOB_EVICTION_INTERVAL,
+    PROGRESS_POLL_INTERVAL,
+    PROGRESS_KEEPALIVE_INTERVAL,
+    RENDER_PROGRESS_INTERVAL,
+    BATCH_TTS_MAX_LINES
+)
+from models.tts import synthesize_speech
 from models.whisper import WHISPER_AVAILABLE, whisper_timestamped_endpoint
+from models.models import model_readiness, model_residency
 from config import whisper_model
-from .models import VideoRequest
-from .audio_service import process_conversation_audio
+from .models import VideoRequest, BatchTTSRequest
+from .audio_service import process_conversation_audio, convert_voice, run_conversion
+from .scheduler import inference_scheduler
+from .admission import admit_tts, admit_tts_batch, admit_video
+from .batch_tts import synthesize_batch, group_by_character
+from .tts_stream import SentenceStream, wav_chunks
+from .executors import run_io
+from .job_queue import VideoJobQueue, QueueFullError
+from .job_store import job_store, job_dir, remove_job_files, TERMINAL_STATUSES
+from .progress import publish, subscribe
+from .media_store import save_upload, claim_upload, evict_stale_uploads, MediaUploadError, MediaTooLargeError
+from .result_cache import result_cache, request_fingerprint
+from .tracing import Trace, start_trace, span
+from .delivery import video_file_response, retention_expires_at
+from .workspace import workspace_manager, job_workspace, active_workspace, WorkspaceQuotaError
+from .metrics import (
+    registry,
+    time_stage,
+    record_cache,
+    video_queue_depth,
+    video_jobs_in_flight,
+    video_jobs_total,
+    video_output_bytes
+)
+from video.file_utils import write_bytes, read_bytes
 from .video_service import (
     validate_file_paths,
     process_media_files,
@@ -28,8 +64,72 @@ from .video_service import (
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Store video generation status
-video_tasks: Dict[str, Dict] = {}
+# Bounded pool of workers that run video jobs in FIFO order
+video_job_queue = VideoJobQueue(
+    max_concurrent=VIDEO_MAX_CONCURRENT_JOBS,
+    max_queued=VIDEO_MAX_QUEUED_JOBS,
+    default_duration=VIDEO_JOB_DEFAULT_DURATION
+)
+
+def collect_queue_metrics():
+    video_queue_depth.set(video_job_queue.queue_depth)
+    video_jobs_in_flight.set(video_job_queue.in_flight)
+
+registry.add_collector(collect_queue_metrics)
+
+def job_event(job: Dict) -> Dict:
+    """Progress payload for a job, as sent to SSE listeners"""
+    event = {
+        "requestId": job["request_id"],
+        "status": job["status"],
+        "progress": job.get("progress"),
+        "traceId": job.get("trace_id"),
+        "timeline": job.get("timeline") or []
+    }
+    if job["status"] == "completed":
+        event["downloadUrl"] = f"/video/{job['request_id']}/download"
+        event["expiresAt"] = int(retention_expires_at(job))
+    elif job["status"] == "error":
+        event["error"] = job.get("error") or "Unknown error"
+    return event
+
+async def update_job(request_id: str, **fields):
+    """Record a job state change and push it to this process's progress listeners"""
+    await run_io(job_store.update, request_id, **fields)
+    job = await run_io(job_store.get, request_id)
+    if job is not None:
+        publish(request_id, job_event(job))
+
+def discard_job(request_id: str):
+    """Remove a job that was never queued, along with its files"""
+    remove_job_files({"request_id": request_id})
+    job_store.delete(request_id)
+
+def out_of_space(error: WorkspaceQuotaError) -> HTTPException:
+    """503 for a request that can't get workspace space; eviction frees some within an interval"""
+    logger.warning(str(error))
+    return HTTPException(
+        status_code=503,
+        detail="Server is out of scratch space",
+        headers={"Retry-After": str(max(1, math.ceil(JOB_EVICTION_INTERVAL)))}
+    )
+
+def render_progress_reporter(request_id: str):
+    """Callback for ffmpeg render progress, written at most once per RENDER_PROGRESS_INTERVAL"""
+    last_reported = [-1]
+    last_written_at = [0.0]
+    
+    async def report(percent: float):
+        now = time.monotonic()
+        if int(percent) <= last_reported[0]:
+            return
+        if percent < 100 and now - last_written_at[0] < RENDER_PROGRESS_INTERVAL:
+            return
+        last_reported[0] = int(percent)
+        last_written_at[0] = now
+        await update_job(request_id, progress=round(percent, 1))
+    
+    return report
 
 async def tts_endpoint(text: str = Form(...), character: str = Form("peter")):
     """Generate TTS with RVC voice conversion"""
@@ -45,38 +145,33 @@ async def tts_endpoint(text: str = Form(...), character: str = Form("peter")):
             detail=f"Unknown character: {character}. Available: {list(MODEL_CONFIG.keys())}"
         )
     
-    # Create temporary files
-    tts_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-    output_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-    
-    tts_path = tts_file.name
-    output_path = output_file.name
+    # Reject up front when the interactive backlog would blow the latency budget
+    admit_tts(character)
     
-    # Close file handles
-    tts_file.close()
-    output_file.close()
+    # The workspace outlives this function: it is removed once the response is sent
+    try:
+        workspace = await run_io(workspace_manager.open, f"tts_{request_id}")
+    except WorkspaceQuotaError as e:
+        raise out_of_space(e)
     
     try:
-        # Load model
-        model = load_model(character)
-        config = MODEL_CONFIG[character]
-        
-        # Generate TTS audio
-        tts_success = await generate_tts_audio(text, character, tts_path)
-        if not tts_success:
-            raise HTTPException(status_code=500, detail="All TTS services failed")
-        
-        # Apply RVC voice conversion
-        _, wav_opt = model.vc_single(
-            0, tts_path, 0, None, "harvest", config["index_path"], None, 0.66, 3, 0, 1, 0.33
-        )
-        
-        # Write the converted audio
-        wavfile.write(output_path, wav_opt[0], wav_opt[1])
+        with active_workspace(workspace):
+            tts_path = workspace.path("tts.wav")
+            output_path = workspace.path("converted.wav")
+            
+            # Generate TTS audio
+            with time_stage("tts", character):
+                tts_audio = await synthesize_speech(text, character, tts_path)
+            if tts_audio is None:
+                raise HTTPException(status_code=500, detail="All TTS services failed")
+            
+            # Apply RVC voice conversion and write the converted audio off the event loop
+            async with inference_scheduler.slot("interactive", character):
+                await run_conversion(convert_voice, character, tts_audio, output_path, request_id)
         
         # Return file response with background cleanup
         async def cleanup_background():
-            cleanup_temp_files(tts_path, output_path)
+            await run_io(workspace.close)
         
         return FileResponse(
             output_path,
@@ -87,72 +182,255 @@ async def tts_endpoint(text: str = Form(...), character: str = Form("peter")):
         
     except HTTPException:
         # Re-raise HTTP exceptions
-        cleanup_temp_files(tts_path, output_path)
+        await run_io(workspace.close)
         raise
+    except WorkspaceQuotaError as e:
+        await run_io(workspace.close)
+        raise out_of_space(e)
     except Exception as e:
         # Handle unexpected errors
-        cleanup_temp_files(tts_path, output_path)
+        await run_io(workspace.close)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+async def tts_stream_endpoint(text: str = Form(...), character: str = Form("peter")):
+    """Generate TTS with RVC voice conversion, streamed as WAV one sentence at a time"""
+    request_id = str(uuid.uuid4())[:8]
+    
+    # Validate inputs
+    if not text.strip():
+        raise HTTPException(status_code=400, detail="Text cannot be empty")
+    
+    if character not in MODEL_CONFIG:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Unknown character: {character}. Available: {list(MODEL_CONFIG.keys())}"
+        )
+    
+    admit_tts(character)
+    
+    try:
+        workspace = await run_io(workspace_manager.open, f"tts_stream_{request_id}")
+    except WorkspaceQuotaError as e:
+        raise out_of_space(e)
+    
+    chunks = wav_chunks(SentenceStream(text, character, request_id, workspace))
+    try:
+        # Wait for the first sentence so a failure can still be reported with a status code
+        first_chunk = await chunks.__anext__()
+    except BaseException as e:
+        await chunks.aclose()
+        await run_io(workspace.close)
+        if isinstance(e, HTTPException):
+            raise
+        if isinstance(e, WorkspaceQuotaError):
+            raise out_of_space(e)
+        if isinstance(e, Exception):
+            logger.error(f"[{request_id}] Streaming TTS failed: {str(e)}")
+            raise HTTPException(status_code=500, detail="Internal server error")
+        raise
+    
+    async def body():
+        try:
+            yield first_chunk
+            async for chunk in chunks:
+                yield chunk
+        except Exception as e:
+            # Headers are already sent; end the stream early
+            logger.error(f"[{request_id}] Streaming TTS failed mid-stream: {str(e)}")
+        finally:
+            await chunks.aclose()
+            await run_io(workspace.close)
+    
+    return StreamingResponse(
+        body(),
+        media_type="audio/wav",
+        headers={
+            "Content-Disposition": f'inline; filename="{character}_voice.wav"',
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+async def batch_tts_endpoint(request: BatchTTSRequest):
+    """Voice many {text, character} lines in one call and return a zip of WAVs"""
+    request_id = str(uuid.uuid4())[:8]
+    lines = request.lines
+    
+    # Validate inputs
+    if not lines:
+        raise HTTPException(status_code=400, detail="No lines provided")
+    if len(lines) > BATCH_TTS_MAX_LINES:
+        raise HTTPException(status_code=400, detail=f"Too many lines: {len(lines)} (max {BATCH_TTS_MAX_LINES})")
+    for index, line in enumerate(lines):
+        if not line.text.strip():
+            raise HTTPException(status_code=400, detail=f"Line {index}: text cannot be empty")
+        if line.character not in MODEL_CONFIG:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Line {index}: unknown character: {line.character}. Available: {list(MODEL_CONFIG.keys())}"
+            )
+    
+    admit_tts_batch({character: len(indices) for character, indices in group_by_character(lines).items()})
+    
+    logger.info(f"[{request_id}] Batch TTS for {len(lines)} lines")
+    try:
+        archive = await synthesize_batch(lines, request_id)
+    except HTTPException:
+        raise
+    except WorkspaceQuotaError as e:
+        raise out_of_space(e)
+    except Exception as e:
+        logger.error(f"[{request_id}] Batch TTS failed: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
+    
+    return Response(
+        content=archive,
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="voices_{request_id}.zip"'}
+    )
 
 async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy", 
+        "ready": model_readiness.ready,
         "loaded_models": list(models.keys()),
+        "model_residency": model_residency.status(),
         "whisper_available": WHISPER_AVAILABLE,
         "whisper_loaded": whisper_model is not None,
         "whisper_endpoint": "enabled",
         "video_processing": "enabled",
+        "video_queue": {
+            "queued": video_job_queue.queue_depth,
+            "in_flight": video_job_queue.in_flight,
+            "max_concurrent": video_job_queue.max_concurrent,
+            "max_queued": video_job_queue.max_queued
+        },
+        "inference_lanes": inference_scheduler.status(),
         "endpoints": {
             "tts": "/tts/",
+            "tts_batch": "/tts/batch",
             "whisper_timestamped": "/whisper-timestamped/",
             "video": "/video",
+            "media_upload": "/media",
+            "video_events": "/video/{request_id}/events",
+            "video_download": "/video/{request_id}/download",
+            "metrics": "/metrics",
             "characters": "/characters",
-            "health": "/health"
+            "health": "/health",
+            "ready": "/ready"
         }
     }
 
+async def readiness_check():
+    """Readiness probe: 200 once every model is resident, 503 while loading or if a load failed"""
+    status = model_readiness.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
 async def get_characters():
     """Get available character voices"""
     return {"characters": list(MODEL_CONFIG.keys())}
 
 async def process_video_task(request: VideoRequest, request_id: str):
-    """Background task for video processing"""
-    try:
-        # Update status
-        video_tasks[request_id]["status"] = "Processing conversation audio..."
-        
-        # Log request details
-        logger.info(f"[{request_id}] Conversation length: {len(request.conversation) if request.conversation else 0}")
-        logger.info(f"[{request_id}] Media files count: {len(request.mediaFiles) if request.mediaFiles else 0}")
-        
-        conversation = request.conversation
-        media_files = request.mediaFiles or []
-        
-        if not conversation:
-            logger.error(f"[{request_id}] No conversation provided")
-            raise HTTPException(status_code=400, detail="No conversation provided")
-        
-        # Validate file paths
-        logger.info(f"[{request_id}] Validating file paths...")
-        video_path, stewie_image_path, peter_image_path = validate_file_paths()
+    """Background task for video processing, traced from start to finish"""
+    # Stage changes are reported synchronously; chain their writes so they land in order
+    timeline_write = [None]
+    
+    def publish_timeline(trace: Trace):
+        previous, timeline = timeline_write[0], trace.timeline()
         
-        # Process media files
-        video_tasks[request_id]["status"] = "Processing media files..."
-        media_buffers = process_media_files(media_files)
+        async def write():
+            if previous is not None:
+                await asyncio.gather(previous, return_exceptions=True)
+            await update_job(request_id, timeline=timeline)
         
-        # Process conversation audio
-        video_tasks[request_id]["status"] = "Generating character voices..."
-        audio_data_list, character_timeline_list, word_timeline, total_duration = await process_conversation_audio(
-            conversation, request_id
+        timeline_write[0] = asyncio.ensure_future(write())
+    
+    async with start_trace(request_id, on_stage_change=publish_timeline) as trace:
+        await update_job(request_id, trace_id=trace.trace_id)
+        await render_video_job(request, request_id)
+    
+    if timeline_write[0] is not None:
+        try:
+            await timeline_write[0]
+        except Exception as e:
+            logger.warning(f"[{request_id}] Failed to publish stage timeline: {str(e)}")
+
+async def render_video_job(request: VideoRequest, request_id: str):
+    """Run every stage of a video job and record the outcome in the job store.
+    
+    Intermediates go to a workspace that is removed when the job ends; stage
+    checkpoints and the final video stay in the job directory.
+    """
+    try:
+        async with job_workspace(request_id):
+            await render_video_stages(request, request_id)
+    except Exception as e:
+        logger.error(f"[{request_id}] Error in video processing: {str(e)}")
+        await update_job(request_id, status="error", error=str(e))
+        video_jobs_total.inc(status="error")
+
+async def render_video_stages(request: VideoRequest, request_id: str):
+    """Every stage of a video job, from voices to the saved MP4"""
+    # A job resumed after a restart may already have its final video
+    checkpoints = await run_io(job_store.checkpoints, request_id)
+    video_checkpoint = checkpoints.get("video")
+    if video_checkpoint:
+        logger.info(f"[{request_id}] Final video found in checkpoint, skipping processing")
+        await update_job(
+            request_id,
+            status="completed",
+            file_path=video_checkpoint["path"],
+            file_size=video_checkpoint["size"]
         )
-        
-        # Process image overlays
-        video_tasks[request_id]["status"] = "Creating image overlays..."
+        return
+    
+    # Update status
+    await update_job(request_id, status="Processing conversation audio...")
+    
+    # Log request details
+    logger.info(f"[{request_id}] Conversation length: {len(request.conversation) if request.conversation else 0}")
+    logger.info(f"[{request_id}] Media files count: {len(request.mediaFiles) if request.mediaFiles else 0}")
+    
+    conversation = request.conversation
+    media_files = request.mediaFiles or []
+    
+    if not conversation:
+        logger.error(f"[{request_id}] No conversation provided")
+        raise HTTPException(status_code=400, detail="No conversation provided")
+    
+    # Validate file paths
+    logger.info(f"[{request_id}] Validating file paths...")
+    video_path, stewie_image_path, peter_image_path = validate_file_paths()
+    
+    # Decode media files in the background while the voices are generated
+    async def decode_media():
+        with span("media_decode", files=len(media_files)):
+            return await run_io(process_media_files, media_files, checkpoints.dir)
+    
+    media_task = asyncio.create_task(decode_media())
+    
+    # Process conversation audio
+    await update_job(request_id, status="Generating character voices...")
+    try:
+        with span("conversation_audio", lines=len(conversation)):
+            audio_data_list, character_timeline_list, word_timeline, total_duration = await process_conversation_audio(
+                conversation, request_id, checkpoints
+            )
+    except BaseException:
+        media_task.cancel()
+        raise
+    
+    await update_job(request_id, status="Processing media files...")
+    media_buffers = await media_task
+    
+    # Process image overlays
+    await update_job(request_id, status="Creating image overlays...")
+    with span("image_overlays"):
         image_overlays_list = create_image_overlays(conversation, media_buffers, word_timeline)
-        
-        # Generate video
-        video_tasks[request_id]["status"] = "Generating final video..."
+    
+    # Generate video
+    await update_job(request_id, status="Generating final video...")
+    with span("render", duration=total_duration):
         video_buffer = await generate_video(
             video_path,
             stewie_image_path,
@@ -161,74 +439,61 @@ async def process_video_task(request: VideoRequest, request_id: str):
             character_timeline_list,
             word_timeline,
             total_duration,
-            image_overlays_list if image_overlays_list else None
+            image_overlays_list if image_overlays_list else None,
+            on_progress=render_progress_reporter(request_id)
         )
+    
+    # Save to temp file
+    await update_job(request_id, status="Saving video...", progress=None)
+    with span("save", bytes=len(video_buffer)):
+        temp_video_path, file_size = await run_io(save_video_to_temp, video_buffer, request_id, checkpoints.dir)
+        await run_io(checkpoints.set, "video", {"path": temp_video_path, "size": file_size})
         
-        # Save to temp file
-        video_tasks[request_id]["status"] = "Saving video..."
-        temp_video_path, file_size = save_video_to_temp(video_buffer, request_id)
-        
-        # Store result
-        video_tasks[request_id].update({
-            "status": "completed",
-            "file_path": temp_video_path,
-            "file_size": file_size
-        })
-        
-    except Exception as e:
-        logger.error(f"[{request_id}] Error in video processing: {str(e)}")
-        video_tasks[request_id].update({
-            "status": "error",
-            "error": str(e)
-        })
+        # Keep a copy for identical requests submitted later
+        job = await run_io(job_store.get, request_id)
+        if job and job.get("fingerprint"):
+            try:
+                await run_io(result_cache.put, job["fingerprint"], temp_video_path)
+            except Exception as e:
+                logger.warning(f"[{request_id}] Failed to cache video: {str(e)}")
+    
+    # Store result
+    await update_job(
+        request_id,
+        status="completed",
+        file_path=temp_video_path,
+        file_size=file_size
+    )
+    video_jobs_total.inc(status="completed")
+    video_output_bytes.observe(file_size)
 
-async def process_video_from_conversation(request: VideoRequest):
+async def process_video_from_conversation(request: VideoRequest, http_request: Request):
     """Process video from conversation data with status tracking"""
     
     # Check if this is a status check request
     if request.isStatusCheck and request.requestId:
-        if request.requestId in video_tasks:
-            task_info = video_tasks[request.requestId]
+        task_info = await run_io(job_store.get, request.requestId)
+        if task_info is not None:
             logger.info(f"Status check for request {request.requestId}: {task_info['status']}")
             
             # If completed, return the video
             if task_info["status"] == "completed":
-                temp_video_path = task_info["file_path"]
-                file_size = task_info["file_size"]
-                
-                # Stream the video
-                def iterfile():
-                    try:
-                        with open(temp_video_path, 'rb') as f:
-                            while chunk := f.read(1024 * 1024):
-                                yield chunk
-                    finally:
-                        try:
-                            os.unlink(temp_video_path)
-                            del video_tasks[request.requestId]
-                        except Exception as e:
-                            logger.warning(f"Cleanup error: {str(e)}")
-                
-                return StreamingResponse(
-                    iterfile(),
-                    media_type="video/mp4",
-                    headers={
-                        "Content-Disposition": f'attachment; filename="peter-stewie-conversation_{request.requestId}.mp4"',
-                        "Content-Length": str(file_size),
-                    }
-                )
+                return video_file_response(task_info, http_request.headers)
             
             # If error, return the error
             elif task_info["status"] == "error":
-                error_msg = task_info.get("error", "Unknown error")
-                del video_tasks[request.requestId]
+                error_msg = task_info.get("error") or "Unknown error"
                 raise HTTPException(status_code=500, detail=error_msg)
             
             # If still processing, return status
             else:
                 return JSONResponse(
                     status_code=202,
-                    content={"status": task_info["status"]}
+                    content={
+                        "status": task_info["status"],
+                        "timeline": task_info.get("timeline") or [],
+                        **video_job_queue.status(request.requestId)
+                    }
                 )
         else:
             raise HTTPException(status_code=404, detail="Video task not found")
@@ -240,26 +505,199 @@ async def process_video_from_conversation(request: VideoRequest):
     if not request.conversation:
         raise HTTPException(status_code=400, detail="No conversation provided for new video request")
     
-    video_tasks[request_id] = {
-        "status": "initializing",
-        "started_at": asyncio.get_event_loop().time()
-    }
+    try:
+        fingerprint = await run_io(request_fingerprint, request)
+    except MediaUploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    # Start processing in background
-    asyncio.create_task(process_video_task(request, request_id))
+    # Attach resubmissions of identical content to the job already rendering it
+    existing = await run_io(job_store.find_by_fingerprint, fingerprint)
+    if existing is not None and existing["status"] == "completed" and not (
+        existing["file_path"] and os.path.exists(existing["file_path"])
+    ):
+        # The finished job's file is gone; fall through to the result cache
+        existing = None
+    record_cache("inflight", hit=existing is not None)
+    if existing is not None:
+        logger.info(f"[{request_id}] Duplicate of request {existing['request_id']} ({existing['status']})")
+        return JSONResponse(
+            status_code=202,
+            content={
+                "requestId": existing["request_id"],
+                "status": existing["status"],
+                "deduplicated": True,
+                **video_job_queue.status(existing["request_id"])
+            }
+        )
+    
+    await run_io(job_store.create, request_id, fingerprint)
+    await run_io(os.makedirs, job_dir(request_id), exist_ok=True)
+    
+    # Serve a previously rendered video for the same content straight from the cache
+    cached_path = os.path.join(job_dir(request_id), f"video_output_{request_id}.mp4")
+    cached_size = await run_io(result_cache.materialize, fingerprint, cached_path)
+    record_cache("result", hit=cached_size is not None)
+    if cached_size is not None:
+        logger.info(f"[{request_id}] Serving cached video for identical request")
+        await update_job(request_id, status="completed", file_path=cached_path, file_size=cached_size)
+        return JSONResponse(
+            status_code=202,
+            content={"requestId": request_id, "status": "completed", "cached": True}
+        )
+    
+    # Shed new renders that couldn't finish within the latency budget
+    try:
+        admit_video(video_job_queue)
+    except HTTPException:
+        await run_io(discard_job, request_id)
+        raise
+    
+    # Move uploaded media referenced by ID into the job directory
+    try:
+        for media_file in request.mediaFiles or []:
+            if media_file.mediaId:
+                await run_io(claim_upload, media_file.mediaId, job_dir(request_id))
+    except MediaUploadError as e:
+        await run_io(discard_job, request_id)
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Persist the request so the job can be resumed after a restart
+    await run_io(write_bytes, os.path.join(job_dir(request_id), "request.json"), request.json().encode())
+    
+    # Queue processing in background; reject when the queue is at capacity
+    try:
+        await video_job_queue.submit(request_id, lambda: process_video_task(request, request_id))
+    except QueueFullError as e:
+        await run_io(discard_job, request_id)
+        logger.warning(f"[{request_id}] Rejected video request: {str(e)}")
+        retry_after = math.ceil(video_job_queue.estimate_new_job() / (video_job_queue.queue_depth + 1))
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(max(1, retry_after))})
     
     # Return immediate response with task ID
     return JSONResponse(
         status_code=202,
         content={
             "requestId": request_id,
-            "status": "initializing"
+            "status": "queued",
+            **video_job_queue.status(request_id)
         }
     )
 
+async def download_video(request_id: str, request: Request):
+    """Download a finished video by ID (the downloadUrl sent on the progress stream).
+    
+    Supports Range and If-None-Match, and works any number of times until
+    the job's retention window (JOB_RESULT_TTL) has passed.
+    """
+    task_info = await run_io(job_store.get, request_id)
+    if task_info is None:
+        raise HTTPException(status_code=404, detail="Video task not found")
+    if task_info["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Video is not ready: {task_info['status']}")
+    return video_file_response(task_info, request.headers)
+
+async def video_progress_events(request_id: str, request: Request):
+    """Server-Sent Events stream of a video job's stage, render percentage and download URL"""
+    if await run_io(job_store.get, request_id) is None:
+        raise HTTPException(status_code=404, detail="Video task not found")
+    
+    async def event_stream():
+        last_event = None
+        idle_time = 0.0
+        with subscribe(request_id) as events:
+            while True:
+                # The store is authoritative, so jobs running in another worker are seen too
+                job = await run_io(job_store.get, request_id)
+                if job is None:
+                    yield f"event: error\ndata: {json.dumps({'requestId': request_id, 'error': 'Video task not found'})}\n\n"
+                    return
+                event = job_event(job)
+                if event != last_event:
+                    yield f"event: progress\ndata: {json.dumps(event)}\n\n"
+                    last_event = event
+                    idle_time = 0.0
+                elif idle_time >= PROGRESS_KEEPALIVE_INTERVAL:
+                    yield ": keep-alive\n\n"
+                    idle_time = 0.0
+                if job["status"] in TERMINAL_STATUSES or await request.is_disconnected():
+                    return
+                
+                # Wake on a local event, or poll for updates from other workers
+                try:
+                    await asyncio.wait_for(events.get(), timeout=PROGRESS_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    idle_time += PROGRESS_POLL_INTERVAL
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+async def upload_media(
+    request: Request,
+    filename: str = Query(...),
+    media_type: str = Query("image", alias="type")
+):
+    """Stream a raw image or video body to disk and return an ID for VideoRequest.mediaFiles"""
+    content_length = request.headers.get("content-length")
+    mime_type = request.headers.get("content-type", "application/octet-stream")
+    try:
+        metadata = await save_upload(
+            request.stream(),
+            filename,
+            media_type,
+            mime_type,
+            int(content_length) if content_length else None
+        )
+    except MediaTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except MediaUploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "mediaId": metadata["mediaId"],
+        "filename": metadata["filename"],
+        "mimeType": metadata["mimeType"],
+        "type": metadata["type"],
+        "size": metadata["size"]
+    }
+
+async def resume_orphaned_jobs():
+    """Re-queue unfinished jobs left behind by a crashed or restarted worker"""
+    for request_id in await run_io(job_store.claim_orphaned):
+        request_path = os.path.join(job_dir(request_id), "request.json")
+        try:
+            request = VideoRequest(**json.loads(await run_io(read_bytes, request_path)))
+            await run_io(job_store.update, request_id, status="queued")
+            await video_job_queue.submit(request_id, lambda r=request, i=request_id: process_video_task(r, i))
+            logger.info(f"[{request_id}] Resumed unfinished video job")
+        except Exception as e:
+            logger.error(f"[{request_id}] Could not resume video job: {str(e)}")
+            await run_io(job_store.update, request_id, status="error", error=f"Could not resume job: {str(e)}")
+
+async def evict_expired_jobs():
+    """Periodically drop finished jobs and their files once their TTL has passed, and orphaned workspaces"""
+    while True:
+        try:
+            await run_io(job_store.evict_expired, JOB_RESULT_TTL)
+            await run_io(evict_stale_uploads, JOB_RESULT_TTL)
+            # Walks every workspace root to recount usage
+            await run_io(workspace_manager.sweep)
+        except Exception as e:
+            logger.warning(f"Job eviction failed: {str(e)}")
+        await asyncio.sleep(JOB_EVICTION_INTERVAL)
+
 async def whisper_timestamped_handler(
     audio: UploadFile = File(...),
     text: str = Form(...)
 ):
     """Handle whisper timestamped requests"""
-    return await whisper_timestamped_endpoint(audio, text) 
\ No newline at end of file
+    return await whisper_timestamped_endpoint(audio, text) 
+
+async def metrics_endpoint():
+    """Prometheus metrics merged across every worker process on this host"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,86 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from config import (
+    IO_EXECUTOR_WORKERS,
+    INFERENCE_EXECUTOR,
+    INFERENCE_EXECUTOR_WORKERS,
+    INFERENCE_EXECUTOR_START_METHOD
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+_io_executor: Optional[ThreadPoolExecutor] = None
+_inference_executor: Optional[Executor] = None
+
+
+def get_io_executor() -> ThreadPoolExecutor:
+    """Thread pool for blocking file, subprocess and decode work"""
+    global _io_executor
+    if _io_executor is None:
+        _io_executor = ThreadPoolExecutor(max_workers=IO_EXECUTOR_WORKERS, thread_name_prefix="io")
+    return _io_executor
+
+
+def get_inference_executor() -> Executor:
+    """Pool for RVC and Whisper inference.
+
+    "thread" shares the loaded models with the API process; "process" runs
+    inference in separate processes that each load the models they use,
+    which sidesteps the GIL for the Python-heavy parts (harvest, librosa).
+    Functions sent to the process pool must be module-level and take
+    picklable arguments such as file paths.
+    """
+    global _inference_executor
+    if _inference_executor is None:
+        if INFERENCE_EXECUTOR == "process":
+            _inference_executor = ProcessPoolExecutor(
+                max_workers=INFERENCE_EXECUTOR_WORKERS,
+                mp_context=multiprocessing.get_context(INFERENCE_EXECUTOR_START_METHOD)
+            )
+        elif INFERENCE_EXECUTOR == "thread":
+            _inference_executor = ThreadPoolExecutor(
+                max_workers=INFERENCE_EXECUTOR_WORKERS, thread_name_prefix="inference"
+            )
+        else:
+            raise ValueError(f"Unknown inference executor: {INFERENCE_EXECUTOR}")
+        logger.info(f"Inference executor: {INFERENCE_EXECUTOR} pool with {INFERENCE_EXECUTOR_WORKERS} workers")
+    return _inference_executor
+
+
+def _bind_call(executor: Executor, func: Callable, args, kwargs) -> Callable:
+    call = functools.partial(func, *args, **kwargs)
+    if isinstance(executor, ThreadPoolExecutor):
+        # Carry context variables (the current trace span) into the worker thread;
+        # process pools only get picklable arguments
+        return functools.partial(contextvars.copy_context().run, call)
+    return call
+
+
+async def run_io(func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking I/O-bound call on the I/O thread pool"""
+    loop = asyncio.get_running_loop()
+    executor = get_io_executor()
+    return await loop.run_in_executor(executor, _bind_call(executor, func, args, kwargs))
+
+
+async def run_inference(func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking model inference call on the inference pool"""
+    loop = asyncio.get_running_loop()
+    executor = get_inference_executor()
+    return await loop.run_in_executor(executor, _bind_call(executor, func, args, kwargs))
+
+
+def shutdown_executors():
+    """Stop both pools (call from the app lifespan on shutdown)"""
+    global _io_executor, _inference_executor
+    for executor in (_inference_executor, _io_executor):
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+    _io_executor = _inference_executor = None
@@ -0,0 +1,135 @@
+import asyncio
+import heapq
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when the video job queue has no room for another job"""
+
+
+class VideoJobQueue:
+    """FIFO queue of video jobs served by a fixed-size pool of async workers"""
+
+    def __init__(self, max_concurrent: int, max_queued: int, default_duration: float):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queued = max(0, max_queued)
+        self.default_duration = default_duration
+
+        self._pending: "OrderedDict[str, Callable[[], Awaitable[None]]]" = OrderedDict()
+        self._running: Dict[str, float] = {}
+        self._wakeup: Optional[asyncio.Condition] = None
+        self._workers = []
+        # Exponential moving average of completed job durations, used for ETAs
+        self._avg_duration = default_duration
+
+    async def start(self):
+        """Start the worker pool (call once from the app lifespan)"""
+        if self._workers:
+            return
+        self._wakeup = asyncio.Condition()
+        for i in range(self.max_concurrent):
+            self._workers.append(asyncio.create_task(self._worker(i)))
+        logger.info(f"Video job queue started with {self.max_concurrent} workers, max {self.max_queued} queued")
+
+    async def stop(self):
+        """Cancel the workers; queued jobs are dropped"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._pending.clear()
+
+    async def submit(self, request_id: str, job: Callable[[], Awaitable[None]]):
+        """Enqueue a job, raising QueueFullError when the queue is at capacity"""
+        if len(self._pending) >= self.max_queued:
+            raise QueueFullError(f"Video queue is full ({self.max_queued} jobs waiting)")
+        if self._wakeup is None:
+            await self.start()
+
+        self._pending[request_id] = job
+        async with self._wakeup:
+            self._wakeup.notify()
+        logger.info(f"[{request_id}] Queued video job at position {len(self._pending)}")
+
+    async def _worker(self, worker_id: int):
+        while True:
+            async with self._wakeup:
+                await self._wakeup.wait_for(lambda: bool(self._pending))
+                request_id, job = self._pending.popitem(last=False)
+
+            started_at = time.monotonic()
+            self._running[request_id] = started_at
+            logger.info(f"[{request_id}] Worker {worker_id} picked up video job")
+            try:
+                await job()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[{request_id}] Video job failed in worker {worker_id}: {str(e)}")
+            finally:
+                del self._running[request_id]
+                elapsed = time.monotonic() - started_at
+                self._avg_duration = 0.7 * self._avg_duration + 0.3 * elapsed
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._pending)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._running)
+
+    def position(self, request_id: str) -> Optional[int]:
+        """1-based position of a queued job, or None if it is not waiting"""
+        for index, queued_id in enumerate(self._pending):
+            if queued_id == request_id:
+                return index + 1
+        return None
+
+    def estimate_wait(self, request_id: str) -> Optional[float]:
+        """Estimated seconds until the job finishes, or None if the job is unknown"""
+        now = time.monotonic()
+        avg = self._avg_duration
+
+        if request_id in self._running:
+            return max(avg - (now - self._running[request_id]), 0.0)
+
+        position = self.position(request_id)
+        if position is None:
+            return None
+        return self._simulate_finish(position)
+
+    def estimate_new_job(self) -> float:
+        """Estimated seconds until a job submitted now would finish"""
+        return self._simulate_finish(len(self._pending) + 1)
+
+    def _simulate_finish(self, position: int) -> float:
+        # Simulate the worker pool: each slot frees up when its current job
+        # is expected to finish, then takes the next queued job in order.
+        now = time.monotonic()
+        avg = self._avg_duration
+        slots = [max(avg - (now - started), 0.0) for started in self._running.values()]
+        slots += [0.0] * (self.max_concurrent - len(slots))
+        heapq.heapify(slots)
+        finish = 0.0
+        for _ in range(position):
+            finish = heapq.heappop(slots) + avg
+            heapq.heappush(slots, finish)
+        return finish
+
+    def status(self, request_id: str) -> Dict:
+        """Queue position and ETA fields for a status payload"""
+        info = {}
+        position = self.position(request_id)
+        if position is not None:
+            info["queuePosition"] = position
+        eta = self.estimate_wait(request_id)
+        if eta is not None:
+            info["etaSeconds"] = round(eta, 1)
+        return info
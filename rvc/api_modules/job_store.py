@@ -0,0 +1,383 @@
+import abc
+import json
+import logging
+import os
+import shutil
+import socket
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from config import JOB_STORE_BACKEND, JOB_STORE_PATH, JOB_DATA_DIR
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("completed", "error")
+
+JOB_FIELDS = ("status", "error", "file_path", "file_size", "owner", "progress", "trace_id", "timeline")
+
+# Fields stored as JSON text by the SQLite backend
+JSON_FIELDS = ("timeline",)
+
+
+def job_dir(request_id: str) -> str:
+    """Directory holding a job's request payload and stage checkpoints"""
+    return os.path.join(JOB_DATA_DIR, request_id)
+
+
+def current_owner() -> str:
+    """Identifier of this worker process, recorded on the jobs it runs"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def owner_alive(owner: Optional[str]) -> bool:
+    if not owner:
+        return False
+    host, _, pid = owner.rpartition(":")
+    if host != socket.gethostname():
+        # Can't probe processes on another host; assume it's still running
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except (OSError, ValueError):
+        return False
+    return True
+
+
+class JobStore(abc.ABC):
+    """Interface for video job state shared across workers and restarts"""
+
+    @abc.abstractmethod
+    def create(self, request_id: str, fingerprint: Optional[str] = None) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get(self, request_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def update(self, request_id: str, **fields) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def delete(self, request_id: str) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def set_checkpoint(self, request_id: str, stage: str, value: Any) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_checkpoints(self, request_id: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def find_by_fingerprint(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Most recent job for identical input that hasn't failed, if any"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def claim_orphaned(self) -> List[str]:
+        """Take ownership of unfinished jobs whose worker died, returning their ids"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def finished_before(self, cutoff: float) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def checkpoints(self, request_id: str) -> "JobCheckpoints":
+        return JobCheckpoints(self, request_id)
+
+    def evict_expired(self, ttl: float) -> int:
+        """Remove finished jobs older than ttl seconds along with their files"""
+        evicted = 0
+        for job in self.finished_before(time.time() - ttl):
+            remove_job_files(job)
+            self.delete(job["request_id"])
+            evicted += 1
+        if evicted:
+            logger.info(f"Evicted {evicted} expired video jobs")
+        return evicted
+
+
+def remove_job_files(job: Dict[str, Any]) -> None:
+    """Delete a job's workspace directory and its result file"""
+    shutil.rmtree(job_dir(job["request_id"]), ignore_errors=True)
+    file_path = job.get("file_path")
+    if file_path:
+        try:
+            os.unlink(file_path)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Failed to remove {file_path}: {str(e)}")
+
+
+class MemoryJobStore(JobStore):
+    """Process-local store; state is lost on restart"""
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._checkpoints: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def create(self, request_id: str, fingerprint: Optional[str] = None) -> None:
+        now = time.time()
+        with self._lock:
+            self._jobs[request_id] = {
+                "request_id": request_id,
+                "fingerprint": fingerprint,
+                "status": "queued",
+                "error": None,
+                "file_path": None,
+                "file_size": None,
+                "owner": current_owner(),
+                "progress": None,
+                "trace_id": None,
+                "timeline": None,
+                "created_at": now,
+                "updated_at": now,
+                "finished_at": None,
+            }
+            self._checkpoints[request_id] = {}
+
+    def get(self, request_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(request_id)
+            return dict(job) if job else None
+
+    def update(self, request_id: str, **fields) -> None:
+        now = time.time()
+        with self._lock:
+            job = self._jobs.get(request_id)
+            if job is None:
+                return
+            job.update({k: v for k, v in fields.items() if k in JOB_FIELDS})
+            job["updated_at"] = now
+            if fields.get("status") in TERMINAL_STATUSES:
+                job["finished_at"] = now
+
+    def delete(self, request_id: str) -> None:
+        with self._lock:
+            self._jobs.pop(request_id, None)
+            self._checkpoints.pop(request_id, None)
+
+    def set_checkpoint(self, request_id: str, stage: str, value: Any) -> None:
+        with self._lock:
+            self._checkpoints.setdefault(request_id, {})[stage] = value
+
+    def get_checkpoints(self, request_id: str) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._checkpoints.get(request_id, {}))
+
+    def find_by_fingerprint(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            matches = [
+                job for job in self._jobs.values()
+                if job["fingerprint"] == fingerprint and job["status"] != "error"
+            ]
+            return dict(max(matches, key=lambda job: job["created_at"])) if matches else None
+
+    def claim_orphaned(self) -> List[str]:
+        # Nothing survives a restart of this backend
+        return []
+
+    def finished_before(self, cutoff: float) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                dict(job) for job in self._jobs.values()
+                if job["finished_at"] is not None and job["finished_at"] < cutoff
+            ]
+
+
+class SQLiteJobStore(JobStore):
+    """Store backed by a single SQLite file, safe to share between workers on one host"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        request_id TEXT PRIMARY KEY,
+        fingerprint TEXT,
+        status TEXT NOT NULL,
+        error TEXT,
+        file_path TEXT,
+        file_size INTEGER,
+        owner TEXT,
+        progress REAL,
+        trace_id TEXT,
+        timeline TEXT,
+        created_at REAL NOT NULL,
+        updated_at REAL NOT NULL,
+        finished_at REAL
+    );
+    CREATE INDEX IF NOT EXISTS jobs_finished_at ON jobs (finished_at);
+    CREATE INDEX IF NOT EXISTS jobs_fingerprint ON jobs (fingerprint);
+    CREATE TABLE IF NOT EXISTS checkpoints (
+        request_id TEXT NOT NULL,
+        stage TEXT NOT NULL,
+        value TEXT NOT NULL,
+        PRIMARY KEY (request_id, stage)
+    );
+    """
+
+    ADDED_COLUMNS = (
+        ("progress", "REAL"),
+        ("fingerprint", "TEXT"),
+        ("trace_id", "TEXT"),
+        ("timeline", "TEXT"),
+    )
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        conn = self._connect()
+        self._migrate(conn)
+        conn.executescript(self.SCHEMA)
+
+    def _migrate(self, conn: sqlite3.Connection):
+        """Add columns introduced after a database file was first created"""
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+        if not columns:
+            # Fresh database, the schema creates everything
+            return
+        for name, column_type in self.ADDED_COLUMNS:
+            if name not in columns:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {column_type}")
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread, and never reuse one inherited across a fork
+        if getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return self._local.conn
+
+    def create(self, request_id: str, fingerprint: Optional[str] = None) -> None:
+        now = time.time()
+        self._connect().execute(
+            "INSERT OR REPLACE INTO jobs (request_id, fingerprint, status, owner, created_at, updated_at) "
+            "VALUES (?, ?, 'queued', ?, ?, ?)",
+            (request_id, fingerprint, current_owner(), now, now),
+        )
+
+    def get(self, request_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            "SELECT * FROM jobs WHERE request_id = ?", (request_id,)
+        ).fetchone()
+        return _decode_row(row)
+
+    def update(self, request_id: str, **fields) -> None:
+        fields = {
+            k: json.dumps(v) if k in JSON_FIELDS and v is not None else v
+            for k, v in fields.items() if k in JOB_FIELDS
+        }
+        now = time.time()
+        fields["updated_at"] = now
+        if fields.get("status") in TERMINAL_STATUSES:
+            fields["finished_at"] = now
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        self._connect().execute(
+            f"UPDATE jobs SET {assignments} WHERE request_id = ?",
+            (*fields.values(), request_id),
+        )
+
+    def delete(self, request_id: str) -> None:
+        conn = self._connect()
+        conn.execute("DELETE FROM checkpoints WHERE request_id = ?", (request_id,))
+        conn.execute("DELETE FROM jobs WHERE request_id = ?", (request_id,))
+
+    def set_checkpoint(self, request_id: str, stage: str, value: Any) -> None:
+        self._connect().execute(
+            "INSERT OR REPLACE INTO checkpoints (request_id, stage, value) VALUES (?, ?, ?)",
+            (request_id, stage, json.dumps(value)),
+        )
+
+    def get_checkpoints(self, request_id: str) -> Dict[str, Any]:
+        rows = self._connect().execute(
+            "SELECT stage, value FROM checkpoints WHERE request_id = ?", (request_id,)
+        ).fetchall()
+        return {row["stage"]: json.loads(row["value"]) for row in rows}
+
+    def find_by_fingerprint(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            "SELECT * FROM jobs WHERE fingerprint = ? AND status != 'error' "
+            "ORDER BY created_at DESC LIMIT 1",
+            (fingerprint,),
+        ).fetchone()
+        return _decode_row(row)
+
+    def claim_orphaned(self) -> List[str]:
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT request_id, owner FROM jobs WHERE finished_at IS NULL"
+        ).fetchall()
+        claimed = []
+        owner = current_owner()
+        for row in rows:
+            if owner_alive(row["owner"]):
+                continue
+            # Compare-and-set so only one worker picks up each orphaned job
+            cursor = conn.execute(
+                "UPDATE jobs SET owner = ?, updated_at = ? WHERE request_id = ? AND owner IS ?",
+                (owner, time.time(), row["request_id"], row["owner"]),
+            )
+            if cursor.rowcount == 1:
+                claimed.append(row["request_id"])
+        return claimed
+
+    def finished_before(self, cutoff: float) -> List[Dict[str, Any]]:
+        rows = self._connect().execute(
+            "SELECT * FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (cutoff,)
+        ).fetchall()
+        return [_decode_row(row) for row in rows]
+
+
+def _decode_row(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+    if row is None:
+        return None
+    job = dict(row)
+    for name in JSON_FIELDS:
+        if job.get(name) is not None:
+            job[name] = json.loads(job[name])
+    return job
+
+
+class JobCheckpoints:
+    """Stage checkpoints of one job, with files kept in the job directory"""
+
+    def __init__(self, store: JobStore, request_id: str):
+        self.store = store
+        self.request_id = request_id
+        self.dir = job_dir(request_id)
+        os.makedirs(self.dir, exist_ok=True)
+        self._values = store.get_checkpoints(request_id)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.dir, name)
+
+    def get(self, stage: str) -> Any:
+        value = self._values.get(stage)
+        # Checkpoints that point at files are only valid while the file exists
+        if isinstance(value, dict) and "path" in value and not os.path.exists(value["path"]):
+            return None
+        return value
+
+    def set(self, stage: str, value: Any) -> None:
+        self._values[stage] = value
+        self.store.set_checkpoint(self.request_id, stage, value)
+
+
+def create_job_store() -> JobStore:
+    if JOB_STORE_BACKEND == "memory":
+        return MemoryJobStore()
+    if JOB_STORE_BACKEND == "sqlite":
+        return SQLiteJobStore(JOB_STORE_PATH)
+    raise ValueError(f"Unknown job store backend: {JOB_STORE_BACKEND}")
+
+
+job_store = create_job_store()
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from typing import AsyncIterator, Dict, Optional
+
+from config import MEDIA_UPLOAD_DIR, MEDIA_MAX_IMAGE_MB, MEDIA_MAX_VIDEO_MB
+from video.file_utils import write_bytes
+from .executors import run_io
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+MEDIA_TYPES = ("image", "video")
+
+_MEDIA_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+
+class MediaUploadError(Exception):
+    """Raised for uploads that are malformed or reference unknown media"""
+
+
+class MediaTooLargeError(MediaUploadError):
+    """Raised as soon as an upload grows past its size limit"""
+
+
+def max_media_bytes(media_type: str) -> int:
+    limit_mb = MEDIA_MAX_VIDEO_MB if media_type == "video" else MEDIA_MAX_IMAGE_MB
+    return int(limit_mb * 1024 * 1024)
+
+
+def _upload_path(media_id: str) -> str:
+    if not _MEDIA_ID_PATTERN.fullmatch(media_id):
+        raise MediaUploadError(f"Invalid media ID: {media_id}")
+    return os.path.join(MEDIA_UPLOAD_DIR, media_id)
+
+
+def _append(file_obj, digest, chunk: bytes):
+    file_obj.write(chunk)
+    digest.update(chunk)
+
+
+async def save_upload(
+    chunks: AsyncIterator[bytes],
+    filename: str,
+    media_type: str,
+    mime_type: str,
+    content_length: Optional[int] = None
+) -> Dict:
+    """Stream an upload to disk chunk by chunk, enforcing the size limit as it arrives"""
+    if media_type not in MEDIA_TYPES:
+        raise MediaUploadError(f"Unknown media type: {media_type}. Expected one of {list(MEDIA_TYPES)}")
+
+    max_bytes = max_media_bytes(media_type)
+    if content_length is not None and content_length > max_bytes:
+        raise MediaTooLargeError(f"{filename} exceeds the {max_bytes // (1024 * 1024)}MB {media_type} limit")
+
+    os.makedirs(MEDIA_UPLOAD_DIR, exist_ok=True)
+    media_id = uuid.uuid4().hex
+    path = _upload_path(media_id)
+    partial_path = path + ".part"
+
+    size = 0
+    digest = hashlib.sha256()
+    file_obj = await run_io(open, partial_path, "wb")
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > max_bytes:
+                raise MediaTooLargeError(f"{filename} exceeds the {max_bytes // (1024 * 1024)}MB {media_type} limit")
+            await run_io(_append, file_obj, digest, chunk)
+        await run_io(file_obj.close)
+        await run_io(os.replace, partial_path, path)
+    except BaseException:
+        file_obj.close()
+        try:
+            os.unlink(partial_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+    metadata = {
+        "mediaId": media_id,
+        "filename": filename,
+        "mimeType": mime_type,
+        "type": media_type,
+        "size": size,
+        "sha256": digest.hexdigest(),
+        "created_at": time.time()
+    }
+    await run_io(write_bytes, path + ".json", json.dumps(metadata).encode())
+    logger.info(f"Stored upload {media_id}: {filename} ({size / (1024 * 1024):.1f}MB)")
+    return metadata
+
+
+def upload_digest(media_id: str) -> str:
+    """SHA-256 of an unclaimed upload's content, recorded when it was stored"""
+    path = _upload_path(media_id)
+    try:
+        with open(path + ".json") as f:
+            return json.load(f)["sha256"]
+    except (FileNotFoundError, KeyError, ValueError):
+        raise MediaUploadError(f"Unknown media ID: {media_id}")
+
+
+def claim_upload(media_id: str, dest_dir: str) -> str:
+    """Move an upload into a job directory and return its new path"""
+    path = _upload_path(media_id)
+    dest_path = os.path.join(dest_dir, f"media_{media_id}")
+    if os.path.exists(dest_path):
+        # Already claimed, e.g. by a job that is being resumed
+        return dest_path
+    if not os.path.exists(path):
+        raise MediaUploadError(f"Unknown media ID: {media_id}")
+    os.makedirs(dest_dir, exist_ok=True)
+    os.replace(path, dest_path)
+    try:
+        os.unlink(path + ".json")
+    except FileNotFoundError:
+        pass
+    return dest_path
+
+
+def claimed_upload_path(media_id: str, job_directory: str) -> str:
+    _upload_path(media_id)
+    return os.path.join(job_directory, f"media_{media_id}")
+
+
+def evict_stale_uploads(ttl: float) -> int:
+    """Delete uploads that no video request claimed within ttl seconds"""
+    if not os.path.isdir(MEDIA_UPLOAD_DIR):
+        return 0
+    cutoff = time.time() - ttl
+    evicted = 0
+    for name in os.listdir(MEDIA_UPLOAD_DIR):
+        path = os.path.join(MEDIA_UPLOAD_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.unlink(path)
+                evicted += 1
+        except FileNotFoundError:
+            continue
+    if evicted:
+        logger.info(f"Evicted {evicted} stale upload files")
+    return evicted
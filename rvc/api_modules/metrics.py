@@ -0,0 +1,386 @@
+"""In-process metrics rendered in the Prometheus text exposition format.
+
+Every process (API workers forked by serve.py, process-pool inference
+workers) records into its own registry and periodically writes a snapshot
+to METRICS_DIR from a background thread. /metrics merges the snapshots of
+all live processes on the host, so a scrape sees the totals no matter which
+worker answers it. Counters and histograms add up; each gauge declares how
+its per-process values combine (sum, max or the most recently written).
+"""
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+from config import METRICS_DIR, METRICS_FLUSH_INTERVAL
+from .tracing import span
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+SIZE_BUCKETS = tuple(float(mb * 1024 * 1024) for mb in (1, 5, 10, 25, 50, 100, 250, 500))
+
+# How one series' values from different processes combine; "last" keeps the
+# value from the most recently written snapshot
+MERGE_MODES: Dict[str, Callable[[float, float], float]] = {
+    "sum": lambda current, value: current + value,
+    "max": max,
+    "last": lambda current, value: value,
+}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    type = ""
+    merge = "sum"
+
+    def __init__(self, registry: "Registry", name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def reset(self):
+        self._values.clear()
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        self.registry.ensure_flusher()
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def __init__(self, registry, name, documentation, labelnames=(), merge="sum"):
+        super().__init__(registry, name, documentation, labelnames)
+        if merge not in MERGE_MODES:
+            raise ValueError(f"Unknown merge mode for {name}: {merge}")
+        self.merge = merge
+
+    def set(self, value: float, **labels):
+        with self.registry.lock:
+            self._values[self._key(labels)] = value
+        self.registry.ensure_flusher()
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["buckets"][i] += 1
+            state["sum"] += value
+            state["count"] += 1
+        self.registry.ensure_flusher()
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the wall time of the enclosed block, including awaits inside it"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+
+class Registry:
+    def __init__(self, directory: str, flush_interval: float):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.lock = threading.RLock()
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._flusher_pid = None
+
+    def _register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (), merge: str = "sum") -> Gauge:
+        return self._register(Gauge(self, name, documentation, labelnames, merge))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]):
+        """Register a callback that refreshes gauges right before a snapshot is taken"""
+        self._collectors.append(collector)
+
+    def reset(self):
+        """Forget all values (used in forked children so the parent's aren't counted twice)"""
+        with self.lock:
+            for metric in self._metrics.values():
+                metric.reset()
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {str(e)}")
+        with self.lock:
+            return {
+                metric.name: {json.dumps(key): json.loads(json.dumps(value)) for key, value in metric._values.items()}
+                for metric in self._metrics.values()
+            }
+
+    def _snapshot_path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"{pid}.json")
+
+    def flush(self):
+        """Write this process's snapshot for other workers to merge"""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._snapshot_path(os.getpid())
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"written_at": time.time(), "metrics": self.snapshot()}, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Failed to write metrics snapshot: {str(e)}")
+
+    def ensure_flusher(self):
+        """Start this process's flush thread on its first recorded value (again after a fork)"""
+        if self._flusher_pid == os.getpid():
+            return
+        with self.lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True).start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(max(self.flush_interval, 0.1))
+            self.flush()
+
+    def _peer_snapshots(self) -> Iterator[Tuple[float, Dict[str, Dict[str, object]]]]:
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            pid_text, ext = os.path.splitext(name)
+            if ext != ".json" or not pid_text.isdigit() or int(pid_text) == os.getpid():
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                os.kill(int(pid_text), 0)
+            except ProcessLookupError:
+                # The process is gone; drop its snapshot
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                continue
+            except PermissionError:
+                pass
+            try:
+                with open(path) as f:
+                    peer = json.load(f)
+                yield peer["written_at"], peer["metrics"]
+            except (FileNotFoundError, ValueError, KeyError, TypeError):
+                continue
+
+    def render(self) -> str:
+        """Prometheus text format of this process merged with every live peer"""
+        # Oldest first, ending with this process, so "last" gauges keep the freshest value
+        snapshots = sorted(self._peer_snapshots(), key=lambda peer: peer[0])
+        snapshots.append((time.time(), self.snapshot()))
+        merged: Dict[str, Dict[str, object]] = {}
+        for _, snapshot in snapshots:
+            for name, series in snapshot.items():
+                metric = self._metrics.get(name)
+                merge = MERGE_MODES[metric.merge if metric is not None else "sum"]
+                target = merged.setdefault(name, {})
+                for key, value in series.items():
+                    current = target.get(key)
+                    if current is None:
+                        target[key] = value
+                    elif isinstance(value, dict):
+                        current["buckets"] = [a + b for a, b in zip(current["buckets"], value["buckets"])]
+                        current["sum"] += value["sum"]
+                        current["count"] += value["count"]
+                    else:
+                        target[key] = merge(current, value)
+
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for key, value in sorted(merged.get(metric.name, {}).items()):
+                label_values = json.loads(key)
+                if isinstance(metric, Histogram):
+                    for bound, count in zip(metric.buckets, value["buckets"]):
+                        labels = _format_labels(metric.labelnames, label_values, f'le="{_format_value(bound)}"')
+                        lines.append(f"{metric.name}_bucket{labels} {count}")
+                    labels = _format_labels(metric.labelnames, label_values)
+                    lines.append(f"{metric.name}_sum{labels} {_format_value(value['sum'])}")
+                    lines.append(f"{metric.name}_count{labels} {value['count']}")
+                else:
+                    labels = _format_labels(metric.labelnames, label_values)
+                    lines.append(f"{metric.name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry(METRICS_DIR, METRICS_FLUSH_INTERVAL)
+
+# Pipeline stages: media_decode, tts, rvc, f0, hubert, index_search, whisper,
+# subtitles, ffmpeg_concat, ffmpeg_render. Video-level stages have empty
+# character and f0_method labels.
+stage_duration = registry.histogram(
+    "rvc_stage_duration_seconds", "Time spent in each video pipeline stage",
+    ("stage", "character", "f0_method")
+)
+video_queue_depth = registry.gauge("rvc_video_queue_depth", "Video jobs waiting for a worker")
+video_jobs_in_flight = registry.gauge("rvc_video_jobs_in_flight", "Video jobs currently running")
+video_jobs_total = registry.counter("rvc_video_jobs_total", "Finished video jobs by outcome", ("status",))
+model_load_duration = registry.histogram(
+    "rvc_model_load_seconds", "Time to load a character's RVC model", ("character",)
+)
+# Every worker holds its own copy of a loaded model, so these add up
+model_resident_bytes = registry.gauge(
+    "rvc_model_resident_bytes", "Memory held by a loaded character's synthesizer and index", ("character",),
+    merge="sum"
+)
+model_evictions = registry.counter(
+    "rvc_model_evictions_total", "Character models unloaded to stay within MODEL_MEMORY_BUDGET_MB", ("character",)
+)
+warmup_duration = registry.gauge(
+    "rvc_warmup_seconds", "Time spent on startup warm-up inference", ("component",), merge="max"
+)
+cache_requests = registry.counter(
+    "rvc_cache_requests_total", "Cache lookups by cache and result (hit, miss or coalesced)", ("cache", "result")
+)
+video_output_bytes = registry.histogram(
+    "rvc_video_output_bytes", "Size of rendered videos", buckets=SIZE_BUCKETS
+)
+tts_hedges = registry.counter(
+    "rvc_tts_hedges_total", "Hedged TTS calls by which request answered first (primary, hedge or none)", ("winner",)
+)
+tts_hedge_delay = registry.gauge(
+    "rvc_tts_hedge_delay_seconds", "Current wait before a TTS call is hedged", merge="last"
+)
+# Mmapped big_npy pages are shared by every process, so summing would count them once per worker
+faiss_index_bytes = registry.gauge(
+    "rvc_faiss_index_bytes", "Memory held by loaded retrieval indexes (big_npy is shared when mmapped)",
+    ("index", "part"), merge="max"
+)
+voice_output_seconds = registry.histogram(
+    "rvc_voice_output_seconds", "Duration of converted voice lines",
+    ("character", "f0_method"), buckets=(1, 2, 5, 10, 20, 30, 60, 120)
+)
+
+
+class RecentTimings:
+    """Exponential moving averages of recent stage durations in this process.
+
+    Histograms describe the whole lifetime; admission control needs to know
+    how long a stage takes right now.
+    """
+
+    def __init__(self, alpha: float = 0.3):
+        self.alpha = alpha
+        self._averages: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float, character: str = ""):
+        with self._lock:
+            for key in {(stage, ""), (stage, character)}:
+                previous = self._averages.get(key)
+                self._averages[key] = seconds if previous is None else (
+                    (1 - self.alpha) * previous + self.alpha * seconds
+                )
+
+    def get(self, stage: str, default: float, character: str = "") -> float:
+        """Recent average for the character, else for the stage overall, else default"""
+        with self._lock:
+            return self._averages.get((stage, character), self._averages.get((stage, ""), default))
+
+
+recent_timings = RecentTimings()
+
+
+def observe_stage(stage: str, seconds: float, character: str = "", f0_method: str = "", recent: bool = True):
+    stage_duration.observe(seconds, stage=stage, character=character, f0_method=f0_method)
+    if recent:
+        recent_timings.record(stage, seconds, character)
+
+
+@contextmanager
+def time_stage(stage: str, character: str = "", f0_method: str = "", recent: bool = True) -> Iterator[None]:
+    """Time one pipeline stage, also recording it as a span of the current trace.
+
+    recent=False leaves recent_timings to the caller, for stages that may run
+    in an inference worker process whose averages admission control never sees.
+    """
+    attributes = {name: value for name, value in (("character", character), ("f0_method", f0_method)) if value}
+    started = time.perf_counter()
+    with span(stage, **attributes):
+        try:
+            yield
+        finally:
+            observe_stage(stage, time.perf_counter() - started, character, f0_method, recent)
+
+
+def record_cache(cache: str, hit: bool):
+    cache_requests.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def _after_fork():
+    # The parent's flush thread may have held these locks at the fork; that
+    # thread doesn't exist here, so the copies could never be released
+    registry.lock = threading.RLock()
+    recent_timings._lock = threading.Lock()
+    registry.reset()
+    registry.ensure_flusher()
+
+
+# A forked child starts with a copy of the parent's values; clear them so the
+# parent's own snapshot is the only place they are counted, and start the
+# child's own flush thread (threads don't survive a fork)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
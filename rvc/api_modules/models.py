@@ -14,7 +14,8 @@ class ConversationTurn(BaseModel):
     imageOverlays: Optional[List[ImageOverlayData]] = None
 
 class MediaFile(BaseModel):
-    data: str  # base64 encoded file data
+    data: Optional[str] = None  # base64 encoded file data (legacy inline upload)
+    mediaId: Optional[str] = None  # ID returned by POST /media, preferred for large files
     mimeType: str
     filename: str
     type: str  # 'image' or 'video'
@@ -27,4 +28,11 @@ class VideoRequest(BaseModel):
     conversation: Optional[List[ConversationTurn]] = None
     mediaFiles: Optional[List[MediaFile]] = None
     requestId: Optional[str] = None  # For polling status
-    isStatusCheck: Optional[bool] = False  # To distinguish between new requests and status checks 
\ No newline at end of file
+    isStatusCheck: Optional[bool] = False  # To distinguish between new requests and status checks 
+
+class BatchTTSLine(BaseModel):
+    text: str
+    character: str = "peter"
+
+class BatchTTSRequest(BaseModel):
+    lines: List[BatchTTSLine]
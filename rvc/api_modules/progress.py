@@ -0,0 +1,34 @@
+import asyncio
+import logging
+from contextlib import contextmanager
+from typing import Dict, Iterator, Set
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Subscriber queues per request ID, fed by the worker running the job
+_subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+
+def publish(request_id: str, event: Dict) -> None:
+    """Push a progress event to every listener of a job in this process"""
+    for queue in list(_subscribers.get(request_id, ())):
+        if queue.full():
+            # Slow consumer: drop the oldest event, the latest state matters most
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+
+@contextmanager
+def subscribe(request_id: str, max_pending: int = 100) -> Iterator[asyncio.Queue]:
+    """Register a queue that receives the job's progress events while in scope"""
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+    _subscribers.setdefault(request_id, set()).add(queue)
+    try:
+        yield queue
+    finally:
+        listeners = _subscribers.get(request_id)
+        if listeners is not None:
+            listeners.discard(queue)
+            if not listeners:
+                del _subscribers[request_id]
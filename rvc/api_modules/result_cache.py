@@ -0,0 +1,143 @@
+import base64
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Optional
+
+from config import RESULT_CACHE_DIR, RESULT_CACHE_MAX_MB
+from .media_store import upload_digest
+from .models import VideoRequest
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def request_fingerprint(request: VideoRequest) -> str:
+    """Content hash of everything that affects the rendered video.
+
+    Blocking (decodes and hashes inline media), so call it through run_io.
+    Media are identified by the digest of their bytes, so the same file sent
+    inline or as an upload yields the same fingerprint.
+    """
+    turns = []
+    for turn in request.conversation or []:
+        overlays = [overlay.dict() for overlay in turn.imageOverlays or []]
+        turns.append({
+            "stewie": turn.stewie.strip() if turn.stewie else None,
+            "peter": turn.peter.strip() if turn.peter else None,
+            "imageOverlays": sorted(overlays, key=lambda overlay: json.dumps(overlay, sort_keys=True))
+        })
+
+    media = []
+    for media_file in request.mediaFiles or []:
+        if media_file.mediaId:
+            digest = upload_digest(media_file.mediaId)
+        else:
+            digest = hashlib.sha256(base64.b64decode(media_file.data or "")).hexdigest()
+        media.append({"filename": media_file.filename, "type": media_file.type, "sha256": digest})
+    media.sort(key=lambda item: item["filename"])
+
+    normalized = json.dumps({"conversation": turns, "media": media}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def _link_or_copy(src: str, dest: str):
+    # Hard links keep one copy on disk; fall back to copying across filesystems
+    tmp_path = f"{dest}.{os.getpid()}.tmp"
+    try:
+        os.link(src, tmp_path)
+    except OSError:
+        shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dest)
+
+
+class ResultCache:
+    """Size-bounded LRU store of result files keyed by content fingerprint.
+
+    Entries are plain files named after the fingerprint, with the time of
+    last use kept in the atime, so every worker on the host shares the same
+    cache. The mtime is left alone: entries are hard-linked into job
+    directories, and it is part of a delivered video's ETag.
+    Used for finished videos here and for TTS audio (see tts_cache).
+    """
+
+    def __init__(self, directory: str, max_bytes: int, suffix: str = ".mp4", kind: str = "videos"):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.kind = kind
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _path(self, fingerprint: str) -> str:
+        return os.path.join(self.directory, f"{fingerprint}{self.suffix}")
+
+    def get(self, fingerprint: str) -> Optional[str]:
+        """Path of the cached video, marking it as recently used"""
+        if not self.enabled:
+            return None
+        path = self._path(fingerprint)
+        try:
+            stat = os.stat(path)
+            os.utime(path, ns=(time.time_ns(), stat.st_mtime_ns))
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, fingerprint: str, file_path: str):
+        """Add a result file, then evict least recently used entries over the budget"""
+        if not self.enabled or os.path.getsize(file_path) > self.max_bytes:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        _link_or_copy(file_path, self._path(fingerprint))
+        self.evict()
+
+    def materialize(self, fingerprint: str, dest_path: str) -> Optional[int]:
+        """Place a cached file at dest_path and return its size, or None on a miss"""
+        path = self.get(fingerprint)
+        if path is None:
+            return None
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        try:
+            _link_or_copy(path, dest_path)
+        except FileNotFoundError:
+            # Evicted between lookup and link
+            return None
+        return os.path.getsize(dest_path)
+
+    def evict(self) -> int:
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                if not name.endswith(self.suffix):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_atime, stat.st_size, name))
+
+            total = sum(size for _, size, _ in entries)
+            evicted = 0
+            for _, size, name in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.unlink(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+                total -= size
+                evicted += 1
+        if evicted:
+            logger.info(f"Evicted {evicted} cached {self.kind}, {total / (1024 * 1024):.1f}MB remaining")
+        return evicted
+
+
+result_cache = ResultCache(RESULT_CACHE_DIR, int(RESULT_CACHE_MAX_MB * 1024 * 1024))
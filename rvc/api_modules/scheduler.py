@@ -0,0 +1,156 @@
+import asyncio
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Set
+
+from config import (
+    INFERENCE_EXECUTOR_WORKERS,
+    SCHEDULER_INTERACTIVE_CONCURRENCY,
+    SCHEDULER_BATCH_CONCURRENCY,
+    SCHEDULER_VIDEO_CONCURRENCY
+)
+from .metrics import registry
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+lane_wait_seconds = registry.histogram(
+    "rvc_lane_wait_seconds", "Time a conversion waited for an inference slot", ("lane", "character")
+)
+lane_latency_seconds = registry.histogram(
+    "rvc_lane_latency_seconds", "Wait plus run time of a conversion", ("lane", "character")
+)
+lane_queued = registry.gauge("rvc_lane_queued", "Conversions waiting for an inference slot", ("lane",))
+lane_running = registry.gauge("rvc_lane_running", "Conversions holding an inference slot", ("lane",))
+
+
+class Lane:
+    def __init__(self, name: str, priority: int, max_concurrent: int):
+        self.name = name
+        self.priority = priority  # lower runs first
+        self.max_concurrent = max(1, max_concurrent)
+        self.running = 0
+
+
+class _Waiter:
+    def __init__(self, lane: Lane, resource: str, seq: int):
+        self.lane = lane
+        self.resource = resource
+        self.seq = seq
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    @property
+    def sort_key(self):
+        return (self.lane.priority, self.seq)
+
+
+class InferenceScheduler:
+    """Hands out inference slots by lane priority.
+
+    A conversion needs a free slot (at most max_concurrent overall, matching
+    the inference pool), room in its lane, and exclusive use of its resource
+    (the character's VC model). Whenever a slot frees up the highest-priority
+    waiter that can run gets it, so an interactive /tts/ conversion jumps
+    ahead of every queued video segment. Running conversions are never
+    interrupted.
+    """
+
+    def __init__(self, max_concurrent: int, lanes: List[Lane]):
+        self.max_concurrent = max(1, max_concurrent)
+        self.lanes: Dict[str, Lane] = {lane.name: lane for lane in lanes}
+        self._waiters: List[_Waiter] = []
+        self._busy: Set[str] = set()
+        self._running = 0
+        self._seq = itertools.count()
+
+    def _can_run(self, waiter: _Waiter) -> bool:
+        return (
+            self._running < self.max_concurrent
+            and waiter.lane.running < waiter.lane.max_concurrent
+            and waiter.resource not in self._busy
+        )
+
+    def _grant(self, lane: Lane, resource: str):
+        self._running += 1
+        lane.running += 1
+        self._busy.add(resource)
+
+    def _release(self, lane: Lane, resource: str):
+        self._running -= 1
+        lane.running -= 1
+        self._busy.discard(resource)
+        self._dispatch()
+
+    def _dispatch(self):
+        for waiter in sorted(self._waiters, key=lambda waiter: waiter.sort_key):
+            if self._running >= self.max_concurrent:
+                break
+            if waiter.future.done() or not self._can_run(waiter):
+                continue
+            self._waiters.remove(waiter)
+            self._grant(waiter.lane, waiter.resource)
+            waiter.future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, lane_name: str, resource: str) -> AsyncIterator[None]:
+        """Hold an inference slot in lane_name with exclusive use of resource"""
+        lane = self.lanes[lane_name]
+        queued_at = time.perf_counter()
+        waiter = _Waiter(lane, resource, next(self._seq))
+        self._waiters.append(waiter)
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            elif waiter.future.done() and not waiter.future.cancelled():
+                # Granted just as we were cancelled; hand the slot on
+                self._release(lane, resource)
+            raise
+
+        started = time.perf_counter()
+        lane_wait_seconds.observe(started - queued_at, lane=lane.name, character=resource)
+        try:
+            yield
+        finally:
+            self._release(lane, resource)
+            lane_latency_seconds.observe(time.perf_counter() - queued_at, lane=lane.name, character=resource)
+
+    def is_busy(self, resource: str) -> bool:
+        return resource in self._busy
+
+    def queued(self, lane_name: Optional[str] = None) -> int:
+        return sum(1 for waiter in self._waiters if lane_name is None or waiter.lane.name == lane_name)
+
+    def status(self) -> Dict[str, Dict[str, int]]:
+        return {
+            lane.name: {
+                "queued": self.queued(lane.name),
+                "running": lane.running,
+                "max_concurrent": lane.max_concurrent
+            }
+            for lane in self.lanes.values()
+        }
+
+
+# Interactive /tts/ requests outrank batch TTS, which outranks the segments of video jobs
+inference_scheduler = InferenceScheduler(
+    max_concurrent=INFERENCE_EXECUTOR_WORKERS,
+    lanes=[
+        Lane("interactive", priority=0, max_concurrent=SCHEDULER_INTERACTIVE_CONCURRENCY),
+        Lane("batch", priority=1, max_concurrent=SCHEDULER_BATCH_CONCURRENCY),
+        Lane("video", priority=2, max_concurrent=SCHEDULER_VIDEO_CONCURRENCY),
+    ]
+)
+
+
+def collect_lane_metrics():
+    for lane in inference_scheduler.lanes.values():
+        lane_queued.set(inference_scheduler.queued(lane.name), lane=lane.name)
+        lane_running.set(lane.running, lane=lane.name)
+
+
+registry.add_collector(collect_lane_metrics)
@@ -0,0 +1,181 @@
+"""Per-request trace spans for video jobs.
+
+A trace is started around each video job and spans nest through
+contextvars, which follow asyncio tasks and calls sent to the thread pools
+(see executors.run_io / run_inference). Finished traces are appended to
+TRACE_FILE as one OTLP/JSON ExportTraceServiceRequest per line, the format
+the OpenTelemetry collector's otlpjsonfile receiver reads. The top-level
+stages also form the compact timeline shown in the job status.
+"""
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from config import TRACE_FILE
+from .executors import run_io
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+# Serializes appends to TRACE_FILE from this process's I/O threads
+_export_lock = threading.Lock()
+
+
+class Span:
+    def __init__(self, trace: "Trace", name: str, parent: Optional["Span"] = None,
+                 start: Optional[float] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.trace = trace
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent = parent
+        self.start = time.time() if start is None else start
+        self.end: Optional[float] = None
+        self.attributes = dict(attributes or {})
+        self.error: Optional[str] = None
+
+    def finish(self, end: Optional[float] = None):
+        self.end = time.time() if end is None else end
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(int(self.start * 1e9)),
+            "endTimeUnixNano": str(int((self.end or self.start) * 1e9)),
+            "attributes": [_otlp_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent is not None:
+            span["parentSpanId"] = self.parent.span_id
+        return span
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class Trace:
+    """All spans of one video job"""
+
+    def __init__(self, request_id: str, on_stage_change: Optional[Callable[["Trace"], None]] = None):
+        self.trace_id = uuid.uuid4().hex
+        self.request_id = request_id
+        self.on_stage_change = on_stage_change
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+        self.root = self.add(Span(self, "video_job", attributes={"request_id": request_id}))
+
+    def add(self, span: Span) -> Span:
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def stage_changed(self, span: Span):
+        # Only top-level stages make it into the status timeline
+        if span.parent is self.root and self.on_stage_change is not None:
+            try:
+                self.on_stage_change(self)
+            except Exception as e:
+                logger.warning(f"[{self.request_id}] Failed to publish stage timeline: {str(e)}")
+
+    def timeline(self) -> List[Dict[str, Any]]:
+        """Top-level stages as offsets from the start of the job, in start order"""
+        with self._lock:
+            stages = [span for span in self.spans if span.parent is self.root]
+        return [
+            {
+                "stage": span.name,
+                "start": round(span.start - self.root.start, 3),
+                "duration": round(span.end - span.start, 3) if span.end is not None else None,
+                **({"error": True} if span.error else {})
+            }
+            for span in sorted(stages, key=lambda span: span.start)
+        ]
+
+    def to_otlp(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = [span.to_otlp() for span in self.spans]
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", "rvc-api")]},
+                "scopeSpans": [{"scope": {"name": "rvc.video"}, "spans": spans}]
+            }]
+        }
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """Child span of the current span for the enclosed block; a no-op outside a trace"""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = parent.trace.add(Span(parent.trace, name, parent, attributes=attributes))
+    token = _current_span.set(child)
+    child.trace.stage_changed(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = str(e) or type(e).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        child.finish()
+        child.trace.stage_changed(child)
+
+
+def record_span(name: str, start: float, end: float, **attributes) -> Optional[Span]:
+    """Add an already finished child span, e.g. from timings measured inside the RVC pipeline"""
+    parent = _current_span.get()
+    if parent is None:
+        return None
+    child = parent.trace.add(Span(parent.trace, name, parent, start=start, attributes=attributes))
+    child.finish(end)
+    return child
+
+
+def _export(trace: Trace):
+    line = json.dumps(trace.to_otlp(), separators=(",", ":"))
+    os.makedirs(os.path.dirname(os.path.abspath(TRACE_FILE)), exist_ok=True)
+    with _export_lock, open(TRACE_FILE, "a") as f:
+        f.write(line + "\n")
+
+
+@asynccontextmanager
+async def start_trace(request_id: str, on_stage_change: Optional[Callable[[Trace], None]] = None):
+    """Trace the enclosed block as one job and export it when the block exits"""
+    trace = Trace(request_id, on_stage_change)
+    token = _current_span.set(trace.root)
+    try:
+        yield trace
+    except BaseException as e:
+        trace.root.error = str(e) or type(e).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        trace.root.finish()
+        if TRACE_FILE:
+            try:
+                await run_io(_export, trace)
+            except Exception as e:
+                logger.warning(f"[{request_id}] Failed to export trace: {str(e)}")
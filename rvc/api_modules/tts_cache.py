@@ -0,0 +1,106 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+from typing import Any, Awaitable, Callable, Dict
+
+from config import TTS_CACHE_DIR, TTS_CACHE_MAX_MB
+from .executors import run_io
+from .metrics import cache_requests, record_cache
+from .result_cache import ResultCache
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def tts_cache_key(voice_id: str, output_format: str, payload: Dict[str, Any]) -> str:
+    """Content hash of everything that determines the provider's audio.
+
+    payload is the request body as sent (text, model id, voice settings).
+    """
+    normalized = json.dumps(
+        {"voice_id": voice_id, "output_format": output_format, "payload": payload},
+        sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+class _Cancelled(Exception):
+    """The call followers were waiting on was cancelled, not failed"""
+
+
+class TTSCache:
+    """Disk cache of TTS audio with in-flight request coalescing.
+
+    Lookups go to a ResultCache shared by every worker on the host. Within a
+    process, concurrent misses for the same key share one upstream call
+    (singleflight): the first caller fetches and every other caller waits
+    for it and copies the result.
+    """
+
+    def __init__(self, store: ResultCache):
+        self.store = store
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def fetch(self, key: str, output_path: str, produce: Callable[[str], Awaitable[bool]]) -> bool:
+        """Write the audio for key to output_path, calling produce(output_path) only on a miss"""
+        if await run_io(self.store.materialize, key, output_path) is not None:
+            record_cache("tts", hit=True)
+            return True
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            cache_requests.inc(cache="tts", result="coalesced")
+            try:
+                source = await asyncio.shield(inflight)
+            except _Cancelled:
+                # The leader went away; try again, possibly as the new leader
+                return await self.fetch(key, output_path, produce)
+            if source is None:
+                return False
+            if await run_io(self.store.materialize, key, output_path) is None:
+                try:
+                    await run_io(shutil.copyfile, source, output_path)
+                except FileNotFoundError:
+                    # Not cached and the leader's copy is already gone
+                    return await self.fetch(key, output_path, produce)
+            return True
+
+        if self.store.enabled:
+            record_cache("tts", hit=False)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            # Never write through a hard link into an existing cache entry
+            await run_io(_remove, output_path)
+            ok = await produce(output_path)
+            if ok:
+                try:
+                    await run_io(self.store.put, key, output_path)
+                except Exception as e:
+                    logger.warning(f"Failed to cache TTS audio: {str(e)}")
+            future.set_result(output_path if ok else None)
+            return ok
+        except asyncio.CancelledError:
+            future.set_exception(_Cancelled())
+            raise
+        except BaseException:
+            future.set_result(None)
+            raise
+        finally:
+            del self._inflight[key]
+            # Followers may not have looked at the outcome yet
+            if future.done() and not future.cancelled():
+                future.exception()
+
+
+def _remove(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+tts_cache = TTSCache(ResultCache(TTS_CACHE_DIR, int(TTS_CACHE_MAX_MB * 1024 * 1024), suffix=".wav", kind="TTS clips"))
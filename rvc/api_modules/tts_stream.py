@@ -0,0 +1,148 @@
+"""Sentence-level streaming for /tts/stream.
+
+The text is split into sentences. TTS for every sentence is fetched up
+front, conversions run in order, and each converted sentence is sent as
+soon as it is ready, so the first audio arrives after one sentence's worth
+of work rather than the whole line's. Neighbouring sentences are joined
+with a short crossfade to hide the seam.
+
+The response is a single WAV stream whose header declares an unknown
+length, which browsers and ffmpeg play as it arrives.
+"""
+import asyncio
+import logging
+import re
+import struct
+from contextlib import aclosing
+from typing import AsyncIterator, List, Optional
+
+import numpy as np
+
+from config import CONVERSATION_TTS_CONCURRENCY, TTS_STREAM_CROSSFADE_MS, TTS_STREAM_MIN_SENTENCE_CHARS
+from .audio_service import fetch_tts_audio, convert_voice_samples, run_conversion
+from .scheduler import inference_scheduler
+from .workspace import Workspace, active_workspace
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Whitespace after terminal punctuation, possibly followed by a closing quote or bracket that stays with its sentence
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+|(?<=[.!?…][\"')\]])\s+")
+
+
+def split_sentences(text: str, min_chars: int = TTS_STREAM_MIN_SENTENCE_CHARS) -> List[str]:
+    """Sentences of text, with ones shorter than min_chars merged into the next"""
+    sentences = []
+    pending = ""
+    for piece in _SENTENCE_END.split(text.strip()):
+        pending = f"{pending} {piece}".strip() if pending else piece.strip()
+        if len(pending) >= min_chars:
+            sentences.append(pending)
+            pending = ""
+    if pending:
+        if sentences and len(pending) < min_chars:
+            sentences[-1] = f"{sentences[-1]} {pending}"
+        else:
+            sentences.append(pending)
+    return sentences
+
+
+def wav_stream_header(sample_rate: int, channels: int = 1, bits: int = 16) -> bytes:
+    """RIFF/WAVE header for 16-bit PCM of unknown length"""
+    block_align = channels * bits // 8
+    unknown = 0xFFFFFFFF
+    return (
+        b"RIFF" + struct.pack("<I", unknown) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, sample_rate, sample_rate * block_align, block_align, bits)
+        + b"data" + struct.pack("<I", unknown)
+    )
+
+
+class Crossfader:
+    """Joins consecutive chunks, overlapping each boundary by a short linear crossfade.
+
+    The tail of every chunk is held back until the next one arrives, so the
+    output is `overlap` samples shorter per boundary than the input.
+    """
+
+    def __init__(self, overlap: int):
+        self.overlap = overlap
+        self._tail: Optional[np.ndarray] = None
+
+    def push(self, samples: np.ndarray) -> np.ndarray:
+        samples = samples.astype(np.float32)
+        if self._tail is not None:
+            overlap = min(len(self._tail), len(samples))
+            if overlap:
+                fade_in = np.linspace(0.0, 1.0, overlap, dtype=np.float32)
+                samples[:overlap] = self._tail[:overlap] * (1.0 - fade_in) + samples[:overlap] * fade_in
+            samples = np.concatenate([self._tail[overlap:], samples])
+        keep = min(self.overlap, len(samples))
+        self._tail = samples[len(samples) - keep:]
+        return _to_pcm(samples[:len(samples) - keep])
+
+    def flush(self) -> np.ndarray:
+        tail, self._tail = self._tail, None
+        return _to_pcm(tail if tail is not None else np.zeros(0, dtype=np.float32))
+
+
+def _to_pcm(samples: np.ndarray) -> np.ndarray:
+    return np.clip(samples, -32768, 32767).astype("<i2")
+
+
+class SentenceStream:
+    """TTS→RVC pipeline over the sentences of one line, yielding converted chunks in order"""
+
+    def __init__(self, text: str, character: str, request_id: str, workspace: Workspace):
+        self.sentences = split_sentences(text)
+        self.character = character
+        self.request_id = request_id
+        self.workspace = workspace
+        self.sample_rate: Optional[int] = None
+        self._tts_slots = asyncio.Semaphore(CONVERSATION_TTS_CONCURRENCY)
+        self._fetches: List[asyncio.Task] = []
+
+    async def _fetch(self, index: int) -> np.ndarray:
+        async with self._tts_slots:
+            with active_workspace(self.workspace):
+                tts_path = self.workspace.path(f"tts_{index}.wav")
+                return await fetch_tts_audio(self.sentences[index], self.character, self.request_id, tts_path)
+
+    async def chunks(self) -> AsyncIterator[np.ndarray]:
+        """Converted int16 samples per sentence; sample_rate is set before the first one is yielded"""
+        self._fetches = [asyncio.create_task(self._fetch(i)) for i in range(len(self.sentences))]
+        try:
+            for index, fetch in enumerate(self._fetches):
+                tts_audio = await fetch
+                async with inference_scheduler.slot("interactive", self.character):
+                    sample_rate, samples = await run_conversion(
+                        convert_voice_samples, self.character, tts_audio, self.request_id
+                    )
+                self.sample_rate = sample_rate
+                logger.info(f"[{self.request_id}] Streaming sentence {index + 1}/{len(self.sentences)}")
+                yield samples
+        finally:
+            await self.cancel()
+
+    async def cancel(self):
+        for fetch in self._fetches:
+            fetch.cancel()
+        await asyncio.gather(*self._fetches, return_exceptions=True)
+
+
+async def wav_chunks(stream: SentenceStream) -> AsyncIterator[bytes]:
+    """The stream as WAV bytes: header, then crossfaded PCM as each sentence is converted.
+
+    Closing this generator (e.g. when the client disconnects) closes the
+    sentence pipeline too, cancelling its TTS fetches before the caller
+    removes their workspace.
+    """
+    crossfader: Optional[Crossfader] = None
+    async with aclosing(stream.chunks()) as chunks:
+        async for samples in chunks:
+            if crossfader is None:
+                crossfader = Crossfader(int(stream.sample_rate * TTS_STREAM_CROSSFADE_MS / 1000))
+                yield wav_stream_header(stream.sample_rate)
+            yield crossfader.push(samples).tobytes()
+    if crossfader is not None:
+        yield crossfader.flush().tobytes()
@@ -1,11 +1,15 @@
 import os
 import base64
 import tempfile
+import time
 import logging
-from typing import List, Dict, Any, Optional
+from typing import Awaitable, Callable, List, Dict, Any, Optional
 from fastapi import HTTPException
 
 from video.types import ImageOverlay, VideoConfig
+from .models import MediaFile
+from .media_store import claimed_upload_path, max_media_bytes
+from .metrics import observe_stage, time_stage
 from final_video import create_final_video_with_buffers
 import sys
 import os
@@ -79,35 +83,48 @@ def validate_file_paths() -> tuple[str, str, str]:
     logger.info("All file paths validated successfully")
     return video_path, stewie_image_path, peter_image_path
 
-def process_media_files(media_files: List[Dict[str, Any]]) -> Dict[str, bytes]:
-    """Process and decode media files (images and videos)"""
+def process_media_files(media_files: List[MediaFile], media_dir: Optional[str] = None) -> Dict[str, bytes]:
+    """Process and decode media files (images and videos).
+
+    Files uploaded through POST /media are read from media_dir (the job
+    directory they were moved into); inline files are base64-decoded.
+    """
     logger.info(f"Processing {len(media_files)} media files...")
+    started = time.perf_counter()
     media_buffers = {}
     
     if media_files:
         for i, media_file in enumerate(media_files):
-            logger.info(f"Processing media file {i+1}/{len(media_files)}: {media_file.get('filename', 'unknown')}")
-            if media_file.get("type") in ["image", "video"]:
+            logger.info(f"Processing media file {i+1}/{len(media_files)}: {media_file.filename}")
+            if media_file.type in ["image", "video"]:
                 try:
-                    buffer_data = base64.b64decode(media_file["data"])
+                    if media_file.mediaId:
+                        with open(claimed_upload_path(media_file.mediaId, media_dir), "rb") as f:
+                            buffer_data = f.read()
+                    elif media_file.data:
+                        buffer_data = base64.b64decode(media_file.data)
+                    else:
+                        logger.warning(f"{media_file.filename} has neither data nor a mediaId")
+                        continue
                     file_size_mb = len(buffer_data) / (1024 * 1024)
                     
-                    # Size validation
-                    max_size = 50 if media_file.get("type") == "video" else 10  # MB
+                    # Size validation (uploads were already checked while streaming)
+                    max_size = max_media_bytes(media_file.type) / (1024 * 1024)  # MB
                     if file_size_mb > max_size:
-                        logger.warning(f"{media_file['filename']} is {file_size_mb:.1f}MB, which exceeds the {max_size}MB limit")
-                        print(f"Warning: {media_file['filename']} is {file_size_mb:.1f}MB, which exceeds the {max_size}MB limit")
+                        logger.warning(f"{media_file.filename} is {file_size_mb:.1f}MB, which exceeds the {max_size:.0f}MB limit")
+                        print(f"Warning: {media_file.filename} is {file_size_mb:.1f}MB, which exceeds the {max_size:.0f}MB limit")
                         continue
                     
-                    media_buffers[media_file["filename"]] = buffer_data
-                    logger.info(f"Successfully processed {media_file['type']}: {media_file['filename']} ({file_size_mb:.1f}MB)")
-                    print(f"Processed {media_file['type']}: {media_file['filename']} ({file_size_mb:.1f}MB)")
+                    media_buffers[media_file.filename] = buffer_data
+                    logger.info(f"Successfully processed {media_file.type}: {media_file.filename} ({file_size_mb:.1f}MB)")
+                    print(f"Processed {media_file.type}: {media_file.filename} ({file_size_mb:.1f}MB)")
                 except Exception as e:
-                    logger.error(f"Error processing {media_file.get('filename', 'unknown')}: {str(e)}")
-                    print(f"Error processing {media_file.get('filename', 'unknown')}: {str(e)}")
+                    logger.error(f"Error processing {media_file.filename}: {str(e)}")
+                    print(f"Error processing {media_file.filename}: {str(e)}")
                     continue
     
     logger.info(f"Processed {len(media_buffers)} media files successfully")
+    observe_stage("media_decode", time.perf_counter() - started)
     return media_buffers
 
 def create_image_overlays(conversation, media_buffers: Dict[str, bytes], word_timeline: List[Dict]) -> List[ImageOverlay]:
@@ -210,7 +227,8 @@ async def generate_video(
     character_timeline_list,
     word_timeline: List[Dict],
     total_duration: float,
-    image_overlays_list: Optional[List[ImageOverlay]] = None
+    image_overlays_list: Optional[List[ImageOverlay]] = None,
+    on_progress: Optional[Callable[[float], Awaitable[None]]] = None
 ) -> bytes:
     """Generate the final video with all components"""
     logger.info(f"Generating video with duration: {total_duration}s")
@@ -221,7 +239,8 @@ async def generate_video(
     
     # Create subtitle content
     logger.info("Creating subtitle content...")
-    subtitle_content = create_subtitle_content(word_timeline)
+    with time_stage("subtitles"):
+        subtitle_content = create_subtitle_content(word_timeline)
     subtitle_entries = subtitle_content.split('\n\n')
     logger.info(f"Created subtitle content with {len(subtitle_entries)} entries")
     
@@ -239,7 +258,8 @@ async def generate_video(
             character_timeline=character_timeline_list,
             duration=total_duration,
             image_overlays=image_overlays_list if image_overlays_list else None,
-            config=config
+            config=config,
+            on_progress=on_progress
         )
         logger.info(f"Video buffer created successfully, size: {len(video_buffer) / (1024*1024):.1f} MB")
     except Exception as e:
@@ -248,10 +268,10 @@ async def generate_video(
     
     return video_buffer
 
-def save_video_to_temp(video_buffer: bytes, request_id: str) -> tuple[str, int]:
-    """Save video buffer to temporary file and return path and size"""
+def save_video_to_temp(video_buffer: bytes, request_id: str, output_dir: Optional[str] = None) -> tuple[str, int]:
+    """Save video buffer to temporary file (or output_dir) and return path and size"""
     logger.info(f"Saving video to temp file for request {request_id}")
-    temp_video_path = os.path.join(tempfile.gettempdir(), f"video_output_{request_id}.mp4")
+    temp_video_path = os.path.join(output_dir or tempfile.gettempdir(), f"video_output_{request_id}.mp4")
     
     try:
         with open(temp_video_path, "wb") as f:
@@ -0,0 +1,314 @@
+"""Per-job scratch workspaces.
+
+Every video job and every /tts/ request gets one scratch directory for its
+intermediates (TTS and converted WAVs, audio parts, subtitles, overlays,
+the rendered MP4 before it is saved), removed as soon as the job ends.
+Small intermediates go to WORKSPACE_TMPFS_DIR when it is set, large ones to
+WORKSPACE_DIR. Allocating a file fails with WorkspaceQuotaError once the job
+or all workspaces together are over quota, and the sweeper reclaims
+workspaces left behind by dead workers.
+
+Usage is tracked as running byte counts: allocating a path re-stats the
+files the workspace has handed out so far, so bytes written since the last
+allocation count against the quota at the next one. Only the sweeper
+(run off the event loop) walks directories, to pick up other workers'
+workspaces and files nobody allocated through path().
+
+Code deep in the video pipeline finds the current workspace through a
+context variable, like trace spans, and falls back to the system temp
+directory outside a job.
+"""
+import contextvars
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from config import (
+    WORKSPACE_DIR,
+    WORKSPACE_TMPFS_DIR,
+    WORKSPACE_TMPFS_MAX_MB,
+    WORKSPACE_JOB_QUOTA_MB,
+    WORKSPACE_TOTAL_QUOTA_MB,
+    WORKSPACE_TTL
+)
+from .executors import run_io
+from .job_store import current_owner, owner_alive
+from .metrics import registry
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+OWNER_FILE = ".owner"
+MB = 1024 * 1024
+
+# Every worker counts the whole host's workspaces, so take one worker's figure rather than the sum
+workspace_bytes = registry.gauge(
+    "rvc_workspace_bytes", "Bytes held in job workspaces on this host", ("filesystem",), merge="max"
+)
+workspaces_reclaimed = registry.counter("rvc_workspaces_reclaimed_total", "Workspaces removed by the orphan sweeper")
+
+_current_workspace: contextvars.ContextVar[Optional["Workspace"]] = contextvars.ContextVar(
+    "current_workspace", default=None
+)
+
+
+class WorkspaceQuotaError(RuntimeError):
+    """A job or the host ran out of workspace quota"""
+
+
+def _dir_usage(path: str) -> int:
+    total = 0
+    try:
+        entries = list(os.scandir(path))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                total += _dir_usage(entry.path)
+            else:
+                total += entry.stat(follow_symlinks=False).st_size
+        except FileNotFoundError:
+            pass
+    return total
+
+
+class Workspace:
+    """Scratch directories of one job: one on disk, plus one on tmpfs if configured"""
+
+    def __init__(self, manager: "WorkspaceManager", name: str):
+        self.manager = manager
+        self.name = name
+        self.disk_dir = os.path.join(manager.disk_root, name)
+        self.tmpfs_dir = os.path.join(manager.tmpfs_root, name) if manager.tmpfs_root else None
+        # Allocated path -> (filesystem, bytes last seen)
+        self._files: Dict[str, Tuple[str, int]] = {}
+        # Bytes found by the sweeper's last walk, including files not allocated through path()
+        self.walked_bytes = 0
+        for directory in self.dirs:
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, OWNER_FILE), "w") as f:
+                f.write(current_owner())
+
+    @property
+    def dirs(self) -> List[str]:
+        return [self.disk_dir] + ([self.tmpfs_dir] if self.tmpfs_dir else [])
+
+    @property
+    def tracked_bytes(self) -> int:
+        return sum(size for _, size in self._files.values())
+
+    def usage(self) -> int:
+        return max(self.tracked_bytes, self.walked_bytes)
+
+    def refresh(self):
+        """Re-stat the files handed out so far and pass their growth on to the manager"""
+        deltas = {"disk": 0, "tmpfs": 0}
+        for path, (filesystem, seen) in list(self._files.items()):
+            try:
+                size = os.stat(path).st_size
+            except FileNotFoundError:
+                size = 0
+            if size != seen:
+                self._files[path] = (filesystem, size)
+                deltas[filesystem] += size - seen
+        self.manager.add_bytes(deltas)
+
+    def path(self, filename: str, large: bool = False) -> str:
+        """Path for a new file in this workspace; raises WorkspaceQuotaError when over quota"""
+        self.refresh()
+        self.manager.check_quota(self)
+        if large or self.tmpfs_dir is None or self.manager.tmpfs_full():
+            path, filesystem = os.path.join(self.disk_dir, filename), "disk"
+        else:
+            path, filesystem = os.path.join(self.tmpfs_dir, filename), "tmpfs"
+        self._files.setdefault(path, (filesystem, 0))
+        return path
+
+    def scratch_path(self, prefix: str, suffix: str = "", large: bool = False) -> str:
+        return self.path(f"{prefix}_{uuid.uuid4().hex}{suffix}", large)
+
+    def close(self):
+        self.refresh()
+        self.manager.release(self)
+        for directory in self.dirs:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+class WorkspaceManager:
+    def __init__(self, disk_root: str, tmpfs_root: str, tmpfs_max_bytes: float,
+                 job_quota_bytes: float, total_quota_bytes: float, ttl: float):
+        self.disk_root = disk_root
+        self.tmpfs_root = tmpfs_root
+        self.tmpfs_max_bytes = tmpfs_max_bytes
+        self.job_quota_bytes = job_quota_bytes
+        self.total_quota_bytes = total_quota_bytes
+        self.ttl = ttl
+        self._open: Dict[str, Workspace] = {}
+        self._lock = threading.Lock()
+        # Bytes in this process's open workspaces, kept current by Workspace.refresh
+        self._own_bytes = {"disk": 0, "tmpfs": 0}
+        # Everything else under the roots (other workers, orphans), as of the last sweep
+        self._other_bytes = {"disk": 0, "tmpfs": 0}
+
+    @property
+    def roots(self) -> List[str]:
+        return [self.disk_root] + ([self.tmpfs_root] if self.tmpfs_root else [])
+
+    def add_bytes(self, deltas: Dict[str, int]):
+        with self._lock:
+            for filesystem, delta in deltas.items():
+                self._own_bytes[filesystem] += delta
+
+    def bytes_on(self, filesystem: str) -> int:
+        """Bytes on one filesystem ("disk" or "tmpfs") held by every workspace on this host"""
+        with self._lock:
+            return self._own_bytes[filesystem] + self._other_bytes[filesystem]
+
+    def usage(self) -> int:
+        """Bytes held by every workspace on this host, including other workers'"""
+        return self.bytes_on("disk") + self.bytes_on("tmpfs")
+
+    def tmpfs_full(self) -> bool:
+        return self.bytes_on("tmpfs") >= self.tmpfs_max_bytes
+
+    def check_quota(self, workspace: Optional[Workspace] = None):
+        if workspace is not None and self.job_quota_bytes > 0:
+            used = workspace.usage()
+            if used >= self.job_quota_bytes:
+                raise WorkspaceQuotaError(
+                    f"Workspace {workspace.name} uses {used / MB:.0f}MB, over the {self.job_quota_bytes / MB:.0f}MB job quota"
+                )
+        if self.total_quota_bytes > 0:
+            used = self.usage()
+            if used >= self.total_quota_bytes:
+                raise WorkspaceQuotaError(
+                    f"Workspaces use {used / MB:.0f}MB, over the {self.total_quota_bytes / MB:.0f}MB total quota"
+                )
+
+    def open(self, name: str) -> Workspace:
+        """Create a workspace for a job; raises WorkspaceQuotaError when the host is over quota"""
+        self.check_quota()
+        workspace = Workspace(self, f"{name}-{uuid.uuid4().hex[:6]}")
+        with self._lock:
+            self._open[workspace.name] = workspace
+        return workspace
+
+    def release(self, workspace: Workspace):
+        deltas = {"disk": 0, "tmpfs": 0}
+        for filesystem, size in workspace._files.values():
+            deltas[filesystem] -= size
+        with self._lock:
+            if self._open.pop(workspace.name, None) is None:
+                return
+            for filesystem, delta in deltas.items():
+                self._own_bytes[filesystem] += delta
+
+    def _expired(self, path: str, now: float) -> bool:
+        try:
+            with open(os.path.join(path, OWNER_FILE)) as f:
+                owner = f.read().strip()
+            created = os.path.getmtime(os.path.join(path, OWNER_FILE))
+        except FileNotFoundError:
+            # Still being created, or not one of ours; judge by the directory itself
+            owner, created = None, os.path.getmtime(path)
+            if now - created < self.ttl:
+                return False
+        return not owner_alive(owner) or now - created >= self.ttl
+
+    def sweep(self) -> int:
+        """Remove workspaces whose worker died or that outlived WORKSPACE_TTL, then recount usage.
+
+        Walks every root, so run it off the event loop.
+        """
+        now = time.time()
+        reclaimed = 0
+        for root in self.roots:
+            try:
+                entries = list(os.scandir(root))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                with self._lock:
+                    in_use = entry.name in self._open
+                try:
+                    if in_use or not entry.is_dir() or not self._expired(entry.path, now):
+                        continue
+                except FileNotFoundError:
+                    continue
+                shutil.rmtree(entry.path, ignore_errors=True)
+                reclaimed += 1
+        if reclaimed:
+            workspaces_reclaimed.inc(reclaimed)
+            logger.info(f"Reclaimed {reclaimed} orphaned workspaces")
+        self._recount()
+        return reclaimed
+
+    def _recount(self):
+        with self._lock:
+            open_workspaces = list(self._open.values())
+        for workspace in open_workspaces:
+            workspace.refresh()
+            workspace.walked_bytes = sum(_dir_usage(directory) for directory in workspace.dirs)
+        totals = {"disk": _dir_usage(self.disk_root), "tmpfs": _dir_usage(self.tmpfs_root) if self.tmpfs_root else 0}
+        with self._lock:
+            for filesystem, total in totals.items():
+                self._other_bytes[filesystem] = max(0, total - self._own_bytes[filesystem])
+
+
+workspace_manager = WorkspaceManager(
+    disk_root=WORKSPACE_DIR,
+    tmpfs_root=WORKSPACE_TMPFS_DIR,
+    tmpfs_max_bytes=WORKSPACE_TMPFS_MAX_MB * MB,
+    job_quota_bytes=WORKSPACE_JOB_QUOTA_MB * MB,
+    total_quota_bytes=WORKSPACE_TOTAL_QUOTA_MB * MB,
+    ttl=WORKSPACE_TTL
+)
+
+
+def current_workspace() -> Optional[Workspace]:
+    return _current_workspace.get()
+
+
+def scratch_path(prefix: str, suffix: str = "", large: bool = False) -> str:
+    """Path for a new intermediate file in the current job's workspace, or the temp dir outside a job"""
+    workspace = _current_workspace.get()
+    if workspace is None:
+        return os.path.join(tempfile.gettempdir(), f"{prefix}_{uuid.uuid4()}{suffix}")
+    return workspace.scratch_path(prefix, suffix, large)
+
+
+@contextmanager
+def active_workspace(workspace: Workspace) -> Iterator[Workspace]:
+    """Make workspace the current one for the enclosed block"""
+    token = _current_workspace.set(workspace)
+    try:
+        yield workspace
+    finally:
+        _current_workspace.reset(token)
+
+
+@asynccontextmanager
+async def job_workspace(name: str) -> AsyncIterator[Workspace]:
+    """Open a workspace for the enclosed block and remove it when the block exits"""
+    workspace = await run_io(workspace_manager.open, name)
+    try:
+        with active_workspace(workspace):
+            yield workspace
+    finally:
+        await run_io(workspace.close)
+
+
+def collect_workspace_metrics():
+    workspace_bytes.set(workspace_manager.bytes_on("disk"), filesystem="disk")
+    if workspace_manager.tmpfs_root:
+        workspace_bytes.set(workspace_manager.bytes_on("tmpfs"), filesystem="tmpfs")
+
+
+registry.add_collector(collect_workspace_metrics)
@@ -1,12 +1,8 @@
 import os
-import tempfile
-import uuid
-from models.whisper import load_whisper_model, WHISPER_AVAILABLE
-
-try: 
-    import whisper_timestamped as whisper
-except ImportError:
-    pass
+from models.whisper import transcribe_word_segments, WHISPER_AVAILABLE
+from api_modules.executors import run_io, run_inference
+from api_modules.workspace import scratch_path
+from video.file_utils import write_bytes
 
 async def get_word_timings_from_whisper(audio_buffer: bytes, text: str):
     """Helper function to get word timings from whisper"""
@@ -14,32 +10,12 @@ async def get_word_timings_from_whisper(audio_buffer: bytes, text: str):
         return []
     
     # Save audio buffer to temp file
-    temp_audio_path = os.path.join(tempfile.gettempdir(), f"whisper_audio_{uuid.uuid4()}.wav")
-    with open(temp_audio_path, "wb") as f:
-        f.write(audio_buffer)
+    temp_audio_path = scratch_path("whisper_audio", ".wav")
+    await run_io(write_bytes, temp_audio_path, audio_buffer)
     
     try:
-        # Load whisper model
-        model = load_whisper_model()
-        
-        # Load audio and transcribe
-        audio_data = whisper.load_audio(temp_audio_path)
-        result = whisper.transcribe(model, audio_data, language="en", verbose=False)
-        
-        # Extract word timings
-        word_segments = []
-        if "segments" in result:
-            for segment in result["segments"]:
-                if "words" in segment:
-                    for word_data in segment["words"]:
-                        if isinstance(word_data, dict) and "text" in word_data:
-                            word_segments.append({
-                                "word": word_data.get("text", "").strip(),
-                                "start": word_data.get("start", 0),
-                                "end": word_data.get("end", 0)
-                            })
-        
-        return word_segments
+        # Transcribe on the inference pool so the event loop and other pipeline stages keep running
+        return await run_inference(transcribe_word_segments, temp_audio_path, "en")
         
     finally:
         if os.path.exists(temp_audio_path):
@@ -1,16 +1,46 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
 
 ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
 
+# HTTP client for ElevenLabs: one keep-alive pool per worker process, HTTP/2 when the h2 package is installed
+ELEVENLABS_API_URL = os.getenv("ELEVENLABS_API_URL", "https://api.elevenlabs.io")
+TTS_HTTP_MAX_CONNECTIONS = int(os.getenv("TTS_HTTP_MAX_CONNECTIONS", "20"))
+TTS_HTTP_MAX_KEEPALIVE = int(os.getenv("TTS_HTTP_MAX_KEEPALIVE", "10"))
+TTS_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("TTS_HTTP_KEEPALIVE_EXPIRY", "60"))
+TTS_HTTP_HOST_CONCURRENCY = int(os.getenv("TTS_HTTP_HOST_CONCURRENCY", "8"))  # in-flight requests per upstream host
+TTS_HTTP_CONNECT_TIMEOUT = float(os.getenv("TTS_HTTP_CONNECT_TIMEOUT", "5"))
+TTS_HTTP_WRITE_TIMEOUT = float(os.getenv("TTS_HTTP_WRITE_TIMEOUT", "10"))
+TTS_HTTP_READ_TIMEOUT = float(os.getenv("TTS_HTTP_READ_TIMEOUT", "30"))
+TTS_HTTP_POOL_TIMEOUT = float(os.getenv("TTS_HTTP_POOL_TIMEOUT", "10"))
+
+# Hedged TTS calls: a call still running past the recent TTS_HEDGE_QUANTILE latency gets a duplicate (0 disables)
+TTS_HEDGE_QUANTILE = float(os.getenv("TTS_HEDGE_QUANTILE", "0.95"))
+TTS_HEDGE_MIN_DELAY = float(os.getenv("TTS_HEDGE_MIN_DELAY", "2"))  # never hedge sooner than this
+TTS_HEDGE_INITIAL_DELAY = float(os.getenv("TTS_HEDGE_INITIAL_DELAY", "8"))  # until TTS_HEDGE_MIN_SAMPLES calls were timed
+TTS_HEDGE_MIN_SAMPLES = int(os.getenv("TTS_HEDGE_MIN_SAMPLES", "20"))
+TTS_HEDGE_WINDOW = int(os.getenv("TTS_HEDGE_WINDOW", "200"))  # recent calls the quantile is taken over
+
 # Character-specific TTS voice IDs for ElevenLabs
 ELEVENLABS_VOICE_IDS = {
     "peter": os.getenv("PETER_VOICE_ID"),  # Fallback to default if not set
     "stewie": os.getenv("STEWIE_VOICE_ID")  # Fallback to default if not set
 }
 
+# RVC assets, resolved from this file so loading doesn't depend on the working directory
+RVC_ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rvc", "assets")
+RVC_WEIGHT_ROOT = os.path.join(RVC_ASSETS_DIR, "weights")
+RVC_HUBERT_PATH = os.path.join(RVC_ASSETS_DIR, "hubert", "hubert_base.pt")
+RVC_RMVPE_ROOT = os.path.join(RVC_ASSETS_DIR, "rmvpe")
+
+# The vendored RVC code finds its assets through these
+os.environ.setdefault("weight_root", RVC_WEIGHT_ROOT)
+os.environ.setdefault("index_root", RVC_WEIGHT_ROOT)
+os.environ.setdefault("rmvpe_root", RVC_RMVPE_ROOT)
+
 # Global variables for models (will be loaded on first request)
 models = {}
 whisper_model = None
@@ -19,12 +49,115 @@ whisper_model = None
 MODEL_CONFIG = {
     "peter": {
         "model_path": "peter.pth",
-        "index_path": "assets/weights/peter.index",
+        "index_path": os.path.join(RVC_WEIGHT_ROOT, "peter.index"),
         "tts_voice_id": ELEVENLABS_VOICE_IDS["peter"]
     },
     "stewie": {
         "model_path": "stewie.pth", 
-        "index_path": "assets/weights/stewie.index",
+        "index_path": os.path.join(RVC_WEIGHT_ROOT, "stewie.index"),
         "tts_voice_id": ELEVENLABS_VOICE_IDS["stewie"]
     }
-}
\ No newline at end of file
+}
+
+# Pitch extraction method used for RVC conversion ("harvest", "pm", "crepe", "rmvpe")
+RVC_F0_METHOD = os.getenv("RVC_F0_METHOD", "harvest")
+
+# Startup model loading: characters, HuBERT, RMVPE and Whisper load in parallel
+MODEL_PRELOAD_WORKERS = int(os.getenv("MODEL_PRELOAD_WORKERS", "4"))
+
+# Model residency: least recently used characters are unloaded past this budget (0 keeps every model loaded)
+MODEL_MEMORY_BUDGET_MB = float(os.getenv("MODEL_MEMORY_BUDGET_MB", "0"))
+MODEL_PINNED = [name.strip() for name in os.getenv("MODEL_PINNED", "").split(",") if name.strip()]  # never unloaded
+# Slim copies of the .pth checkpoints (weights and config only) that reload without unpickling; empty disables
+MODEL_CHECKPOINT_CACHE_DIR = os.getenv(
+    "MODEL_CHECKPOINT_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp", "checkpoints")
+)
+os.environ.setdefault("checkpoint_cache_root", MODEL_CHECKPOINT_CACHE_DIR)
+
+# Startup warm-up: synthetic lines of these lengths (seconds) go through every character
+# and F0 method, plus one Whisper alignment, before /ready reports ready; empty disables
+WARMUP_LENGTHS = [float(length) for length in os.getenv("WARMUP_LENGTHS", "1,4,10").split(",") if length.strip()]
+WARMUP_F0_METHODS = [method.strip() for method in os.getenv("WARMUP_F0_METHODS", RVC_F0_METHOD).split(",") if method.strip()]
+
+# Video job scheduling
+VIDEO_MAX_CONCURRENT_JOBS = int(os.getenv("VIDEO_MAX_CONCURRENT_JOBS", "1"))
+VIDEO_MAX_QUEUED_JOBS = int(os.getenv("VIDEO_MAX_QUEUED_JOBS", "20"))
+VIDEO_JOB_DEFAULT_DURATION = float(os.getenv("VIDEO_JOB_DEFAULT_DURATION", "120"))
+
+# Video job persistence
+JOB_STORE_BACKEND = os.getenv("JOB_STORE_BACKEND", "sqlite")  # "sqlite" or "memory"
+JOB_DATA_DIR = os.getenv("JOB_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp", "jobs"))
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", os.path.join(JOB_DATA_DIR, "jobs.sqlite3"))
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "3600"))  # seconds a finished job is kept
+JOB_EVICTION_INTERVAL = float(os.getenv("JOB_EVICTION_INTERVAL", "60"))
+
+# Video downloads: with a prefix set (e.g. "/internal/videos/"), the API answers with
+# X-Accel-Redirect to that prefix + the file's path under JOB_DATA_DIR and nginx sends the bytes
+VIDEO_ACCEL_REDIRECT_PREFIX = os.getenv("VIDEO_ACCEL_REDIRECT_PREFIX", "")
+
+# Conversation pipeline stage concurrency (per video job)
+CONVERSATION_TTS_CONCURRENCY = int(os.getenv("CONVERSATION_TTS_CONCURRENCY", "6"))  # lines fetching TTS at once
+CONVERSATION_RVC_CONCURRENCY = int(os.getenv("CONVERSATION_RVC_CONCURRENCY", "2"))
+CONVERSATION_ALIGN_CONCURRENCY = int(os.getenv("CONVERSATION_ALIGN_CONCURRENCY", "1"))
+
+# Executors for blocking work
+IO_EXECUTOR_WORKERS = int(os.getenv("IO_EXECUTOR_WORKERS", "8"))
+INFERENCE_EXECUTOR = os.getenv("INFERENCE_EXECUTOR", "thread")  # "thread" or "process"
+INFERENCE_EXECUTOR_WORKERS = int(os.getenv("INFERENCE_EXECUTOR_WORKERS", "2"))
+INFERENCE_EXECUTOR_START_METHOD = os.getenv("INFERENCE_EXECUTOR_START_METHOD", "spawn")
+
+# Priority lanes for inference slots; interactive /tts/ runs ahead of /tts/batch, then video segments.
+# The video lane defaults to one below INFERENCE_EXECUTOR_WORKERS, keeping a slot free for /tts/.
+SCHEDULER_INTERACTIVE_CONCURRENCY = int(os.getenv("SCHEDULER_INTERACTIVE_CONCURRENCY", "2"))
+SCHEDULER_BATCH_CONCURRENCY = int(os.getenv("SCHEDULER_BATCH_CONCURRENCY", "1"))
+SCHEDULER_VIDEO_CONCURRENCY = int(os.getenv("SCHEDULER_VIDEO_CONCURRENCY", str(max(1, INFERENCE_EXECUTOR_WORKERS - 1))))
+
+# Batch TTS (/tts/batch)
+BATCH_TTS_MAX_LINES = int(os.getenv("BATCH_TTS_MAX_LINES", "50"))
+BATCH_TTS_CONCURRENCY = int(os.getenv("BATCH_TTS_CONCURRENCY", "4"))  # parallel TTS fetches per batch
+
+# Streaming /tts/stream: sentences shorter than the minimum are merged with the next one
+TTS_STREAM_MIN_SENTENCE_CHARS = int(os.getenv("TTS_STREAM_MIN_SENTENCE_CHARS", "20"))
+TTS_STREAM_CROSSFADE_MS = float(os.getenv("TTS_STREAM_CROSSFADE_MS", "30"))
+
+# Load shedding: reject with 503 + Retry-After when the estimated completion time exceeds the budget (0 disables)
+TTS_LATENCY_BUDGET = float(os.getenv("TTS_LATENCY_BUDGET", "30"))
+BATCH_TTS_LATENCY_BUDGET = float(os.getenv("BATCH_TTS_LATENCY_BUDGET", "300"))
+VIDEO_LATENCY_BUDGET = float(os.getenv("VIDEO_LATENCY_BUDGET", "1800"))
+
+# Multi-process serving (serve.py)
+SERVE_WORKERS = int(os.getenv("SERVE_WORKERS", "2"))
+SERVE_TORCH_THREADS = int(os.getenv("SERVE_TORCH_THREADS", "0"))  # 0 = cores / workers
+
+# Streaming media uploads
+MEDIA_UPLOAD_DIR = os.getenv("MEDIA_UPLOAD_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "uploads"))
+MEDIA_MAX_IMAGE_MB = float(os.getenv("MEDIA_MAX_IMAGE_MB", "10"))
+MEDIA_MAX_VIDEO_MB = float(os.getenv("MEDIA_MAX_VIDEO_MB", "50"))
+
+# Video progress stream (Server-Sent Events)
+PROGRESS_POLL_INTERVAL = float(os.getenv("PROGRESS_POLL_INTERVAL", "1.0"))
+PROGRESS_KEEPALIVE_INTERVAL = float(os.getenv("PROGRESS_KEEPALIVE_INTERVAL", "15"))
+RENDER_PROGRESS_INTERVAL = float(os.getenv("RENDER_PROGRESS_INTERVAL", "1.0"))  # min seconds between render progress writes
+
+# Deduplication of identical video requests
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp", "results"))
+RESULT_CACHE_MAX_MB = float(os.getenv("RESULT_CACHE_MAX_MB", "2048"))  # 0 disables the cache
+
+# Per-job scratch workspaces; small intermediates go to WORKSPACE_TMPFS_DIR when set (e.g. /dev/shm/rvc-work)
+WORKSPACE_DIR = os.getenv("WORKSPACE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp", "work"))
+WORKSPACE_TMPFS_DIR = os.getenv("WORKSPACE_TMPFS_DIR", "")
+WORKSPACE_TMPFS_MAX_MB = float(os.getenv("WORKSPACE_TMPFS_MAX_MB", "512"))  # beyond this, small files spill to disk
+WORKSPACE_JOB_QUOTA_MB = float(os.getenv("WORKSPACE_JOB_QUOTA_MB", "2048"))
+WORKSPACE_TOTAL_QUOTA_MB = float(os.getenv("WORKSPACE_TOTAL_QUOTA_MB", "10240"))
+WORKSPACE_TTL = float(os.getenv("WORKSPACE_TTL", "7200"))  # seconds before the sweeper reclaims a workspace
+
+# TTS audio cache, keyed by everything sent to the provider
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp", "tts-cache"))
+TTS_CACHE_MAX_MB = float(os.getenv("TTS_CACHE_MAX_MB", "512"))  # 0 disables the cache
+
+# Metrics (/metrics); each process writes a snapshot here that the endpoint merges
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(tempfile.gettempdir(), "rvc-metrics"))
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+
+# Per-request tracing; finished video job traces are appended here as OTLP/JSON lines ("" disables export)
+TRACE_FILE = os.getenv("TRACE_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp", "traces.jsonl"))
@@ -0,0 +1,16 @@
+"""Test setup: keep the job store, caches and workspaces under a temporary directory"""
+import os
+import tempfile
+
+_root = tempfile.mkdtemp(prefix="rvc-tests-")
+for _name in (
+    "JOB_DATA_DIR",
+    "MEDIA_UPLOAD_DIR",
+    "RESULT_CACHE_DIR",
+    "WORKSPACE_DIR",
+    "TTS_CACHE_DIR",
+    "METRICS_DIR",
+):
+    os.environ.setdefault(_name, os.path.join(_root, _name.lower()))
+os.environ.setdefault("TRACE_FILE", os.path.join(_root, "traces.jsonl"))
+os.environ.setdefault("JOB_STORE_BACKEND", "memory")
@@ -83,8 +83,8 @@ case "${1:-default}" in
         exec python -m uvicorn api:app --host 0.0.0.0 --port 8000 --reload
         ;;
     "prod")
-        echo "🚀 Starting in production mode..."
-        exec python -m uvicorn api:app --host 0.0.0.0 --port 8000 --workers 1
+        echo "🚀 Starting in production mode with ${SERVE_WORKERS:-2} workers sharing preloaded models..."
+        exec python serve.py --host 0.0.0.0 --port 8000 --workers "${SERVE_WORKERS:-2}"
         ;;
     "shell")
         echo "🐚 Starting shell..."
@@ -1,15 +1,26 @@
 import os
-import tempfile
-import time
-import uuid
 import asyncio
-from typing import List, Optional
+from typing import Awaitable, Callable, List, Optional
 
 from video.types import AudioFileData, CharacterTimeline, ImageOverlay, VideoConfig
 from video.audio_processing import write_combined_audio_file
-from video.file_utils import write_subtitle_file, write_image_overlay_files, cleanup_temp_files
+from video.file_utils import write_subtitle_file, write_image_overlay_files, cleanup_temp_files, read_bytes
 from video.video_effects import create_character_overlay_expressions
 from video.ffmpeg_utils import build_ffmpeg_inputs, build_filter_complex, build_ffmpeg_command
+from api_modules.executors import run_io
+from api_modules.metrics import time_stage
+from api_modules.workspace import scratch_path
+
+async def read_ffmpeg_progress(stream: asyncio.StreamReader, duration: float,
+                               on_progress: Callable[[float], Awaitable[None]]) -> None:
+    """Parse ffmpeg -progress output and report the percentage of duration rendered"""
+    async for line in stream:
+        key, _, value = line.decode(errors="ignore").strip().partition("=")
+        # out_time_ms is in microseconds too (a long-standing ffmpeg quirk)
+        if key in ("out_time_us", "out_time_ms") and value.isdigit() and duration > 0:
+            await on_progress(min(int(value) / 1_000_000 / duration * 100, 100.0))
+        elif key == "progress" and value == "end":
+            await on_progress(100.0)
 
 async def create_final_video_with_buffers(
     video_path: str,
@@ -20,9 +31,13 @@ async def create_final_video_with_buffers(
     character_timeline: List[CharacterTimeline],
     duration: float,
     image_overlays: Optional[List[ImageOverlay]] = None,
-    config: Optional[VideoConfig] = None
+    config: Optional[VideoConfig] = None,
+    on_progress: Optional[Callable[[float], Awaitable[None]]] = None
 ) -> bytes:
-    """Create final video with character overlays, subtitles, and image overlays"""
+    """Create final video with character overlays, subtitles, and image overlays.
+
+    on_progress, if given, is awaited with the render percentage as ffmpeg reports it.
+    """
     
     if config is None:
         config = VideoConfig()
@@ -31,9 +46,9 @@ async def create_final_video_with_buffers(
     fade_out_duration = config.subtitle_config.fade_out_duration
     
     # Prepare temporary files
-    subtitle_path = write_subtitle_file(subtitle_content)
+    subtitle_path = await run_io(write_subtitle_file, subtitle_content)
     combined_audio_path = await write_combined_audio_file(audio_data)
-    overlay_temp_files = write_image_overlay_files(image_overlays)
+    overlay_temp_files = await run_io(write_image_overlay_files, image_overlays)
     
     try:
         # Create character overlay expressions
@@ -52,25 +67,32 @@ async def create_final_video_with_buffers(
             overlay_temp_files, subtitle_path
         )
         
-        output_path = os.path.join(tempfile.gettempdir(), f"output_{int(time.time())}_{uuid.uuid4()}.mp4")
+        output_path = scratch_path("output", ".mp4", large=True)
         
-        command = build_ffmpeg_command(inputs, filter_complex, output_path)
+        command = build_ffmpeg_command(inputs, filter_complex, output_path, report_progress=on_progress is not None)
         
         # Run FFmpeg
-        process = await asyncio.create_subprocess_exec(
-            *command,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        
-        stdout, stderr = await process.communicate()
+        with time_stage("ffmpeg_render"):
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            
+            if on_progress is not None:
+                # Drain stderr concurrently so ffmpeg never blocks on a full pipe
+                stderr_task = asyncio.create_task(process.stderr.read())
+                await read_ffmpeg_progress(process.stdout, duration, on_progress)
+                stderr = await stderr_task
+                await process.wait()
+            else:
+                stdout, stderr = await process.communicate()
         
         if process.returncode != 0:
             raise RuntimeError(f"FFmpeg processing failed: {stderr.decode()}")
         
         # Read output video
-        with open(output_path, 'rb') as f:
-            video_buffer = f.read()
+        video_buffer = await run_io(read_bytes, output_path)
         
         # Cleanup
         os.unlink(output_path)
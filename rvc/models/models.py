@@ -1,92 +1,303 @@
-import sys
 import os
+import time
+import functools
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
 from config import *
 from rvc.infer.modules.vc.modules import VC
+from rvc.infer.modules.vc.index import index_manager
+from rvc.infer.modules.vc.encoders import encoder_registry, is_directml
 from rvc.configs.config import Config
-from dotenv import load_dotenv
+from models.residency import ModelResidency, module_bytes
+from api_modules.metrics import registry, model_load_duration, record_cache, faiss_index_bytes
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# One lock per character so different characters can load in parallel
+_load_locks = {character: threading.Lock() for character in MODEL_CONFIG}
+_config_lock = threading.Lock()
+_encoder_lock = threading.Lock()
+
+# Least recently used characters are unloaded once MODEL_MEMORY_BUDGET_MB is exceeded
+model_residency = ModelResidency(MODEL_MEMORY_BUDGET_MB * 1024 * 1024, MODEL_PINNED)
+
+
+class ModelReadiness:
+    """Load state of every component preload_all_models brings in"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.components: Dict[str, dict] = {}
+        self.complete = False
+
+    def begin(self, names):
+        with self._lock:
+            self.complete = False
+            for name in names:
+                self.components.setdefault(name, {"state": "pending"})
+
+    def update(self, name: str, state: str, **details):
+        with self._lock:
+            self.components[name] = {"state": state, **details}
+
+    def state(self, name: str) -> Optional[str]:
+        with self._lock:
+            return self.components.get(name, {}).get("state")
+
+    def finish(self):
+        with self._lock:
+            self.complete = True
+
+    @property
+    def ready(self) -> bool:
+        with self._lock:
+            return self.complete and all(
+                component["state"] in ("ready", "skipped") for component in self.components.values()
+            )
+
+    def status(self) -> dict:
+        with self._lock:
+            components = {name: dict(component) for name, component in self.components.items()}
+        resident = sum(1 for component in components.values() if component["state"] in ("ready", "skipped"))
+        return {
+            "ready": self.ready,
+            "loaded": resident,
+            "total": len(components),
+            "components": components
+        }
+
+
+model_readiness = ModelReadiness()
+
+
+def get_rvc_config() -> Config:
+    """The RVC Config singleton, created once even when characters load concurrently"""
+    with _config_lock:
+        return Config()
+
+
 def load_model(character: str):
     """Load the RVC model for the specified character if not already loaded"""
     global models
-    
+
     if character not in MODEL_CONFIG:
         raise ValueError(f"Unknown character: {character}. Available: {list(MODEL_CONFIG.keys())}")
-    
-    if character not in models:
-        logger.info(f"Loading model for {character}...")
-        
-        # Override sys.argv to prevent argument parsing conflicts
-        original_argv = sys.argv.copy()
-        original_cwd = os.getcwd()
-        
-        try:
-            # Set up sys.argv like main.py expects
-            sys.argv = [sys.argv[0]]
-            
-            # Change to the RVC directory where configs are located
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            rvc_dir = os.path.join(script_dir, "..", "rvc")
-            os.chdir(rvc_dir)
-            
-            # Set up environment variables for RVC
-            assets_dir = os.path.join(os.getcwd(), "assets")
-            os.environ["weight_root"] = os.path.join(assets_dir, "weights")
-            os.environ["index_root"] = os.path.join(assets_dir, "weights") 
-            os.environ["rmvpe_root"] = os.path.join(assets_dir, "rmvpe")
-            
-            print(f"Loading model {character}...")
-            print(f"Working directory: {os.getcwd()}")
-            print(f"Weight root: {os.environ.get('weight_root')}")
-            print(f"Model path: {MODEL_CONFIG[character]['model_path']}")
-
-            load_dotenv()
-            config = Config()
-            print(f"Using device: {config.device}")
-            print(f"Half precision: {config.is_half}")
-            
-            # Check if model files exist
-            model_file = os.path.join(os.environ.get('weight_root'), MODEL_CONFIG[character]['model_path'])
-            if not os.path.exists(model_file):
-                logger.error(f"Model file not found: {model_file}")
-                raise FileNotFoundError(f"Model file not found: {model_file}")
-            
-            # Check Hubert model
-            hubert_path = os.path.join(assets_dir, "hubert", "hubert_base.pt")
-            if not os.path.exists(hubert_path):
-                logger.error(f"Hubert model not found: {hubert_path}")
-                raise FileNotFoundError(f"Hubert model not found: {hubert_path}")
-            
-            logger.info(f"Model files verified, loading VC model...")
-            vc = VC(config)
-            vc.get_vc(MODEL_CONFIG[character]["model_path"])
+
+    with _load_locks[character]:
+        if character not in models:
+            record_cache("model", hit=False)
+            with model_load_duration.time(character=character):
+                _load_model_locked(character)
+                # Read the retrieval index now rather than on the first conversion
+                index = index_manager.get(MODEL_CONFIG[character]["index_path"])
+            vc = models[character]
+            model_residency.admit(character, _resident_size(vc, index), _unload_model)
+        else:
+            record_cache("model", hit=True)
+            logger.info(f"Model {character} already loaded")
+            vc = models[character]
+            model_residency.touch(character)
+
+    return vc
+
+def startup_characters() -> List[str]:
+    """Characters to preload and warm up: all of them, or only the pinned ones under a memory budget"""
+    if model_residency.budget_bytes <= 0:
+        return list(MODEL_CONFIG)
+    return [character for character in MODEL_CONFIG if character in model_residency.pinned]
+
+def _resident_size(vc: VC, index) -> int:
+    """Bytes a loaded character adds: its synthesizer plus its index (big_npy only when not mmapped)"""
+    size = module_bytes(vc.net_g)
+    if index is not None:
+        usage = index.memory_usage()
+        size += usage["index"] + (0 if index.mmapped else usage["big_npy"])
+    return size
+
+def _unload_model(character: str) -> bool:
+    """Drop a character's model and index; False if it is being loaded right now"""
+    if not _load_locks[character].acquire(blocking=False):
+        return False
+    try:
+        models.pop(character, None)
+        index_manager.evict(MODEL_CONFIG[character]["index_path"])
+        model_residency.forget(character)
+    finally:
+        _load_locks[character].release()
+    import torch
+
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+    return True
+
+def _load_model_locked(character: str):
+    """Load a character model into the global models dict; caller holds its load lock"""
+    logger.info(f"Loading model for {character}...")
+
+    try:
+        print(f"Loading model {character}...")
+        print(f"Weight root: {os.environ.get('weight_root')}")
+        print(f"Model path: {MODEL_CONFIG[character]['model_path']}")
+
+        config = get_rvc_config()
+        print(f"Using device: {config.device}")
+        print(f"Half precision: {config.is_half}")
+
+        # Check if model files exist
+        model_file = os.path.join(os.environ.get('weight_root'), MODEL_CONFIG[character]['model_path'])
+        if not os.path.exists(model_file):
+            logger.error(f"Model file not found: {model_file}")
+            raise FileNotFoundError(f"Model file not found: {model_file}")
+
+        # Check Hubert model
+        if not os.path.exists(RVC_HUBERT_PATH):
+            logger.error(f"Hubert model not found: {RVC_HUBERT_PATH}")
+            raise FileNotFoundError(f"Hubert model not found: {RVC_HUBERT_PATH}")
+
+        logger.info(f"Model files verified, loading VC model...")
+        vc = VC(config)
+        vc.get_vc(MODEL_CONFIG[character]["model_path"])
+        with _encoder_lock:
+            _attach_encoders(vc)
             models[character] = vc
-            print(f"Successfully loaded model {character}")
-            logger.info(f"Successfully loaded model {character}")
-            
-        except Exception as e:
-            logger.error(f"Failed to load model {character}: {str(e)}")
-            raise
-        finally:
-            # Restore original state
-            sys.argv = original_argv
-            os.chdir(original_cwd)
+        print(f"Successfully loaded model {character}")
+        logger.info(f"Successfully loaded model {character}")
+
+    except Exception as e:
+        logger.error(f"Failed to load model {character}: {str(e)}")
+        raise
+
+def _attach_encoders(vc: VC):
+    """Point a VC at the shared encoders that have been loaded so far; caller holds _encoder_lock"""
+    config = vc.config
+    hubert = encoder_registry.peek("hubert", config.device, config.is_half)
+    if hubert is not None and vc.hubert_model is None:
+        vc.hubert_model = hubert
+    rmvpe = encoder_registry.peek("rmvpe", config.device, config.is_half)
+    if rmvpe is not None and vc.pipeline is not None:
+        vc.pipeline.model_rmvpe = rmvpe
+
+def load_shared_hubert():
+    """Load the HuBERT encoder once for every character instead of once per VC"""
+    encoder_registry.hubert(get_rvc_config())
+    with _encoder_lock:
+        for vc in models.values():
+            _attach_encoders(vc)
+
+def load_shared_rmvpe() -> Optional[str]:
+    """Load the RMVPE pitch model once for every character; returns a reason when skipped"""
+    rmvpe_path = encoder_registry.rmvpe_path()
+    if not os.path.exists(rmvpe_path):
+        if RVC_F0_METHOD == "rmvpe":
+            raise FileNotFoundError(f"RMVPE model not found: {rmvpe_path}")
+        return f"{rmvpe_path} not found and RVC_F0_METHOD is {RVC_F0_METHOD}"
+
+    config = get_rvc_config()
+    if is_directml(config.device):
+        return "DirectML pipelines load a private RMVPE per call"
+    encoder_registry.rmvpe(config.device, config.is_half)
+    with _encoder_lock:
+        for vc in models.values():
+            _attach_encoders(vc)
+    return None
+
+def load_whisper() -> Optional[str]:
+    """Load Whisper for subtitle alignment; returns a reason when skipped"""
+    from models.whisper import WHISPER_AVAILABLE, load_whisper_model
+
+    if not WHISPER_AVAILABLE:
+        return "whisper-timestamped is not installed"
+    load_whisper_model()
+    return None
+
+def _preload_character(character: str) -> None:
+    load_model(character)
+
+def collect_index_metrics():
+    for path, usage in index_manager.memory_usage().items():
+        for part, size in usage.items():
+            faiss_index_bytes.set(size, index=os.path.basename(path), part=part)
+
+registry.add_collector(collect_index_metrics)
+
+def _preload_component(name: str, loader: Callable[[], Optional[str]]) -> str:
+    model_readiness.update(name, "loading")
+    started = time.time()
+    try:
+        skipped = loader()
+    except Exception as e:
+        model_readiness.update(name, "failed", error=str(e), seconds=round(time.time() - started, 2))
+        raise
+    if skipped:
+        model_readiness.update(name, "skipped", reason=skipped)
+    else:
+        model_readiness.update(name, "ready", seconds=round(time.time() - started, 2))
+    return name
+
+def preload_all_models(workers: int = MODEL_PRELOAD_WORKERS):
+    """Preload every character, HuBERT, RMVPE and Whisper in parallel at startup.
+
+    Loading is mostly file reads and tensor copies, which release the GIL,
+    so the components overlap rather than adding up. Progress is tracked in
+    model_readiness, which backs the /ready endpoint. Components that are
+    already loaded (e.g. in a forked worker) return straight away. With
+    MODEL_MEMORY_BUDGET_MB set only pinned characters are preloaded; the
+    rest load on their first request.
+    """
+    components: Dict[str, Callable[[], Optional[str]]] = {
+        f"model:{character}": functools.partial(_preload_character, character)
+        for character in startup_characters()
+    }
+    components["hubert"] = load_shared_hubert
+    components["rmvpe"] = load_shared_rmvpe
+    components["whisper"] = load_whisper
+    # Warm-up (models.warmup) runs afterwards but has to pass before the instance is ready
+    model_readiness.begin(list(components) + (["warmup"] if WARMUP_LENGTHS else []))
+
+    logger.info(f"Preloading {len(components)} components with {workers} threads...")
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="preload") as pool:
+        futures = {pool.submit(_preload_component, name, loader): name for name, loader in components.items()}
+        for done, future in enumerate(as_completed(futures), start=1):
+            name = futures[future]
+            try:
+                future.result()
+                state = model_readiness.state(name)
+                logger.info(f"[{done}/{len(futures)}] Preloaded {name} ({state})")
+            except Exception as e:
+                logger.error(f"[{done}/{len(futures)}] Failed to preload {name}: {str(e)}")
+    model_readiness.finish()
+
+    failed = [name for name in components if model_readiness.state(name) == "failed"]
+    if failed:
+        logger.warning(f"Model preloading finished in {time.time() - started:.1f}s; failed: {', '.join(failed)}")
     else:
-        logger.info(f"Model {character} already loaded")
-    
-    return models[character]
-
-def preload_all_models():
-    """Preload all models at startup to avoid loading during requests"""
-    logger.info("Preloading all models...")
-    for character in MODEL_CONFIG.keys():
-        try:
-            load_model(character)
-            logger.info(f"Preloaded model: {character}")
-        except Exception as e:
-            logger.error(f"Failed to preload model {character}: {str(e)}")
-    logger.info("Model preloading complete")
+        logger.info(f"Model preloading complete in {time.time() - started:.1f}s")
+
+
+def share_loaded_models():
+    """Prepare preloaded models to be shared copy-on-write by forked workers.
+
+    Loads the HuBERT encoder eagerly if preloading didn't (it is otherwise
+    loaded on the first conversion, which would give every worker its own
+    copy), turns off autograd on every weight and moves CPU weights into
+    shared memory so that no worker ever writes to, and thereby duplicates,
+    those pages.
+    """
+    import torch
 
+    torch.set_grad_enabled(False)
+    config = get_rvc_config()
+    if encoder_registry.peek("hubert", config.device, config.is_half) is None:
+        logger.info("Loading HuBERT before forking workers")
+    load_shared_hubert()
+    for character, vc in models.items():
+        for module in (vc.net_g, vc.hubert_model):
+            module.eval()
+            module.requires_grad_(False)
+            if str(vc.config.device) == "cpu":
+                module.share_memory()
+    logger.info(f"Prepared {len(models)} models for sharing across workers")
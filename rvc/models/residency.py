@@ -0,0 +1,95 @@
+"""Which character models stay in memory.
+
+Every loaded character costs its synthesizer weights plus its retrieval
+index. ModelResidency records those sizes in least-recently-used order and,
+once the total passes MODEL_MEMORY_BUDGET_MB, drops the characters that
+were used longest ago so the next request reloads them (from the slim
+checkpoint cache, see load_checkpoint). Characters in MODEL_PINNED are
+never evicted.
+
+A conversion already running keeps its own reference to the model, so an
+evicted model is freed once that call returns.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable
+
+from api_modules.metrics import model_evictions, model_resident_bytes
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+
+def module_bytes(module) -> int:
+    """Bytes held by a torch module's parameters and buffers"""
+    tensors = list(module.parameters()) + list(module.buffers())
+    return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+
+
+class ModelResidency:
+    def __init__(self, budget_bytes: float, pinned: Iterable[str]):
+        self.budget_bytes = budget_bytes
+        self.pinned = set(pinned)
+        self._sizes: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def resident_bytes(self) -> int:
+        return sum(self._sizes.values())
+
+    def touch(self, character: str):
+        """Mark a resident character as just used"""
+        with self._lock:
+            if character in self._sizes:
+                self._sizes.move_to_end(character)
+
+    def admit(self, character: str, size: int, evict: Callable[[str], bool]):
+        """Record a freshly loaded character, then evict least recently used ones over the budget.
+
+        evict(character) unloads a character, calling forget() for it, and
+        returns False when it can't right now (e.g. it is being loaded); that
+        character is skipped.
+        """
+        with self._lock:
+            self._sizes[character] = size
+            self._sizes.move_to_end(character)
+            model_resident_bytes.set(size, character=character)
+            if self.budget_bytes <= 0:
+                return
+            candidates = [name for name in self._sizes if name != character and name not in self.pinned]
+
+        for victim in candidates:
+            if self.resident_bytes <= self.budget_bytes:
+                break
+            with self._lock:
+                freed = self._sizes.get(victim, 0)
+            if not evict(victim):
+                continue
+            model_evictions.inc(character=victim)
+            logger.info(f"Evicted model {victim} ({freed / MB:.0f}MB), {self.resident_bytes / MB:.0f}MB resident")
+
+        if self.resident_bytes > self.budget_bytes:
+            logger.warning(
+                f"Resident models use {self.resident_bytes / MB:.0f}MB, over the "
+                f"{self.budget_bytes / MB:.0f}MB budget; nothing left to evict"
+            )
+
+    def forget(self, character: str):
+        """Stop counting a character that has been unloaded"""
+        with self._lock:
+            self._sizes.pop(character, None)
+        model_resident_bytes.set(0, character=character)
+
+    def status(self) -> Dict:
+        with self._lock:
+            sizes = dict(self._sizes)
+        return {
+            "resident_mb": round(sum(sizes.values()) / MB, 1),
+            "budget_mb": round(self.budget_bytes / MB, 1) if self.budget_bytes > 0 else None,
+            "pinned": sorted(self.pinned),
+            # Least recently used first
+            "models": {character: round(size / MB, 1) for character, size in sizes.items()}
+        }
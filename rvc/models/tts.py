@@ -1,9 +1,12 @@
-import requests
-import tempfile
-import subprocess
 import uuid
+from typing import Optional
+import numpy as np
+from scipy.io import wavfile
 from config import *
 import os
+from api_modules.executors import run_io
+from api_modules.tts_cache import tts_cache, tts_cache_key
+from models.tts_client import tts_http_client
 
 def cleanup_temp_files(*file_paths):
     """Clean up temporary files safely"""
@@ -15,8 +18,56 @@ def cleanup_temp_files(*file_paths):
             pass
 
 
+TTS_MODEL_ID = "eleven_monolingual_v1"
+# RVC works on 16 kHz mono, so ask for raw PCM at that rate: nothing to decode or resample
+TTS_SAMPLE_RATE = 16000
+TTS_OUTPUT_FORMAT = f"pcm_{TTS_SAMPLE_RATE}"
+
+
+def pcm_to_int16(pcm: bytes) -> np.ndarray:
+    """Samples of a little-endian 16-bit PCM body"""
+    return np.frombuffer(pcm[:len(pcm) // 2 * 2], dtype="<i2")
+
+
+def read_tts_audio(path: str) -> np.ndarray:
+    """Float32 samples of a WAV written by generate_tts_audio, ready for vc_single"""
+    sample_rate, data = wavfile.read(path)
+    if sample_rate != TTS_SAMPLE_RATE or data.dtype != np.int16:
+        raise ValueError(f"Unexpected TTS audio in {path}: {sample_rate} Hz, {data.dtype}")
+    return data.astype(np.float32) / 32768.0
+
+
+async def _synthesize_elevenlabs(request_id: str, character: str, voice_id: str, data: dict, output_path: str) -> bool:
+    """Fetch the line from ElevenLabs as 16 kHz PCM and save it as a WAV at output_path"""
+    url = f"{ELEVENLABS_API_URL}/v1/text-to-speech/{voice_id}"
+    
+    headers = {
+        "Content-Type": "application/json",
+        "xi-api-key": ELEVENLABS_API_KEY
+    }
+    
+    # Pooled keep-alive connection, hedged when the provider is slow to answer
+    response = await tts_http_client.post_hedged(
+        url, params={"output_format": TTS_OUTPUT_FORMAT}, json=data, headers=headers
+    )
+    try:
+        response.raise_for_status()
+        print(f"[{request_id}] Successfully generated TTS for {character}")
+    except Exception as e:
+        print(f"[{request_id}] ElevenLabs API error: {str(e)}")
+        return False
+    
+    # Wrap the raw PCM in a WAV header; no temp MP3 and no ffmpeg
+    await run_io(wavfile.write, output_path, TTS_SAMPLE_RATE, pcm_to_int16(response.content))
+    return True
+
+
 async def generate_tts_audio(text: str, character: str, output_path: str) -> bool:
-    """Generate TTS audio with character-specific voices"""
+    """Generate TTS audio with character-specific voices.
+
+    Served from the TTS cache when the same line was synthesized before, and
+    concurrent requests for the same line share one provider call.
+    """
     request_id = str(uuid.uuid4())[:8]
     
     # Get character-specific voice ID from config
@@ -31,48 +82,20 @@ async def generate_tts_audio(text: str, character: str, output_path: str) -> boo
         try:
             print(f"[{request_id}] Using {character} voice ID: {character_voice_id}")
             
-            url = f"https://api.elevenlabs.io/v1/text-to-speech/{character_voice_id}"
-            
-            headers = {
-                "Accept": "audio/mpeg",
-                "Content-Type": "application/json",
-                "xi-api-key": ELEVENLABS_API_KEY
-            }
-            
-         
-            
             data = {
                 "text": text,
-                "model_id": "eleven_monolingual_v1",
+                "model_id": TTS_MODEL_ID,
                 "voice_settings": {
                     "stability": 0.5,
                     "similarity_boost": 0.5
                 }
             }
             
-            response = requests.post(url, json=data, headers=headers, timeout=30)
-            try:
-                response.raise_for_status()
-                print(f"[{request_id}] Successfully generated TTS for {character}")
-            except Exception as e:
-                print(f"[{request_id}] ElevenLabs API error: {str(e)}")
-                return False
-            
-            # Save to temporary MP3, then convert
-            with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as mp3_file:
-                mp3_path = mp3_file.name
-                mp3_file.write(response.content)
-            
-            try:
-                subprocess.run(
-                    ["ffmpeg", "-y", "-i", mp3_path, output_path], 
-                    check=True, 
-                    capture_output=True
-                )
-                print(f"[{request_id}] Successfully converted MP3 to WAV for {character}")
-                return True
-            finally:
-                cleanup_temp_files(mp3_path)
+            key = tts_cache_key(character_voice_id, TTS_OUTPUT_FORMAT, data)
+            return await tts_cache.fetch(
+                key, output_path,
+                lambda path: _synthesize_elevenlabs(request_id, character, character_voice_id, data, path)
+            )
         except Exception as e:
             print(f"[{request_id}] TTS generation failed for {character}: {str(e)}")
             # If ElevenLabs fails, we could add fallback logic here
@@ -82,3 +105,14 @@ async def generate_tts_audio(text: str, character: str, output_path: str) -> boo
     
     # If we reach here, TTS generation failed
     return False
+
+
+async def synthesize_speech(text: str, character: str, output_path: str) -> Optional[np.ndarray]:
+    """Generate TTS audio into output_path and return its float32 samples at TTS_SAMPLE_RATE.
+
+    The WAV stays on disk for the cache and job checkpoints; the samples go
+    straight to vc_single, so the RVC stage never runs ffmpeg on it.
+    """
+    if not await generate_tts_audio(text, character, output_path):
+        return None
+    return await run_io(read_tts_audio, output_path)
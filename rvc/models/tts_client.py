@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from config import (
+    TTS_HTTP_MAX_CONNECTIONS,
+    TTS_HTTP_MAX_KEEPALIVE,
+    TTS_HTTP_KEEPALIVE_EXPIRY,
+    TTS_HTTP_HOST_CONCURRENCY,
+    TTS_HTTP_CONNECT_TIMEOUT,
+    TTS_HTTP_WRITE_TIMEOUT,
+    TTS_HTTP_READ_TIMEOUT,
+    TTS_HTTP_POOL_TIMEOUT,
+    TTS_HEDGE_QUANTILE,
+    TTS_HEDGE_MIN_DELAY,
+    TTS_HEDGE_INITIAL_DELAY,
+    TTS_HEDGE_MIN_SAMPLES,
+    TTS_HEDGE_WINDOW
+)
+from api_modules.metrics import tts_hedge_delay, tts_hedges
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class LatencyWindow:
+    """Durations of the most recent provider calls, for the hedge deadline"""
+
+    def __init__(self, size: int):
+        self._samples = deque(maxlen=size)
+
+    def observe(self, seconds: float):
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class TTSHttpClient:
+    """Pooled async HTTP client for the TTS providers.
+
+    One httpx.AsyncClient per event loop keeps TLS connections to the
+    provider alive between lines (multiplexed over HTTP/2 when h2 is
+    installed), and a semaphore per host caps how many requests are in
+    flight to it at once.
+
+    post_hedged sends a second copy of a request that is still running past
+    the recent TTS_HEDGE_QUANTILE latency, keeps whichever answers first and
+    cancels the other, so one stuck call does not hold up a whole video.
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self.latency = LatencyWindow(TTS_HEDGE_WINDOW)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            # Connections and semaphores belong to the loop that created them
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(
+                    max_connections=TTS_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=TTS_HTTP_MAX_KEEPALIVE,
+                    keepalive_expiry=TTS_HTTP_KEEPALIVE_EXPIRY
+                ),
+                timeout=httpx.Timeout(
+                    connect=TTS_HTTP_CONNECT_TIMEOUT,
+                    write=TTS_HTTP_WRITE_TIMEOUT,
+                    read=TTS_HTTP_READ_TIMEOUT,
+                    pool=TTS_HTTP_POOL_TIMEOUT
+                )
+            )
+            self._loop = loop
+            self._host_slots = {}
+            logger.info(f"TTS HTTP client: {'HTTP/2' if HTTP2_AVAILABLE else 'HTTP/1.1'}, "
+                        f"{TTS_HTTP_MAX_CONNECTIONS} connections, {TTS_HTTP_HOST_CONCURRENCY} per host")
+        return self._client
+
+    @asynccontextmanager
+    async def _host_slot(self, url: str) -> AsyncIterator[None]:
+        host = urlsplit(url).netloc
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(TTS_HTTP_HOST_CONCURRENCY)
+        async with self._host_slots[host]:
+            yield
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        client = self._get_client()
+        async with self._host_slot(url):
+            return await client.post(url, **kwargs)
+
+    async def _timed_post(self, url: str, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        response = await self.post(url, **kwargs)
+        self.latency.observe(time.perf_counter() - started)
+        return response
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging a call, or None when hedging is off"""
+        if TTS_HEDGE_QUANTILE <= 0:
+            return None
+        if len(self.latency) < TTS_HEDGE_MIN_SAMPLES:
+            delay = TTS_HEDGE_INITIAL_DELAY
+        else:
+            delay = max(TTS_HEDGE_MIN_DELAY, self.latency.quantile(TTS_HEDGE_QUANTILE))
+        tts_hedge_delay.set(delay)
+        return delay
+
+    async def post_hedged(self, url: str, **kwargs) -> httpx.Response:
+        """POST, racing a duplicate request against the first one once it runs past hedge_delay()"""
+        delay = self.hedge_delay()
+        if delay is None:
+            return await self._timed_post(url, **kwargs)
+
+        # Time the call from the primary's start: when the hedge wins, the primary
+        # took at least that long, and timing only the winner would shrink the window
+        started = time.perf_counter()
+        primary = asyncio.ensure_future(self.post(url, **kwargs))
+        attempts = {primary}
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=delay)
+            hedged = not done
+            if hedged:
+                logger.info(f"TTS call still running after {delay:.1f}s, sending a hedged request")
+                attempts.add(asyncio.ensure_future(self.post(url, **kwargs)))
+
+            error: Optional[BaseException] = None
+            while attempts:
+                done, attempts = await asyncio.wait(attempts, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is None:
+                        self.latency.observe(time.perf_counter() - started)
+                        if hedged:
+                            tts_hedges.inc(winner="primary" if attempt is primary else "hedge")
+                        return attempt.result()
+                    error = attempt.exception()
+            if hedged:
+                tts_hedges.inc(winner="none")
+            raise error
+        finally:
+            # Cancel the slower call
+            for attempt in attempts:
+                attempt.cancel()
+            if attempts:
+                await asyncio.gather(*attempts, return_exceptions=True)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
+
+
+tts_http_client = TTSHttpClient()
@@ -0,0 +1,113 @@
+"""Startup warm-up inference.
+
+The first conversion after boot pays for torch kernel selection, allocator
+growth and the first faiss index read. Pushing a few synthetic lines through
+every character before the instance reports ready moves that cost off the
+first real request. Requests can already arrive meanwhile, so each warm-up
+conversion takes a batch-lane slot and runs on the inference pool like any
+other, behind interactive /tts/ work.
+"""
+import os
+import time
+import shutil
+import logging
+import tempfile
+import numpy as np
+import soundfile as sf
+from typing import List
+from config import MODEL_CONFIG, WARMUP_LENGTHS, WARMUP_F0_METHODS, models
+from api_modules.executors import run_io, run_inference
+from api_modules.metrics import warmup_duration
+from api_modules.scheduler import inference_scheduler
+from models.models import load_model, model_readiness, startup_characters
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+WARMUP_SAMPLE_RATE = 16000
+
+
+def synthetic_voice(seconds: float, sample_rate: int = WARMUP_SAMPLE_RATE) -> np.ndarray:
+    """A voice-like test signal: a gliding 100-250 Hz tone with harmonics, syllable pulses and a little noise"""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    f0 = 175 + 75 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+    wave = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = np.sin(2 * np.pi * 2 * t) ** 2
+    noise = np.random.default_rng(0).standard_normal(len(t))
+    return (0.3 * envelope * wave / np.abs(wave).max() + 0.005 * noise).astype(np.float32)
+
+
+def _write_warmup_inputs(work_dir: str) -> List[str]:
+    paths = []
+    for length in WARMUP_LENGTHS:
+        path = os.path.join(work_dir, f"warmup_{length:g}s.wav")
+        sf.write(path, synthetic_voice(length), WARMUP_SAMPLE_RATE)
+        paths.append(path)
+    return paths
+
+
+def _warm_up_character(character: str, f0_method: str, paths):
+    # load_model rather than models[...]: a process pool worker has its own models
+    vc = load_model(character)
+    for path in paths:
+        info, (_, audio) = vc.vc_single(
+            0, path, 0, None, f0_method, MODEL_CONFIG[character]["index_path"], None, 0.66, 3, 0, 1, 0.33
+        )
+        if audio is None:
+            raise RuntimeError(f"Warm-up conversion failed for {character} ({f0_method}): {info}")
+
+
+def _warm_up_whisper(path: str) -> bool:
+    from models.whisper import WHISPER_AVAILABLE, transcribe_word_segments
+
+    if not WHISPER_AVAILABLE:
+        return False
+    transcribe_word_segments(path)
+    return True
+
+
+async def warm_up_models():
+    """Run synthetic conversions through every loaded character and F0 method, then one Whisper alignment.
+
+    Await it after preload_all_models. Marks the "warmup" readiness
+    component, so /ready stays 503 until it has passed.
+    """
+    if not WARMUP_LENGTHS or model_readiness.state("warmup") == "ready":
+        return
+
+    model_readiness.update("warmup", "loading")
+    started = time.time()
+    work_dir = await run_io(tempfile.mkdtemp, prefix="rvc_warmup_")
+    try:
+        paths = await run_io(_write_warmup_inputs, work_dir)
+
+        for character in startup_characters():
+            if character not in models:
+                logger.warning(f"Skipping warm-up for {character}: model not loaded")
+                continue
+            for f0_method in WARMUP_F0_METHODS:
+                async with inference_scheduler.slot("batch", character):
+                    component_started = time.time()
+                    await run_inference(_warm_up_character, character, f0_method, paths)
+                seconds = time.time() - component_started
+                warmup_duration.set(seconds, component=f"rvc:{character}:{f0_method}")
+                logger.info(f"Warmed up {character} ({f0_method}) in {seconds:.1f}s")
+
+        async with inference_scheduler.slot("batch", "whisper"):
+            component_started = time.time()
+            whisper_warmed = await run_inference(_warm_up_whisper, paths[-1])
+        if whisper_warmed:
+            seconds = time.time() - component_started
+            warmup_duration.set(seconds, component="whisper")
+            logger.info(f"Warmed up Whisper in {seconds:.1f}s")
+
+        seconds = time.time() - started
+        warmup_duration.set(seconds, component="total")
+        model_readiness.update("warmup", "ready", seconds=round(seconds, 2))
+        logger.info(f"Warm-up complete in {seconds:.1f}s")
+    except Exception as e:
+        model_readiness.update("warmup", "failed", error=str(e), seconds=round(time.time() - started, 2))
+        logger.error(f"Warm-up failed: {str(e)}")
+    finally:
+        await run_io(shutil.rmtree, work_dir, ignore_errors=True)
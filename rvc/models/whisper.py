@@ -1,8 +1,12 @@
 import os
-import tempfile
+import threading
 import uuid
 from fastapi import HTTPException, File, Form, UploadFile
 from config import whisper_model
+from api_modules.executors import run_io, run_inference
+from api_modules.scheduler import inference_scheduler
+from api_modules.workspace import job_workspace
+from video.file_utils import write_bytes
 
 
 try: 
@@ -12,6 +16,9 @@ except ImportError:
     WHISPER_AVAILABLE = False
     pass
 
+# Startup preloading and the first alignment may both try to load the model
+_whisper_load_lock = threading.Lock()
+
 def load_whisper_model():
     """Load the Whisper model for word-level timing if not already loaded"""
     global whisper_model
@@ -20,14 +27,46 @@ def load_whisper_model():
     if not WHISPER_AVAILABLE:
         raise RuntimeError("whisper-timestamped is not installed. Install with: pip install whisper-timestamped")
     
-    if whisper_model is None:
-        try:
+    with _whisper_load_lock:
+        if whisper_model is None:
             # Use small model for balance of speed and accuracy
             whisper_model = whisper.load_model("small", device="cpu")
-        except Exception as e:
-            raise e
     return whisper_model
 
+def transcribe_word_segments(audio_path: str, language: str = "en"):
+    """Transcribe an audio file and return word-level segments (blocking)"""
+    model = load_whisper_model()
+    
+    # Load audio and transcribe with word-level timestamps
+    audio_data = whisper.load_audio(audio_path)
+    
+    # Use whisper-timestamped's transcribe function (not transcribe_timestamped)
+    # The API is: whisper.transcribe(model, audio, **kwargs)
+    result = whisper.transcribe(
+        model, 
+        audio_data,
+        language=language,
+        verbose=False
+    )
+    
+    # Extract word segments from whisper-timestamped format
+    word_segments = []
+    
+    if "segments" in result:
+        for segment in result["segments"]:
+            
+            # whisper-timestamped puts words directly in segments
+            if "words" in segment and segment["words"]:
+                for word_data in segment["words"]:
+                    if isinstance(word_data, dict) and "text" in word_data:
+                        word_segments.append({
+                            "word": word_data.get("text", "").strip(),
+                            "start": word_data.get("start", 0),
+                            "end": word_data.get("end", 0)
+                        })
+    
+    return word_segments
+
 async def whisper_timestamped_endpoint(
     audio: UploadFile = File(...),
     text: str = Form(...)
@@ -45,68 +84,17 @@ async def whisper_timestamped_endpoint(
     if not text.strip():
         raise HTTPException(status_code=400, detail="Text cannot be empty")
     
-    temp_audio_path = None
-    
     try:
-        # Save uploaded audio to temp file
-        temp_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-        temp_audio_path = temp_file.name
-        
-        audio_content = await audio.read()
-        
-        temp_file.write(audio_content)
-        temp_file.close()
-        
-        # Load Whisper model
-        model = load_whisper_model()
-        
-        # Load audio and transcribe with word-level timestamps
-        audio_data = whisper.load_audio(temp_audio_path)
-        
-        # Use whisper-timestamped for accurate word timing
-        try:
-            # Use whisper-timestamped's transcribe function (not transcribe_timestamped)
-            # The API is: whisper.transcribe(model, audio, **kwargs)
-            result = whisper.transcribe(
-                model, 
-                audio_data,
-                language="en",  # You can make this configurable
-                verbose=False
-            )
-        except Exception as e:
-            raise
-        
-        
-        # Extract word segments from whisper-timestamped format
-        word_segments = []
-        
-        if "segments" in result:
-            for i, segment in enumerate(result["segments"]):
-                
-                # whisper-timestamped puts words directly in segments
-                if "words" in segment and segment["words"]:
-                    for word_data in segment["words"]:
-                        if isinstance(word_data, dict) and "text" in word_data:
-                            word_segments.append({
-                                "word": word_data.get("text", "").strip(),
-                                "start": word_data.get("start", 0),
-                                "end": word_data.get("end", 0)
-                            })
-
-        
-        # Clean up temp file
-        try:
-            os.unlink(temp_audio_path)
-        except Exception:
-            pass
+        # The upload lives in a workspace that is removed once we're done
+        async with job_workspace(f"whisper_{request_id}") as workspace:
+            temp_audio_path = workspace.path("audio.wav")
+            audio_content = await audio.read()
+            await run_io(write_bytes, temp_audio_path, audio_content)
+            
+            # Transcribe on the inference pool so the event loop stays responsive
+            async with inference_scheduler.slot("interactive", "whisper"):
+                word_segments = await run_inference(transcribe_word_segments, temp_audio_path, "en")
         return {"word_segments": word_segments}
         
     except Exception as e:
-        
-        # Clean up temp file on error only if it still exists
-        if 'temp_audio_path' in locals() and os.path.exists(temp_audio_path):
-            try:
-                os.unlink(temp_audio_path)
-            except Exception:
-                pass
         raise HTTPException(status_code=500, detail=f"Whisper timestamped processing failed: {str(e)}")
\ No newline at end of file
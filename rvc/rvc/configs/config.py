@@ -26,6 +26,9 @@ version_config_list = [
     "v2/32k.json",
 ]
 
+# Resolve configs/ from this file rather than the working directory
+configs_dir = os.path.dirname(os.path.abspath(__file__))
+
 
 def singleton_variable(func):
     def wrapper(*args, **kwargs):
@@ -63,10 +66,10 @@ class Config:
     def load_config_json() -> dict:
         d = {}
         for config_file in version_config_list:
-            p = f"configs/inuse/{config_file}"
+            p = os.path.join(configs_dir, "inuse", config_file)
             if not os.path.exists(p):
-                shutil.copy(f"configs/{config_file}", p)
-            with open(f"configs/inuse/{config_file}", "r") as f:
+                shutil.copy(os.path.join(configs_dir, config_file), p)
+            with open(p, "r") as f:
                 d[config_file] = json.load(f)
         return d
 
@@ -90,7 +93,8 @@ class Config:
             action="store_true",
             help="torch_dml",
         )
-        cmd_opts = parser.parse_args()
+        # Ignore the host application's own arguments (uvicorn, serve.py)
+        cmd_opts, _ = parser.parse_known_args()
 
         cmd_opts.port = cmd_opts.port if 0 <= cmd_opts.port <= 65535 else 7865
 
@@ -125,9 +129,10 @@ class Config:
     def use_fp32_config(self):
         for config_file in version_config_list:
             self.json_config[config_file]["train"]["fp16_run"] = False
-            with open(f"configs/inuse/{config_file}", "r") as f:
+            p = os.path.join(configs_dir, "inuse", config_file)
+            with open(p, "r") as f:
                 strr = f.read().replace("true", "false")
-            with open(f"configs/inuse/{config_file}", "w") as f:
+            with open(p, "w") as f:
                 f.write(strr)
         self.preprocess_per = 3.0
 
@@ -4,7 +4,6 @@ from typing import List, Optional, Tuple
 import numpy as np
 import torch
 
-from infer.lib import jit
 
 try:
     # Fix "Torch not compiled with CUDA enabled"
@@ -513,6 +512,8 @@ class RMVPE:
                 self.device = torch.device("cuda:0")
 
             def get_jit_model():
+                from infer.lib import jit
+
                 jit_model_path = model_path.rstrip(".pth")
                 jit_model_path += ".half.jit" if is_half else ".jit"
                 reload = False
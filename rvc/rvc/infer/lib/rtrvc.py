@@ -4,6 +4,7 @@ import sys
 import traceback
 from infer.lib import jit
 from infer.lib.jit.get_synthesizer import get_synthesizer
+from rvc.infer.modules.vc.index import index_manager
 from time import time as ttime
 import fairseq
 import faiss
@@ -80,8 +81,7 @@ class RVC:
             self.is_half = config.is_half
 
             if index_rate != 0:
-                self.index = faiss.read_index(index_path)
-                self.big_npy = self.index.reconstruct_n(0, self.index.ntotal)
+                self.load_index(index_path)
             self.pth_path: str = pth_path
             self.index_path = index_path
             self.index_rate = index_rate
@@ -182,6 +182,15 @@ class RVC:
                 self.device_fcpe = last_rvc.device_fcpe
                 self.model_fcpe = last_rvc.model_fcpe
         except:
+            printt(traceback.format_exc())
+
+    def load_index(self, index_path):
+        # Shared with every other RVC/VC in the process, loaded once per path and mtime
+        loaded = index_manager.get(index_path)
+        if loaded is None:
+            raise RuntimeError("Failed to load index: %s" % index_path)
+        self.index = loaded.index
+        self.big_npy = loaded.big_npy
 
     def change_key(self, new_key):
         self.f0_up_key = new_key
@@ -191,8 +200,7 @@ class RVC:
 
     def change_index_rate(self, new_index_rate):
         if new_index_rate != 0 and self.index_rate == 0:
-            self.index = faiss.read_index(self.index_path)
-            self.big_npy = self.index.reconstruct_n(0, self.index.ntotal)
+            self.load_index(self.index_path)
             printt("Index search enabled")
         self.index_rate = new_index_rate
 
@@ -379,7 +387,11 @@ class RVC:
                         + (1 - self.index_rate) * feats[0][skip_head // 2 :]
                     )
                 else:
+                    printt(
+                        "Invalid index. You MUST use added_xxxx.index but not trained_xxxx.index!"
+                    )
             else:
+                printt("Index search FAILED or disabled")
         except:
             traceback.print_exc()
         t3 = ttime()
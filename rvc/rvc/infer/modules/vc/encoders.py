@@ -0,0 +1,77 @@
+"""Process-wide registry of the encoders every character shares.
+
+HuBERT and the RMVPE pitch model do not depend on the character, so one
+instance per device and precision serves every VC and Pipeline in the
+process instead of one per character. Loading is locked, so threads that
+ask at the same time wait for a single load.
+
+The shared instances are used without a lock: the pipeline only runs them
+in eval mode under torch.no_grad(), which doesn't mutate their weights,
+and their only per-call state is created inside the call.
+
+On DirectML the pipeline deletes RMVPE's ONNX session after every call to
+free runtime memory, so there each caller gets a private copy instead.
+"""
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from rvc.infer.modules.vc.utils import load_hubert
+
+logger = logging.getLogger(__name__)
+
+EncoderKey = Tuple[str, str, bool]
+
+
+def is_directml(device) -> bool:
+    return "privateuseone" in str(device)
+
+
+class EncoderRegistry:
+    def __init__(self):
+        self._encoders: Dict[EncoderKey, Any] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[EncoderKey, threading.Lock] = {}
+
+    def _get(self, key: EncoderKey, loader: Callable[[], Any]) -> Any:
+        encoder = self._encoders.get(key)
+        if encoder is not None:
+            return encoder
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+        with load_lock:
+            encoder = self._encoders.get(key)
+            if encoder is None:
+                logger.info(f"Loading shared {key[0]} encoder on {key[1]} ({'half' if key[2] else 'full'} precision)")
+                encoder = loader()
+                self._encoders[key] = encoder
+            return encoder
+
+    def peek(self, name: str, device, is_half: bool) -> Optional[Any]:
+        """The encoder if it has been loaded, without loading it"""
+        return self._encoders.get((name, str(device), bool(is_half)))
+
+    def hubert(self, config):
+        """The HuBERT content encoder for config's device and precision"""
+        return self._get(("hubert", str(config.device), bool(config.is_half)), lambda: load_hubert(config))
+
+    def rmvpe_path(self) -> str:
+        return os.path.join(os.environ["rmvpe_root"], "rmvpe.pt")
+
+    def rmvpe(self, device, is_half: bool):
+        """The RMVPE pitch model for device and precision (a private, unshared copy on DirectML)"""
+        from rvc.infer.lib.rmvpe import RMVPE
+
+        def load():
+            return RMVPE(self.rmvpe_path(), is_half=is_half, device=device)
+
+        if is_directml(device):
+            return load()
+        return self._get(("rmvpe", str(device), bool(is_half)), load)
+
+    def loaded(self) -> Dict[EncoderKey, Any]:
+        return dict(self._encoders)
+
+
+encoder_registry = EncoderRegistry()
@@ -0,0 +1,133 @@
+"""Process-wide cache of faiss retrieval indexes.
+
+Reading an .index file and reconstructing its feature matrix (big_npy) on
+every conversion costs a disk read and a full float32 copy per line. The
+IndexManager loads each index once, keyed by path and mtime, and hands the
+same index and big_npy to every VC and rtrvc.RVC in the process.
+
+With RVC_INDEX_MMAP=1 (the default) big_npy is written once to a .npy
+sidecar next to the index and memory-mapped read-only, so forked workers
+and separate processes share its pages through the page cache instead of
+each holding a private copy.
+"""
+import logging
+import os
+import threading
+import traceback
+from typing import Dict, Optional
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _sidecar_path(index_path: str) -> str:
+    return os.path.splitext(index_path)[0] + ".big_npy.npy"
+
+
+class LoadedIndex:
+    def __init__(self, path: str, mtime_ns: int, index, big_npy: np.ndarray):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.index = index
+        self.big_npy = big_npy
+
+    @property
+    def mmapped(self) -> bool:
+        return isinstance(self.big_npy, np.memmap)
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Bytes held by big_npy (in the page cache when mmapped) and by the faiss index"""
+        return {
+            "big_npy": int(self.big_npy.nbytes),
+            "index": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+        }
+
+
+class IndexManager:
+    def __init__(self, use_mmap: bool):
+        self.use_mmap = use_mmap
+        self._indexes: Dict[str, LoadedIndex] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+
+    def get(self, path: str) -> Optional[LoadedIndex]:
+        """The loaded index at path, reloading it if the file changed; None if it can't be read"""
+        path = os.path.abspath(path)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        loaded = self._indexes.get(path)
+        if loaded is not None and loaded.mtime_ns == mtime_ns:
+            return loaded
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(path, threading.Lock())
+        with load_lock:
+            loaded = self._indexes.get(path)
+            if loaded is not None and loaded.mtime_ns == mtime_ns:
+                return loaded
+            try:
+                loaded = self._load(path, mtime_ns)
+            except Exception:
+                traceback.print_exc()
+                return None
+            self._indexes[path] = loaded
+            return loaded
+
+    def _load(self, path: str, mtime_ns: int) -> LoadedIndex:
+        index = faiss.read_index(path)
+        big_npy = self._load_sidecar(path, mtime_ns, index) if self.use_mmap else None
+        if big_npy is None:
+            big_npy = index.reconstruct_n(0, index.ntotal)
+            if self.use_mmap:
+                big_npy = self._write_sidecar(path, big_npy)
+        logger.info(
+            f"Loaded index {path}: {index.ntotal} vectors, "
+            f"{big_npy.nbytes / (1024 * 1024):.1f}MB{' mmapped' if isinstance(big_npy, np.memmap) else ''}"
+        )
+        return LoadedIndex(path, mtime_ns, index, big_npy)
+
+    def _load_sidecar(self, path: str, mtime_ns: int, index) -> Optional[np.ndarray]:
+        sidecar = _sidecar_path(path)
+        try:
+            if os.stat(sidecar).st_mtime_ns < mtime_ns:
+                return None
+            big_npy = np.load(sidecar, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        if big_npy.shape != (index.ntotal, index.d) or big_npy.dtype != np.float32:
+            return None
+        return big_npy
+
+    def _write_sidecar(self, path: str, big_npy: np.ndarray) -> np.ndarray:
+        """Save big_npy next to the index and map it back; keeps it in memory if that fails"""
+        sidecar = _sidecar_path(path)
+        tmp_path = f"{sidecar}.{os.getpid()}.tmp.npy"
+        try:
+            np.save(tmp_path, big_npy)
+            os.replace(tmp_path, sidecar)
+            return np.load(sidecar, mmap_mode="r")
+        except OSError as e:
+            logger.warning(f"Could not write index sidecar {sidecar}, keeping it in memory: {str(e)}")
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return big_npy
+
+    def evict(self, path: str):
+        """Forget a loaded index; callers still holding it keep it alive until they finish"""
+        self._indexes.pop(os.path.abspath(path), None)
+
+    def memory_usage(self) -> Dict[str, Dict[str, int]]:
+        """Bytes per loaded index path, split into big_npy and the faiss index itself"""
+        return {path: loaded.memory_usage() for path, loaded in list(self._indexes.items())}
+
+    def loaded(self) -> Dict[str, LoadedIndex]:
+        return dict(self._indexes)
+
+
+index_manager = IndexManager(use_mmap=os.getenv("RVC_INDEX_MMAP", "1") == "1")
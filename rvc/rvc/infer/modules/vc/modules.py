@@ -1,3 +1,4 @@
+import hashlib
 import traceback
 
 import numpy as np
@@ -12,6 +13,7 @@ from rvc.infer.lib.infer_pack.models import (
     SynthesizerTrnMs768NSFsid,
     SynthesizerTrnMs768NSFsid_nono,
 )
+from rvc.infer.modules.vc.encoders import encoder_registry
 from rvc.infer.modules.vc.pipeline import Pipeline
 from rvc.infer.modules.vc.utils import *
 
@@ -27,6 +29,8 @@ class VC:
         self.if_f0 = None
         self.version = None
         self.hubert_model = None
+        self.last_times = {}  # stage timings of the most recent vc_single call
+        self.last_spans = []  # pipeline stage spans of the most recent vc_single call
 
         self.config = config
 
@@ -94,7 +98,7 @@ class VC:
             )
         person = f'{os.getenv("weight_root")}/{sid}'
 
-        self.cpt = torch.load(person, map_location="cpu")
+        self.cpt = load_checkpoint(person)
         self.tgt_sr = self.cpt["config"][-1]
         self.cpt["config"][-3] = self.cpt["weight"]["emb_g.weight"].shape[0]  # n_spk
         self.if_f0 = self.cpt.get("f0", 1)
@@ -114,6 +118,8 @@ class VC:
         del self.net_g.enc_q
 
         self.net_g.load_state_dict(self.cpt["weight"], strict=False)
+        # net_g now holds its own copy of the weights
+        del self.cpt["weight"]
         self.net_g.eval().to(self.config.device)
         if self.config.is_half:
             self.net_g = self.net_g.half()
@@ -155,14 +161,20 @@ class VC:
             return "You need to upload an audio", None
         f0_up_key = int(f0_up_key)
         try:
-            audio = load_audio(input_audio_path, 16000)
+            if isinstance(input_audio_path, np.ndarray):
+                # Already decoded 16 kHz mono samples; key the harvest cache on their content
+                audio = input_audio_path.astype(np.float32)
+                input_audio_path = "pcm:%s" % hashlib.sha1(audio.tobytes()).hexdigest()
+            else:
+                audio = load_audio(input_audio_path, 16000)
             audio_max = np.abs(audio).max() / 0.95
             if audio_max > 1:
                 audio /= audio_max
-            times = [0, 0, 0]
+            times = [0, 0, 0, 0, 0]  # npy, f0, infer, hubert, index search
 
             if self.hubert_model is None:
-                self.hubert_model = load_hubert(self.config)
+                # One HuBERT per process and device, shared by every character
+                self.hubert_model = encoder_registry.hubert(self.config)
 
             if file_index:
                 file_index = (
@@ -207,9 +219,16 @@ class VC:
                 if os.path.exists(file_index)
                 else "Index not used."
             )
+            self.last_times = {
+                "f0": times[1],
+                "hubert": times[3],
+                "index_search": times[4],
+                "infer": times[2],
+            }
+            self.last_spans = list(self.pipeline.stage_spans)
             return (
                 "Success.\n%s\nTime:\nnpy: %.2fs, f0: %.2fs, infer: %.2fs."
-                % (index_info, *times),
+                % (index_info, *times[:3]),
                 (tgt_sr, audio_opt),
             )
         except:
@@ -5,7 +5,6 @@ import traceback
 from functools import lru_cache
 from time import time as ttime
 
-import faiss
 import librosa
 import numpy as np
 import parselmouth
@@ -15,6 +14,9 @@ import torch.nn.functional as F
 import torchcrepe
 from scipy import signal
 
+from rvc.infer.modules.vc.encoders import encoder_registry
+from rvc.infer.modules.vc.index import index_manager
+
 now_dir = os.getcwd()
 sys.path.append(now_dir)
 
@@ -77,6 +79,8 @@ class Pipeline(object):
         self.t_center = self.sr * self.x_center  # 查询切点位置
         self.t_max = self.sr * self.x_max  # 免查询时长阈值
         self.device = config.device
+        # (name, start, end, attributes) of the f0 step and each vc segment of the last call
+        self.stage_spans = []
 
     def get_f0(
         self,
@@ -138,13 +142,8 @@ class Pipeline(object):
             f0 = f0[0].cpu().numpy()
         elif f0_method == "rmvpe":
             if not hasattr(self, "model_rmvpe"):
-                from infer.lib.rmvpe import RMVPE
-
-                self.model_rmvpe = RMVPE(
-                    "%s/rmvpe.pt" % os.environ["rmvpe_root"],
-                    is_half=self.is_half,
-                    device=self.device,
-                )
+                # Shared with every other character's pipeline, except on DirectML
+                self.model_rmvpe = encoder_registry.rmvpe(self.device, self.is_half)
             f0 = self.model_rmvpe.infer_from_audio(x, thred=0.03)
 
             if "privateuseone" in str(self.device):  # clean ortruntime memory
@@ -211,6 +210,7 @@ class Pipeline(object):
         with torch.no_grad():
             logits = model.extract_features(**inputs)
             feats = model.final_proj(logits[0]) if version == "v1" else logits[0]
+        t_hubert = ttime()
         if protect < 0.5 and pitch is not None and pitchf is not None:
             feats0 = feats.clone()
         if (
@@ -269,6 +269,23 @@ class Pipeline(object):
         t2 = ttime()
         times[0] += t1 - t0
         times[2] += t2 - t1
+        if len(times) > 4:
+            # Optional breakdown of npy time: hubert features, then index search
+            times[3] += t_hubert - t0
+            times[4] += t1 - t_hubert
+        self.stage_spans.append(
+            (
+                "vc_segment",
+                t0,
+                t2,
+                {
+                    "samples": int(audio0.shape[0]),
+                    "hubert_seconds": t_hubert - t0,
+                    "index_search_seconds": t1 - t_hubert,
+                    "infer_seconds": t2 - t1,
+                },
+            )
+        )
         return audio1
 
     def pipeline(
@@ -292,20 +309,15 @@ class Pipeline(object):
         protect,
         f0_file=None,
     ):
-        if (
-            file_index != ""
-            # and file_big_npy != ""
-            # and os.path.exists(file_big_npy) == True
-            and os.path.exists(file_index)
-            and index_rate != 0
-        ):
-            try:
-                index = faiss.read_index(file_index)
-                # big_npy = np.load(file_big_npy)
-                big_npy = index.reconstruct_n(0, index.ntotal)
-            except:
-                traceback.print_exc()
-                index = big_npy = None
+        self.stage_spans = []
+        # Loaded once per process and shared between characters' calls (see index.py)
+        loaded_index = (
+            index_manager.get(file_index)
+            if file_index != "" and index_rate != 0
+            else None
+        )
+        if loaded_index is not None:
+            index, big_npy = loaded_index.index, loaded_index.big_npy
         else:
             index = big_npy = None
         audio = signal.filtfilt(bh, ah, audio)
@@ -361,6 +373,8 @@ class Pipeline(object):
             pitchf = torch.tensor(pitchf, device=self.device).unsqueeze(0).float()
         t2 = ttime()
         times[1] += t2 - t1
+        if if_f0 == 1:
+            self.stage_spans.append(("f0", t1, t2, {"f0_method": f0_method}))
         for t in opt_ts:
             t = t // self.window * self.window
             if if_f0 == 1:
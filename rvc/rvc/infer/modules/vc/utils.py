@@ -1,7 +1,11 @@
 import os
 
+import torch
 from fairseq import checkpoint_utils
 
+# Only what inference needs from an RVC .pth; training metadata is dropped
+CHECKPOINT_KEYS = ("config", "weight", "f0", "version")
+
 
 def get_index_path_from_model(sid):
     return next(
@@ -19,6 +23,40 @@ def get_index_path_from_model(sid):
     )
 
 
+def load_checkpoint(person):
+    """Load an RVC .pth for inference.
+
+    With checkpoint_cache_root set, the first load also saves a slim copy
+    (CHECKPOINT_KEYS only) there; later loads memory-map that copy with
+    weights_only, which skips unpickling and reading the whole file up
+    front, so evicted models come back quickly.
+    """
+    cache_root = os.getenv("checkpoint_cache_root")
+    if not cache_root:
+        return torch.load(person, map_location="cpu")
+
+    slim_path = os.path.join(cache_root, os.path.basename(person) + ".slim.pt")
+    try:
+        if os.path.getmtime(slim_path) >= os.path.getmtime(person):
+            return torch.load(slim_path, map_location="cpu", mmap=True, weights_only=True)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        # Truncated or corrupt (e.g. an UnpicklingError); rebuild it from the original
+        print("Could not load slim checkpoint %s, rebuilding it: %s" % (slim_path, e))
+
+    cpt = torch.load(person, map_location="cpu")
+    slim = {key: cpt[key] for key in CHECKPOINT_KEYS if key in cpt}
+    tmp_path = "%s.%d.tmp" % (slim_path, os.getpid())
+    try:
+        os.makedirs(cache_root, exist_ok=True)
+        torch.save(slim, tmp_path)
+        os.replace(tmp_path, slim_path)
+    except OSError as e:
+        print("Could not write slim checkpoint %s: %s" % (slim_path, e))
+    return cpt
+
+
 def load_hubert(config):
     # Get the absolute path to the hubert model
     script_dir = os.path.dirname(os.path.abspath(__file__))
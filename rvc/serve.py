@@ -0,0 +1,161 @@
+"""Production server: preload models once, then fork workers that share them.
+
+The master process loads every character model, HuBERT and Whisper, moves
+the weights into shared memory and then forks N uvicorn workers that all
+accept connections on the same listening socket. Weights are never written
+after loading, so the workers share them copy-on-write instead of each
+holding their own copy.
+
+Usage: python serve.py --host 0.0.0.0 --port 8000 --workers 4
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from multiprocessing import cpu_count
+
+from config import SERVE_WORKERS, SERVE_TORCH_THREADS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("serve")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the RVC API with preloaded, shared models")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=SERVE_WORKERS)
+    return parser.parse_args()
+
+
+def configure_torch(threads: int):
+    """Limit intra-op threads so N workers don't oversubscribe the cores"""
+    import torch
+
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Only allowed before any inter-op work has started
+        pass
+
+
+def preload(workers: int):
+    """Load and share everything the workers need, in the master process"""
+    import torch
+    from models.models import preload_all_models, share_loaded_models
+    from models.whisper import WHISPER_AVAILABLE, load_whisper_model
+
+    if workers > 1 and torch.cuda.is_available():
+        # CUDA contexts can't be inherited across fork
+        raise SystemExit("Forked workers need CPU inference; run with --workers 1 on GPU hosts")
+
+    # Keep the master single-threaded so no OpenMP pool exists when we fork
+    configure_torch(1)
+
+    started = time.time()
+    preload_all_models()
+    share_loaded_models()
+    # Warm-up inference runs in each worker's lifespan instead, since the
+    # thread pools and allocator state it primes don't carry across fork
+    if WHISPER_AVAILABLE:
+        whisper_model = load_whisper_model()
+        whisper_model.eval()
+        whisper_model.requires_grad_(False)
+        whisper_model.share_memory()
+
+    # Import the app here too so its modules are shared rather than imported per worker
+    import api  # noqa: F401
+    logger.info(f"Preloaded models in {time.time() - started:.1f}s")
+
+    # Publish the master's model load times; forked workers start with empty metrics
+    from api_modules.metrics import registry
+    registry.flush()
+
+    # Move everything allocated so far out of the GC's reach so collections
+    # in the workers don't touch (and copy) the pages holding those objects
+    gc.collect()
+    gc.freeze()
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(sock: socket.socket, threads: int):
+    """Body of a forked worker: serve the app on the shared socket"""
+    import uvicorn
+    from api import app
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    configure_torch(threads)
+
+    config = uvicorn.Config(app, log_level="info")
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+
+
+def spawn_worker(sock: socket.socket, threads: int) -> int:
+    pid = os.fork()
+    if pid == 0:
+        try:
+            run_worker(sock, threads)
+        finally:
+            os._exit(0)
+    logger.info(f"Started worker {pid}")
+    return pid
+
+
+def main():
+    args = parse_args()
+    workers = max(1, args.workers)
+    threads = max(1, cpu_count() // workers) if SERVE_TORCH_THREADS <= 0 else SERVE_TORCH_THREADS
+
+    preload(workers)
+    sock = bind_socket(args.host, args.port)
+    logger.info(f"Listening on {args.host}:{args.port} with {workers} workers, {threads} torch threads each")
+
+    children = {spawn_worker(sock, threads) for _ in range(workers)}
+    shutting_down = False
+
+    def shutdown(signum, frame):
+        nonlocal shutting_down
+        shutting_down = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    # Reap workers and replace any that die unexpectedly
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        children.discard(pid)
+        if not shutting_down:
+            logger.warning(f"Worker {pid} exited with status {status}, restarting")
+            children.add(spawn_worker(sock, threads))
+
+    sock.close()
+    logger.info("All workers stopped")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
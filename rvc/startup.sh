@@ -69,4 +69,8 @@ echo "🚀 Starting API server..."
 echo "Press Ctrl+C to stop the server"
 echo ""
 export PYTORCH_ENABLE_MPS_FALLBACK=1
+if [[ "$1" == "prod" ]]; then
+    # Preload models once and fork workers that share them copy-on-write
+    exec python serve.py --workers "${SERVE_WORKERS:-2}"
+fi
 exec python -m uvicorn api:app --reload
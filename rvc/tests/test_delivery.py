@@ -0,0 +1,77 @@
+import os
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from api_modules.delivery import file_etag, parse_range, retention_expires_at, video_file_response
+from config import JOB_RESULT_TTL
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=500-", (500, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=990-5000", (990, 999)),
+    ("bytes = 10 - 19", (10, 19)),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=0-1,5-6", "items=0-1", "bytes=-", "garbage"])
+def test_parse_range_ignores_unsupported_headers(header):
+    assert parse_range(header, 1000) is None
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=50-10"])
+def test_parse_range_rejects_unsatisfiable_ranges(header):
+    with pytest.raises(HTTPException) as error:
+        parse_range(header, 1000)
+    assert error.value.status_code == 416
+    assert error.value.headers["Content-Range"] == "bytes */1000"
+
+
+@pytest.fixture
+def finished_job(tmp_path):
+    path = tmp_path / "video.mp4"
+    path.write_bytes(bytes(range(256)) * 4)
+    return {"request_id": "abc123", "file_path": str(path), "finished_at": time.time()}
+
+
+def test_range_request_gets_partial_content(finished_job):
+    response = video_file_response(finished_job, {"range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == "bytes 10-19/1024"
+    assert response.headers["content-length"] == "10"
+
+
+def test_if_range_with_current_etag_gets_partial_content(finished_job):
+    etag = file_etag(os.stat(finished_job["file_path"]))
+    response = video_file_response(finished_job, {"range": "bytes=0-9", "if-range": etag})
+    assert response.status_code == 206
+
+
+def test_if_range_with_stale_etag_gets_whole_file(finished_job):
+    response = video_file_response(finished_job, {"range": "bytes=0-9", "if-range": '"stale"'})
+    assert response.status_code == 200
+    assert "content-range" not in response.headers
+
+
+def test_if_none_match_gets_not_modified(finished_job):
+    etag = file_etag(os.stat(finished_job["file_path"]))
+    response = video_file_response(finished_job, {"if-none-match": f'"other", {etag}'})
+    assert response.status_code == 304
+
+
+def test_missing_file_is_gone(finished_job):
+    os.unlink(finished_job["file_path"])
+    with pytest.raises(HTTPException) as error:
+        video_file_response(finished_job, {})
+    assert error.value.status_code == 410
+
+
+def test_retention_counts_from_finished_at():
+    job = {"finished_at": 1000.0, "updated_at": 5000.0}
+    assert retention_expires_at(job) == 1000.0 + JOB_RESULT_TTL
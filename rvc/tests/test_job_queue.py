@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+from api_modules.job_queue import QueueFullError, VideoJobQueue
+
+
+def blocked_job(release: asyncio.Event):
+    async def job():
+        await release.wait()
+    return job
+
+
+async def settle():
+    """Let the workers pick up whatever they can"""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_positions_follow_submission_order():
+    async def scenario():
+        queue = VideoJobQueue(max_concurrent=1, max_queued=10, default_duration=10)
+        release = asyncio.Event()
+        for request_id in ("a", "b", "c"):
+            await queue.submit(request_id, blocked_job(release))
+        await settle()
+
+        assert queue.in_flight == 1
+        assert queue.queue_depth == 2
+        assert queue.position("a") is None
+        assert queue.position("b") == 1
+        assert queue.position("c") == 2
+        assert queue.status("b")["queuePosition"] == 1
+        assert "queuePosition" not in queue.status("a")
+        assert queue.status("unknown") == {}
+
+        release.set()
+        await queue.stop()
+
+    asyncio.run(scenario())
+
+
+def test_eta_counts_running_and_queued_jobs():
+    async def scenario():
+        queue = VideoJobQueue(max_concurrent=1, max_queued=10, default_duration=10)
+        release = asyncio.Event()
+        for request_id in ("a", "b", "c"):
+            await queue.submit(request_id, blocked_job(release))
+        await settle()
+
+        # One worker: a has ~10s left, then b and c take 10s each
+        assert queue.estimate_wait("a") == pytest.approx(10, abs=0.5)
+        assert queue.estimate_wait("b") == pytest.approx(20, abs=0.5)
+        assert queue.estimate_wait("c") == pytest.approx(30, abs=0.5)
+        assert queue.estimate_new_job() == pytest.approx(40, abs=0.5)
+        assert queue.estimate_wait("unknown") is None
+
+        release.set()
+        await queue.stop()
+
+    asyncio.run(scenario())
+
+
+def test_eta_spreads_queued_jobs_over_workers():
+    async def scenario():
+        queue = VideoJobQueue(max_concurrent=2, max_queued=10, default_duration=10)
+        release = asyncio.Event()
+        for request_id in ("a", "b", "c", "d"):
+            await queue.submit(request_id, blocked_job(release))
+        await settle()
+
+        assert queue.in_flight == 2
+        assert queue.position("c") == 1
+        assert queue.estimate_wait("c") == pytest.approx(20, abs=0.5)
+        assert queue.estimate_wait("d") == pytest.approx(20, abs=0.5)
+        assert queue.estimate_new_job() == pytest.approx(30, abs=0.5)
+
+        release.set()
+        await queue.stop()
+
+    asyncio.run(scenario())
+
+
+def test_average_duration_follows_finished_jobs():
+    async def scenario():
+        queue = VideoJobQueue(max_concurrent=1, max_queued=10, default_duration=10)
+        done = asyncio.Event()
+
+        async def quick_job():
+            done.set()
+
+        await queue.submit("a", quick_job)
+        await done.wait()
+        await settle()
+
+        # 0.7 * 10 + 0.3 * ~0
+        assert queue.in_flight == 0
+        assert queue.estimate_new_job() == pytest.approx(7, abs=0.1)
+        await queue.stop()
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_rejects_new_jobs():
+    async def scenario():
+        queue = VideoJobQueue(max_concurrent=1, max_queued=1, default_duration=10)
+        release = asyncio.Event()
+        await queue.submit("a", blocked_job(release))
+        await settle()
+        await queue.submit("b", blocked_job(release))
+
+        with pytest.raises(QueueFullError):
+            await queue.submit("c", blocked_job(release))
+        assert queue.position("c") is None
+
+        release.set()
+        await queue.stop()
+
+    asyncio.run(scenario())
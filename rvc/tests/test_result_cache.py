@@ -0,0 +1,88 @@
+import os
+
+import pytest
+
+from api_modules.result_cache import ResultCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache(str(tmp_path / "cache"), max_bytes=250)
+
+
+def make_file(tmp_path, name: str, size: int = 100) -> str:
+    path = tmp_path / name
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+
+def age(cache: ResultCache, fingerprint: str, last_used: float):
+    path = cache._path(fingerprint)
+    os.utime(path, (last_used, os.stat(path).st_mtime))
+
+
+def test_materialize_hit_and_miss(cache, tmp_path):
+    cache.put("a", make_file(tmp_path, "a.mp4"))
+    dest = str(tmp_path / "out" / "a.mp4")
+    assert cache.materialize("a", dest) == 100
+    assert os.path.getsize(dest) == 100
+    assert cache.materialize("missing", str(tmp_path / "out" / "missing.mp4")) is None
+
+
+def test_evicts_least_recently_used_over_budget(cache, tmp_path):
+    cache.put("a", make_file(tmp_path, "a.mp4"))
+    cache.put("b", make_file(tmp_path, "b.mp4"))
+    age(cache, "a", 1000)
+    age(cache, "b", 2000)
+
+    # Reading a marks it as used, so b is now the oldest
+    assert cache.get("a") is not None
+    cache.put("c", make_file(tmp_path, "c.mp4"))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def test_get_leaves_linked_files_mtime_alone(cache, tmp_path):
+    cache.put("a", make_file(tmp_path, "a.mp4"))
+    delivered = str(tmp_path / "job" / "video.mp4")
+    cache.materialize("a", delivered)
+    os.utime(delivered, ns=(1_000_000_000, 2_000_000_000))
+
+    assert cache.get("a") is not None
+    assert os.stat(delivered).st_mtime_ns == 2_000_000_000
+    assert os.stat(cache._path("a")).st_atime > 1000
+
+
+def test_evict_stops_once_under_budget(cache, tmp_path):
+    for i, name in enumerate("abc"):
+        cache.put(name, make_file(tmp_path, f"{name}.mp4", size=80))
+        age(cache, name, 1000 + i)
+    cache.put("d", make_file(tmp_path, "d.mp4", size=80))
+
+    assert cache.get("a") is None
+    assert all(cache.get(name) is not None for name in "bcd")
+
+
+def test_skips_files_larger_than_the_budget(cache, tmp_path):
+    cache.put("big", make_file(tmp_path, "big.mp4", size=300))
+    assert cache.get("big") is None
+
+
+def test_only_counts_entries_with_its_suffix(tmp_path):
+    directory = tmp_path / "shared"
+    videos = ResultCache(str(directory), max_bytes=150)
+    clips = ResultCache(str(directory), max_bytes=150, suffix=".wav", kind="TTS clips")
+    clips.put("a", make_file(tmp_path, "a.wav"))
+    videos.put("a", make_file(tmp_path, "a.mp4"))
+    assert clips.get("a") is not None
+    assert videos.get("a") is not None
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"), max_bytes=0)
+    assert not cache.enabled
+    cache.put("a", make_file(tmp_path, "a.mp4"))
+    assert cache.get("a") is None
+    assert not os.path.exists(tmp_path / "cache")
@@ -0,0 +1,143 @@
+import asyncio
+
+import pytest
+
+from api_modules.scheduler import InferenceScheduler, Lane
+
+
+def make_scheduler(max_concurrent: int = 1, video_concurrency: int = 2) -> InferenceScheduler:
+    return InferenceScheduler(
+        max_concurrent=max_concurrent,
+        lanes=[
+            Lane("interactive", priority=0, max_concurrent=2),
+            Lane("batch", priority=1, max_concurrent=1),
+            Lane("video", priority=2, max_concurrent=video_concurrency),
+        ]
+    )
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def hold(scheduler: InferenceScheduler, lane: str, resource: str, order: list, release: asyncio.Event):
+    async with scheduler.slot(lane, resource):
+        order.append((lane, resource))
+        await release.wait()
+
+
+def test_higher_priority_lane_runs_first():
+    async def scenario():
+        scheduler = make_scheduler(max_concurrent=1)
+        order = []
+        first = asyncio.Event()
+        rest = asyncio.Event()
+        rest.set()
+
+        running = asyncio.create_task(hold(scheduler, "video", "peter", order, first))
+        await settle()
+        # Queued in the reverse of their priority
+        waiters = [
+            asyncio.create_task(hold(scheduler, "video", "stewie", order, rest)),
+            asyncio.create_task(hold(scheduler, "batch", "lois", order, rest)),
+            asyncio.create_task(hold(scheduler, "interactive", "brian", order, rest)),
+        ]
+        await settle()
+        assert scheduler.status()["video"]["queued"] == 1
+        assert scheduler.queued() == 3
+
+        first.set()
+        await asyncio.gather(running, *waiters)
+        assert order == [
+            ("video", "peter"),
+            ("interactive", "brian"),
+            ("batch", "lois"),
+            ("video", "stewie"),
+        ]
+
+    asyncio.run(scenario())
+
+
+def test_same_lane_is_first_in_first_out():
+    async def scenario():
+        scheduler = make_scheduler(max_concurrent=1)
+        order = []
+        release = asyncio.Event()
+        tasks = [
+            asyncio.create_task(hold(scheduler, "video", character, order, release))
+            for character in ("peter", "stewie", "lois")
+        ]
+        await settle()
+        release.set()
+        await asyncio.gather(*tasks)
+        assert [resource for _, resource in order] == ["peter", "stewie", "lois"]
+
+    asyncio.run(scenario())
+
+
+def test_resource_is_exclusive_even_with_free_slots():
+    async def scenario():
+        scheduler = make_scheduler(max_concurrent=4)
+        order = []
+        release = asyncio.Event()
+        first = asyncio.create_task(hold(scheduler, "video", "peter", order, release))
+        second = asyncio.create_task(hold(scheduler, "interactive", "peter", order, release))
+        other = asyncio.create_task(hold(scheduler, "video", "stewie", order, release))
+        await settle()
+
+        assert order == [("video", "peter"), ("video", "stewie")]
+        assert scheduler.is_busy("peter")
+
+        release.set()
+        await asyncio.gather(first, second, other)
+        assert order[-1] == ("interactive", "peter")
+        assert not scheduler.is_busy("peter")
+
+    asyncio.run(scenario())
+
+
+def test_lane_concurrency_leaves_slots_for_other_lanes():
+    async def scenario():
+        scheduler = make_scheduler(max_concurrent=2, video_concurrency=1)
+        order = []
+        release = asyncio.Event()
+        videos = [
+            asyncio.create_task(hold(scheduler, "video", character, order, release))
+            for character in ("peter", "stewie")
+        ]
+        await settle()
+        assert scheduler.status()["video"] == {"queued": 1, "running": 1, "max_concurrent": 1}
+
+        interactive = asyncio.create_task(hold(scheduler, "interactive", "lois", order, release))
+        await settle()
+        assert ("interactive", "lois") in order
+
+        release.set()
+        await asyncio.gather(*videos, interactive)
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    async def scenario():
+        scheduler = make_scheduler(max_concurrent=1)
+        order = []
+        release = asyncio.Event()
+        running = asyncio.create_task(hold(scheduler, "video", "peter", order, release))
+        await settle()
+        cancelled = asyncio.create_task(hold(scheduler, "interactive", "stewie", order, release))
+        waiting = asyncio.create_task(hold(scheduler, "batch", "lois", order, release))
+        await settle()
+
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        assert scheduler.queued() == 1
+
+        release.set()
+        await asyncio.gather(running, waiting)
+        assert order == [("video", "peter"), ("batch", "lois")]
+        assert scheduler.status()["batch"]["running"] == 0
+
+    asyncio.run(scenario())
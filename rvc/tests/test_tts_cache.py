@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from api_modules.result_cache import ResultCache
+from api_modules.tts_cache import TTSCache, tts_cache_key
+
+
+class Provider:
+    """Stand-in for a TTS call that writes a clip once released"""
+
+    def __init__(self, ok: bool = True):
+        self.ok = ok
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self, output_path: str) -> bool:
+        self.calls += 1
+        await self.release.wait()
+        if self.ok:
+            with open(output_path, "wb") as f:
+                f.write(b"RIFF clip")
+        return self.ok
+
+
+def make_cache(tmp_path, max_bytes: int = 1024 * 1024) -> TTSCache:
+    return TTSCache(ResultCache(str(tmp_path / "tts"), max_bytes, suffix=".wav", kind="TTS clips"))
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0.01)
+
+
+def test_cache_key_ignores_payload_key_order():
+    first = tts_cache_key("voice", "pcm_16000", {"text": "hi", "model_id": "m"})
+    second = tts_cache_key("voice", "pcm_16000", {"model_id": "m", "text": "hi"})
+    assert first == second
+    assert first != tts_cache_key("voice", "pcm_22050", {"text": "hi", "model_id": "m"})
+
+
+@pytest.mark.parametrize("max_bytes", [1024 * 1024, 0])
+def test_concurrent_misses_share_one_call(tmp_path, max_bytes):
+    async def scenario():
+        cache = make_cache(tmp_path, max_bytes)
+        provider = Provider()
+        paths = [str(tmp_path / f"out_{i}.wav") for i in range(3)]
+        fetches = [asyncio.create_task(cache.fetch("key", path, provider)) for path in paths]
+        await settle()
+        provider.release.set()
+
+        assert await asyncio.gather(*fetches) == [True, True, True]
+        assert provider.calls == 1
+        for path in paths:
+            with open(path, "rb") as f:
+                assert f.read() == b"RIFF clip"
+
+    asyncio.run(scenario())
+
+
+def test_cached_clip_skips_the_provider(tmp_path):
+    async def scenario():
+        cache = make_cache(tmp_path)
+        provider = Provider()
+        provider.release.set()
+        assert await cache.fetch("key", str(tmp_path / "first.wav"), provider)
+        assert await cache.fetch("key", str(tmp_path / "second.wav"), provider)
+        assert provider.calls == 1
+
+    asyncio.run(scenario())
+
+
+def test_failed_call_is_shared_and_not_cached(tmp_path):
+    async def scenario():
+        cache = make_cache(tmp_path)
+        provider = Provider(ok=False)
+        fetches = [
+            asyncio.create_task(cache.fetch("key", str(tmp_path / f"out_{i}.wav"), provider))
+            for i in range(2)
+        ]
+        await settle()
+        provider.release.set()
+
+        assert await asyncio.gather(*fetches) == [False, False]
+        assert provider.calls == 1
+        assert cache.store.get("key") is None
+
+    asyncio.run(scenario())
+
+
+def test_follower_takes_over_when_the_leader_is_cancelled(tmp_path):
+    async def scenario():
+        cache = make_cache(tmp_path)
+        provider = Provider()
+        leader = asyncio.create_task(cache.fetch("key", str(tmp_path / "leader.wav"), provider))
+        await settle()
+        follower = asyncio.create_task(cache.fetch("key", str(tmp_path / "follower.wav"), provider))
+        await settle()
+
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        await settle()
+        provider.release.set()
+
+        assert await follower
+        assert provider.calls == 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,109 @@
+import asyncio
+import struct
+
+import numpy as np
+import pytest
+
+from api_modules.tts_stream import Crossfader, split_sentences, wav_chunks, wav_stream_header
+
+
+def test_split_sentences_on_terminal_punctuation():
+    text = "Hello there. How are you? Fine! Wait… what"
+    assert split_sentences(text, min_chars=1) == ["Hello there.", "How are you?", "Fine!", "Wait…", "what"]
+
+
+def test_split_sentences_keeps_closing_quotes_and_brackets():
+    text = 'He said "stop." Then he left. (Really!) Ok.'
+    assert split_sentences(text, min_chars=1) == ['He said "stop."', "Then he left.", "(Really!)", "Ok."]
+
+
+def test_split_sentences_merges_short_sentences_forward():
+    text = "Hi. Hello there, my friend. How is it going today?"
+    assert split_sentences(text, min_chars=10) == ["Hi. Hello there, my friend.", "How is it going today?"]
+
+
+def test_split_sentences_merges_short_tail_backward():
+    text = "Hello there, my friend. Ok."
+    assert split_sentences(text, min_chars=10) == ["Hello there, my friend. Ok."]
+
+
+def test_split_sentences_keeps_short_text_whole():
+    assert split_sentences("  Hi.  ", min_chars=10) == ["Hi."]
+    assert split_sentences("no punctuation at all", min_chars=5) == ["no punctuation at all"]
+
+
+def test_crossfader_holds_back_the_overlap_and_fades_across_it():
+    crossfader = Crossfader(overlap=4)
+
+    first = crossfader.push(np.full(10, 1000.0))
+    assert first.tolist() == [1000] * 6
+
+    second = crossfader.push(np.zeros(10))
+    # The held-back tail fades out linearly while the next chunk fades in
+    assert second.tolist() == [1000, 666, 333, 0, 0, 0]
+
+    assert crossfader.flush().tolist() == [0, 0, 0, 0]
+    # Each boundary costs one overlap: 20 samples in, 16 out
+    assert len(first) + len(second) + 4 == 16
+
+
+def test_crossfader_output_is_little_endian_int16_and_clipped():
+    crossfader = Crossfader(overlap=0)
+    samples = crossfader.push(np.array([40000.0, -40000.0, 12.7]))
+    assert samples.dtype == np.dtype("<i2")
+    assert samples.tolist() == [32767, -32768, 12]
+    assert len(crossfader.flush()) == 0
+
+
+def test_crossfader_handles_chunks_shorter_than_the_overlap():
+    crossfader = Crossfader(overlap=4)
+    assert len(crossfader.push(np.full(2, 100.0))) == 0
+    out = crossfader.push(np.full(6, 100.0))
+    rest = crossfader.flush()
+    assert len(out) + len(rest) == 6
+    assert set(out.tolist() + rest.tolist()) == {100}
+
+
+def test_crossfader_flush_without_input_is_empty():
+    assert len(Crossfader(overlap=4).flush()) == 0
+
+
+def test_wav_stream_header_declares_pcm_of_unknown_length():
+    header = wav_stream_header(16000)
+    assert len(header) == 44
+    assert header[:4] == b"RIFF" and header[8:12] == b"WAVE" and header[36:40] == b"data"
+    fmt, channels, sample_rate, byte_rate, block_align, bits = struct.unpack("<HHIIHH", header[20:36])
+    assert (fmt, channels, sample_rate, byte_rate, block_align, bits) == (1, 1, 16000, 32000, 2, 16)
+    assert struct.unpack("<I", header[40:44])[0] == 0xFFFFFFFF
+
+
+@pytest.mark.parametrize("sample_rate", [32000, 40000, 48000])
+def test_wav_stream_header_sample_rate(sample_rate):
+    assert struct.unpack("<I", wav_stream_header(sample_rate)[24:28])[0] == sample_rate
+
+
+class FakeSentenceStream:
+    def __init__(self, sentences: int):
+        self.sentences = sentences
+        self.sample_rate = 16000
+        self.closed = False
+
+    async def chunks(self):
+        try:
+            for _ in range(self.sentences):
+                yield np.zeros(1600)
+        finally:
+            self.closed = True
+
+
+def test_closing_wav_chunks_closes_the_sentence_stream():
+    async def scenario():
+        stream = FakeSentenceStream(sentences=3)
+        chunks = wav_chunks(stream)
+        assert await chunks.__anext__() == wav_stream_header(16000)
+        await chunks.__anext__()
+        await chunks.aclose()
+        # Closed right away, not whenever the inner generator is finalized
+        assert stream.closed
+
+    asyncio.run(scenario())
@@ -1,34 +1,38 @@
 import os
-import tempfile
 import subprocess
-import uuid
 import asyncio
-import time
 from typing import List
 from .types import AudioFileData
+from .file_utils import write_bytes, read_bytes
+from api_modules.executors import run_io
+from api_modules.metrics import time_stage
+from api_modules.workspace import scratch_path
+
+def write_concat_inputs(audio_data: List[AudioFileData], temp_files: List[str]) -> str:
+    """Write each buffer to the job workspace (appending its path to temp_files) and an ffmpeg concat list, return the list's path"""
+    for data in audio_data:
+        temp_path = scratch_path("audio_part", ".wav")
+        write_bytes(temp_path, data.buffer)
+        temp_files.append(temp_path)
+    
+    concat_list_path = scratch_path("concat_list", ".txt")
+    with open(concat_list_path, 'w') as f:
+        for temp_file in temp_files:
+            f.write(f"file '{temp_file}'\n")
+    return concat_list_path
 
 async def combine_audio_buffers(audio_data: List[AudioFileData]) -> bytes:
     """Combine multiple audio buffers into a single WAV file"""
     if not audio_data:
         raise ValueError("No audio data provided")
     
-    # Write buffers to temporary files
+    # Write buffers and the concat file list to temporary files
     temp_files = []
     try:
-        for i, data in enumerate(audio_data):
-            temp_path = os.path.join(tempfile.gettempdir(), f"audio_part_{uuid.uuid4()}.wav")
-            with open(temp_path, 'wb') as f:
-                f.write(data.buffer)
-            temp_files.append(temp_path)
+        concat_list_path = await run_io(write_concat_inputs, audio_data, temp_files)
         
         # Use ffmpeg to concatenate audio files
-        output_path = os.path.join(tempfile.gettempdir(), f"combined_audio_{uuid.uuid4()}.wav")
-        
-        # Create concat file list
-        concat_list_path = os.path.join(tempfile.gettempdir(), f"concat_list_{uuid.uuid4()}.txt")
-        with open(concat_list_path, 'w') as f:
-            for temp_file in temp_files:
-                f.write(f"file '{temp_file}'\n")
+        output_path = scratch_path("combined_audio", ".wav")
         
         # Run ffmpeg concat
         cmd = [
@@ -40,20 +44,20 @@ async def combine_audio_buffers(audio_data: List[AudioFileData]) -> bytes:
             output_path
         ]
         
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        
-        stdout, stderr = await process.communicate()
+        with time_stage("ffmpeg_concat"):
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            
+            stdout, stderr = await process.communicate()
         
         if process.returncode != 0:
             raise RuntimeError(f"FFmpeg concat failed: {stderr.decode()}")
         
         # Read combined audio
-        with open(output_path, 'rb') as f:
-            combined_buffer = f.read()
+        combined_buffer = await run_io(read_bytes, output_path)
         
         # Cleanup
         os.unlink(output_path)
@@ -70,9 +74,8 @@ async def combine_audio_buffers(audio_data: List[AudioFileData]) -> bytes:
                 pass
 
 async def write_combined_audio_file(audio_data: List[AudioFileData]) -> str:
-    """Combine audio buffers and write to a temporary file, return the path"""
+    """Combine audio buffers and write to a file in the job workspace, return the path"""
     combined_audio_buffer = await combine_audio_buffers(audio_data)
-    combined_audio_path = os.path.join(tempfile.gettempdir(), f"combined_audio_{int(time.time())}_{uuid.uuid4()}.wav")
-    with open(combined_audio_path, 'wb') as f:
-        f.write(combined_audio_buffer)
+    combined_audio_path = scratch_path("combined_audio", ".wav")
+    await run_io(write_bytes, combined_audio_path, combined_audio_buffer)
     return combined_audio_path 
\ No newline at end of file
@@ -76,10 +76,14 @@ def build_filter_complex(stewie_overlay: str, peter_overlay: str, image_overlays
     
     return ';'.join(filter_parts)
 
-def build_ffmpeg_command(inputs: List[str], filter_complex: str, output_path: str) -> List[str]:
+def build_ffmpeg_command(inputs: List[str], filter_complex: str, output_path: str,
+                         report_progress: bool = False) -> List[str]:
     """Build the complete FFmpeg command"""
+    # Machine-readable progress (key=value lines) on stdout
+    progress_args = ['-progress', 'pipe:1', '-nostats'] if report_progress else []
     return [
         'ffmpeg',
+        *progress_args,
         *inputs,
         '-y',
         '-filter_complex', filter_complex,
@@ -1,19 +1,27 @@
 import os
-import tempfile
-import time
-import uuid
 from typing import List, Optional
 from .types import ImageOverlay
+from api_modules.workspace import scratch_path
+
+def write_bytes(path: str, content: bytes) -> None:
+    """Write a bytes buffer to path"""
+    with open(path, 'wb') as f:
+        f.write(content)
+
+def read_bytes(path: str) -> bytes:
+    """Read a whole file into memory"""
+    with open(path, 'rb') as f:
+        return f.read()
 
 def write_subtitle_file(subtitle_content: str) -> str:
-    """Write subtitle content to a temporary file and return the path"""
-    subtitle_path = os.path.join(tempfile.gettempdir(), f"subtitles_{int(time.time())}_{uuid.uuid4()}.ass")
+    """Write subtitle content to a file in the job workspace and return the path"""
+    subtitle_path = scratch_path("subtitles", ".ass")
     with open(subtitle_path, 'w') as f:
         f.write(subtitle_content)
     return subtitle_path
 
 def write_image_overlay_files(image_overlays: Optional[List[ImageOverlay]]) -> List[str]:
-    """Write media overlay buffers to temporary files and return list of paths"""
+    """Write media overlay buffers to files in the job workspace and return list of paths"""
     overlay_temp_files = []
     if image_overlays:
         for i, overlay in enumerate(image_overlays):
@@ -23,7 +31,8 @@ def write_image_overlay_files(image_overlays: Optional[List[ImageOverlay]]) -> L
             else:
                 extension = ".png"
             
-            temp_file_path = os.path.join(tempfile.gettempdir(), f"overlay_{int(time.time())}_{i}_{uuid.uuid4()}{extension}")
+            # Overlay videos can be tens of MB, so keep them off tmpfs
+            temp_file_path = scratch_path(f"overlay_{i}", extension, large=overlay.media_type == "video")
             with open(temp_file_path, 'wb') as f:
                 f.write(overlay.buffer)
             overlay_temp_files.append(temp_file_path)